@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from api import query_plans
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot list/filter queries over large fixture tables and fail on sequential scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000,
+                            help='Rows seeded into each large table')
+        parser.add_argument('--verbose-plans', action='store_true',
+                            help='Print the full plan of every query')
+
+    def handle(self, *args, **options):
+        failures = []
+
+        # Fixtures live in a transaction that is rolled back at the end
+        with transaction.atomic():
+            fixtures = query_plans.seed(options['rows'])
+            query_plans.analyze()
+
+            for name, queryset in query_plans.hot_queries(fixtures):
+                plan = queryset.explain()
+                scans = query_plans.sequential_scans(plan)
+                status = 'SEQ SCAN' if scans else 'ok'
+                self.stdout.write(f"{name:<40} {status}")
+                if options['verbose_plans'] or scans:
+                    self.stdout.write(plan)
+                if scans:
+                    failures.append(name)
+
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(f"Sequential scans in: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS('No sequential scans on large tables'))
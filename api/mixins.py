@@ -0,0 +1,133 @@
+from functools import lru_cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import permissions, serializers
+from rest_framework.response import Response
+
+
+def optimize_queryset(queryset, serializer_class):
+    """
+    Apply the select_related/prefetch_related paths a serializer needs
+    so that serializing a list costs a constant number of queries.
+    Serializers whose method fields need more (e.g. annotations) can add
+    it in a `setup_eager_loading(queryset)` static method.
+    """
+    select_related, prefetch_related = get_eager_loading_plan(serializer_class)
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*prefetch_related)
+    setup_eager_loading = getattr(serializer_class, 'setup_eager_loading', None)
+    if setup_eager_loading:
+        queryset = setup_eager_loading(queryset)
+    return queryset
+
+
+@lru_cache(maxsize=None)
+def get_eager_loading_plan(serializer_class):
+    """
+    Derive (select_related paths, prefetch_related lookups) from a
+    ModelSerializer's dotted `source=` paths and nested serializers.
+    The plan only depends on the class, so it is computed once.
+    """
+    select_related = set()
+    prefetch_related = {}
+    _plan_serializer(serializer_class(), '', select_related, prefetch_related)
+    return tuple(sorted(select_related)), tuple(prefetch_related.values())
+
+
+def _plan_serializer(serializer, prefix, select_related, prefetch_related):
+    model = serializer.Meta.model
+
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+
+        if isinstance(field, serializers.ListSerializer):
+            child = field.child
+            if isinstance(child, serializers.ModelSerializer):
+                path = _resolve_relations(model, field.source_attrs)[0]
+                if path:
+                    lookup = prefix + path
+                    prefetch_related[lookup] = Prefetch(
+                        lookup,
+                        queryset=optimize_queryset(child.Meta.model._default_manager.all(),
+                                                   child.__class__)
+                    )
+            continue
+
+        if isinstance(field, serializers.ManyRelatedField):
+            path = _resolve_relations(model, field.source_attrs)[0]
+            if path:
+                prefetch_related.setdefault(prefix + path, prefix + path)
+            continue
+
+        # Primary key fields read the local *_id column and need no join
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            continue
+
+        path, many = _resolve_relations(model, field.source_attrs)
+        if not path:
+            continue
+
+        if many:
+            prefetch_related.setdefault(prefix + path, prefix + path)
+        elif isinstance(field, serializers.ModelSerializer):
+            select_related.add(prefix + path)
+            _plan_serializer(field, prefix + path + '__', select_related, prefetch_related)
+        else:
+            select_related.add(prefix + path)
+
+
+def _resolve_relations(model, attrs):
+    """
+    Follow `attrs` through the model's relations. Returns the ORM path of
+    the relations crossed and whether the last one is to-many; the walk
+    stops at the first attribute that is not a relation.
+    """
+    path = []
+    for attr in attrs:
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            break
+        if not field.is_relation:
+            break
+        path.append(attr)
+        if field.many_to_many or field.one_to_many:
+            return '__'.join(path), True
+        model = field.related_model
+    return '__'.join(path), False
+
+
+class QueryOptimizationMixin:
+    """
+    Eager-load whatever the view's serializer dereferences. Only applied
+    to safe methods: write actions mutate related rows and must not serve
+    them from a prefetch cache filled before the change.
+    """
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method not in permissions.SAFE_METHODS:
+            return queryset
+        return optimize_queryset(queryset, self.get_serializer_class())
+
+    def list_response(self, queryset, serializer_class):
+        """
+        Serialize a related list for a detail action with the same
+        eager-loading plan, paginated like the view's own list
+        """
+        queryset = optimize_queryset(queryset, serializer_class)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer_class(page, many=True).data)
+        return Response(serializer_class(queryset, many=True).data)
+
+    def detail_response(self, instance, serializer_class=None):
+        """
+        Serialize an instance changed by a write action, reloading it with
+        the eager-loading plan so nested lists reflect the change
+        """
+        serializer_class = serializer_class or self.get_serializer_class()
+        queryset = optimize_queryset(instance.__class__._default_manager.all(), serializer_class)
+        return Response(serializer_class(queryset.get(pk=instance.pk)).data)
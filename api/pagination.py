@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination over a stable (timestamp, id) ordering, so the cost
+    of a page does not depend on how deep the client has paged. Views
+    declare their keyset through the standard `ordering` attribute; the
+    default fits every model with a created_at column.
+
+    A cursor records the value of the first ordering field read off the
+    model instance, so client orderings keep only the model's own columns
+    that are never NULL: lookups across relations (user__username) cannot
+    be read off the instance, and a NULL would be stored as the string
+    "None". Rows sharing the first field's value are paged by an offset
+    into that run of ties, so the first field should be nearly unique; id
+    is appended as a tie-breaker so ties keep one order from page to page.
+    """
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'ordering', None)
+        if ordering:
+            self.ordering = ordering
+
+        fields = [field for field in super().get_ordering(request, queryset, view)
+                  if self.is_keyset_field(queryset.model, field)]
+        if not fields:
+            fields = [field for field in self.ordering if '__' not in field]
+        if not any(field.lstrip('-') in ('id', 'pk') for field in fields):
+            fields.append('-id' if fields and fields[0].startswith('-') else 'id')
+        return tuple(fields)
+
+    @staticmethod
+    def is_keyset_field(model, field):
+        name = field.lstrip('-')
+        if '__' in name:
+            return False
+        try:
+            return not model._meta.get_field(name).null
+        except FieldDoesNotExist:
+            # pk, or an annotation of the view's queryset
+            return True
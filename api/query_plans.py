@@ -0,0 +1,158 @@
+import re
+import uuid
+from django.contrib.auth.models import User
+from django.db import connection
+from django.utils import timezone
+from inventory.models import Product, Inventory, InventoryMovement
+from orders.models import Supplier, Customer, PurchaseOrder, SalesOrder
+from reports.datasets import UserActivityDataset
+from reports.models import Report, GeneratedReport
+from users.models import Activity
+from warehouse.models import Warehouse
+
+# Tables seeded large enough that a sequential scan on them is a regression
+LARGE_TABLES = (
+    Inventory._meta.db_table,
+    InventoryMovement._meta.db_table,
+    PurchaseOrder._meta.db_table,
+    SalesOrder._meta.db_table,
+    GeneratedReport._meta.db_table,
+    Activity._meta.db_table,
+)
+
+
+def hot_queries(fixtures):
+    """
+    (name, queryset) of the hot list and filter queries over seed()
+    fixtures. A plan walking one of LARGE_TABLES in full means a missing
+    or unused index; api.tests and the check_query_plans command fail on
+    it.
+    """
+    page = 50
+    today = str(timezone.now().date())
+    user, product, warehouse, inventory, cursor = fixtures
+    return [
+        ('inventory by product and warehouse',
+         Inventory.objects.filter(product=product, warehouse=warehouse)),
+        ('inventory by product',
+         Inventory.objects.filter(product=product)),
+        ('inventory by warehouse',
+         Inventory.objects.filter(warehouse=warehouse)),
+        ('movements page',
+         InventoryMovement.objects.order_by('-created_at', '-id')[:page]),
+        ('movements next page',
+         InventoryMovement.objects.filter(created_at__lt=cursor).order_by('-created_at', '-id')[:page]),
+        ('movements of inventory',
+         InventoryMovement.objects.filter(inventory=inventory).order_by('-created_at')[:page]),
+        ('purchase orders page',
+         PurchaseOrder.objects.order_by('-created_at', '-id')[:page]),
+        ('purchase orders by status',
+         PurchaseOrder.objects.filter(status='APPROVED').order_by('-created_at')[:page]),
+        ('sales orders page',
+         SalesOrder.objects.order_by('-created_at', '-id')[:page]),
+        ('sales orders by status',
+         SalesOrder.objects.filter(status='PROCESSING').order_by('-created_at')[:page]),
+        ('activities page',
+         Activity.objects.order_by('-timestamp', '-id')[:page]),
+        ('activities of user',
+         Activity.objects.filter(user=user).order_by('-timestamp')[:page]),
+        ('activity report day',
+         UserActivityDataset({'start_date': today, 'end_date': today}).rows()[1]),
+        ('activity events day',
+         UserActivityDataset({'section': 'events', 'start_date': today, 'end_date': today}).rows()[1]),
+        ('generated reports page',
+         GeneratedReport.objects.order_by('-start_time', '-id')[:page]),
+        ('generated reports by status',
+         GeneratedReport.objects.filter(status='FAILED').order_by('-start_time')[:page]),
+    ]
+
+
+def sequential_scans(plan):
+    """
+    Lines of an EXPLAIN plan walking one of LARGE_TABLES in full
+    """
+    if connection.vendor == 'postgresql':
+        pattern = re.compile(r'Seq Scan on (\w+)')
+    else:
+        # SQLite reports a full table walk as SCAN without USING INDEX
+        pattern = re.compile(r'\bSCAN (\w+)(?!.*\bUSING\b)')
+    scans = []
+    for line in plan.splitlines():
+        match = pattern.search(line)
+        if match and match.group(1) in LARGE_TABLES:
+            scans.append(line.strip())
+    return scans
+
+
+def analyze():
+    # Refresh planner statistics so the plans reflect the fixture sizes
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            for table in LARGE_TABLES:
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(table)}')
+        elif connection.vendor == 'sqlite':
+            cursor.execute('ANALYZE')
+
+
+def seed(rows):
+    """
+    Seed rows into each of LARGE_TABLES. Returns the fixtures hot_queries()
+    filters on.
+    """
+    token = uuid.uuid4().hex[:8]
+    users = User.objects.bulk_create([
+        User(username=f"plan-{token}-{i}") for i in range(20)
+    ])
+    warehouses = Warehouse.objects.bulk_create([
+        Warehouse(name=f"Plan {token} {i}", address='-', city='-', state='-',
+                  country='-', postal_code='-')
+        for i in range(max(rows // 1000, 2))
+    ])
+    products = Product.objects.bulk_create([
+        Product(name=f"Plan {token} {i}", sku=f"PLAN-{token}-{i}",
+                cost_price=1, selling_price=2)
+        for i in range(max(rows // len(warehouses), 1))
+    ])
+    inventories = Inventory.objects.bulk_create([
+        Inventory(product=product, warehouse=warehouse, quantity=10)
+        for product in products
+        for warehouse in warehouses
+    ], batch_size=1000)
+    InventoryMovement.objects.bulk_create([
+        InventoryMovement(inventory=inventories[i % len(inventories)], movement_type='IN',
+                          quantity=1, created_by=users[i % len(users)])
+        for i in range(rows)
+    ], batch_size=1000)
+
+    supplier = Supplier.objects.create(name=f"Plan {token}")
+    customer = Customer.objects.create(name=f"Plan {token}")
+    po_statuses = [status for status, _ in PurchaseOrder.STATUS_CHOICES]
+    so_statuses = [status for status, _ in SalesOrder.STATUS_CHOICES]
+    PurchaseOrder.objects.bulk_create([
+        PurchaseOrder(po_number=f"PLAN-{token}-{i}", supplier=supplier,
+                      warehouse=warehouses[i % len(warehouses)],
+                      status=po_statuses[i % len(po_statuses)])
+        for i in range(rows)
+    ], batch_size=1000)
+    SalesOrder.objects.bulk_create([
+        SalesOrder(order_number=f"PLAN-{token}-{i}", customer=customer,
+                   warehouse=warehouses[i % len(warehouses)],
+                   status=so_statuses[i % len(so_statuses)], shipping_address='-')
+        for i in range(rows)
+    ], batch_size=1000)
+
+    report = Report.objects.create(title=f"Plan {token}", report_type='INVENTORY',
+                                   created_by=users[0])
+    report_statuses = [status for status, _ in GeneratedReport.STATUS_CHOICES]
+    GeneratedReport.objects.bulk_create([
+        GeneratedReport(report=report, generated_by=users[i % len(users)],
+                        status=report_statuses[i % len(report_statuses)])
+        for i in range(rows)
+    ], batch_size=1000)
+    Activity.objects.bulk_create([
+        Activity(user=users[i % len(users)], action='VIEW')
+        for i in range(rows)
+    ], batch_size=1000)
+
+    cursor = InventoryMovement.objects.order_by('-created_at').values_list('created_at', flat=True)[0]
+    return users[0], products[0], warehouses[0], inventories[0], cursor
@@ -0,0 +1,44 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from users.models import UserProfile
+
+
+class QueryCountTestCase(APITestCase):
+    """
+    API tests that pin the number of queries an endpoint costs, so an
+    N+1 in a serializer or view fails the suite. Requests run as an
+    admin, which every permission class lets through.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='admin', is_staff=True, is_superuser=True)
+        UserProfile.objects.create(user=cls.user, role='ADMIN')
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def assertConstantQueries(self, request, seed, rows=3):
+        """
+        Seed rows, make the request and count its queries; then seed as
+        many rows again and assert the request costs the same. request is
+        made once first, so per-process caches are warm before counting.
+        Returns the last response.
+        """
+        seed(rows)
+        self.assertSuccess(request())
+        with CaptureQueriesContext(connection) as queries:
+            self.assertSuccess(request())
+
+        seed(rows)
+        with self.assertNumQueries(len(queries)):
+            response = request()
+        self.assertSuccess(response)
+        return response
+
+    def assertConstantGet(self, url, seed, rows=3):
+        return self.assertConstantQueries(lambda: self.client.get(url), seed, rows)
+
+    def assertSuccess(self, response):
+        self.assertLess(response.status_code, 300, getattr(response, 'data', response))
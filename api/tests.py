@@ -1,3 +1,22 @@
 from django.test import TestCase
+from . import query_plans
 
-# Create your tests here.
+
+class QueryPlanTests(TestCase):
+    """
+    The hot list and filter queries use an index on every large table
+    """
+    # Rows seeded into each large table; enough for the planner to prefer
+    # an index once statistics are refreshed
+    rows = 5000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixtures = query_plans.seed(cls.rows)
+        query_plans.analyze()
+
+    def test_no_sequential_scans_on_large_tables(self):
+        for name, queryset in query_plans.hot_queries(self.fixtures):
+            with self.subTest(name):
+                plan = queryset.explain()
+                self.assertEqual(query_plans.sequential_scans(plan), [], plan)
@@ -1,7 +1,7 @@
 
 # wms_project/inventory/admin.py
 from django.contrib import admin
-from .models import Category, Product, Inventory, InventoryMovement
+from .models import Category, Product, Inventory, InventoryMovement, DailyMovementRollup, HourlyMovementRollup
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -10,7 +10,7 @@ class CategoryAdmin(admin.ModelAdmin):
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ('name', 'sku', 'category', 'cost_price', 'selling_price', 'created_at')
+    list_display = ('name', 'sku', 'category', 'cost_price', 'selling_price', 'total_quantity', 'created_at')
     list_filter = ('category', 'created_at')
     search_fields = ('name', 'description', 'sku', 'barcode')
 
@@ -24,4 +24,16 @@ class InventoryAdmin(admin.ModelAdmin):
 class InventoryMovementAdmin(admin.ModelAdmin):
     list_display = ('inventory', 'movement_type', 'quantity', 'reference', 'created_by', 'created_at')
     list_filter = ('movement_type', 'created_at')
-    search_fields = ('inventory__product__name', 'reference', 'notes')
\ No newline at end of file
+    search_fields = ('inventory__product__name', 'reference', 'notes')
+
+@admin.register(DailyMovementRollup)
+class DailyMovementRollupAdmin(admin.ModelAdmin):
+    list_display = ('date', 'warehouse', 'product', 'movement_type', 'quantity', 'movement_count')
+    list_filter = ('movement_type', 'warehouse', 'date')
+    search_fields = ('product__name', 'product__sku')
+
+@admin.register(HourlyMovementRollup)
+class HourlyMovementRollupAdmin(admin.ModelAdmin):
+    list_display = ('hour', 'warehouse', 'user', 'movement_type', 'units', 'movement_count')
+    list_filter = ('movement_type', 'warehouse', 'hour')
+    search_fields = ('user__username',)
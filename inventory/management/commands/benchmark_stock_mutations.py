@@ -0,0 +1,117 @@
+import threading
+import time
+import uuid
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.utils import OperationalError
+from inventory import services
+from inventory.models import Product, Inventory, InventoryMovement
+from warehouse.models import Warehouse
+
+
+class Command(BaseCommand):
+    help = 'Hammer a single Inventory row from many threads and check that no update is lost'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--iterations', type=int, default=200,
+                            help='Add/remove pairs performed by each thread')
+        parser.add_argument('--initial-quantity', type=int, default=0)
+        parser.add_argument('--mode', choices=['atomic', 'legacy'], default='atomic',
+                            help='"legacy" replays the old read-modify-write save() path for comparison')
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep the benchmark product, warehouse and movements afterwards')
+
+    def handle(self, *args, **options):
+        warehouse, product, inventory = self.create_fixtures(options['initial_quantity'])
+        counters = {'added': 0, 'removed': 0, 'rejected': 0, 'errors': 0}
+        lock = threading.Lock()
+
+        worker = self.atomic_worker if options['mode'] == 'atomic' else self.legacy_worker
+
+        def run():
+            local = dict.fromkeys(counters, 0)
+            try:
+                for _ in range(options['iterations']):
+                    worker(inventory.id, local)
+            finally:
+                connection.close()
+                with lock:
+                    for key, value in local.items():
+                        counters[key] += value
+
+        threads = [threading.Thread(target=run) for _ in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        final_quantity = Inventory.objects.values_list('quantity', flat=True).get(pk=inventory.id)
+        expected = options['initial_quantity'] + counters['added'] - counters['removed']
+        movements = InventoryMovement.objects.filter(inventory_id=inventory.id).count()
+        operations = counters['added'] + counters['removed'] + counters['rejected']
+
+        self.stdout.write(f"Mode:              {options['mode']}")
+        self.stdout.write(f"Threads:           {options['threads']} x {options['iterations']} iterations")
+        self.stdout.write(f"Elapsed:           {elapsed:.3f}s ({operations / elapsed:.0f} ops/s)")
+        self.stdout.write(f"Units added:       {counters['added']}")
+        self.stdout.write(f"Units removed:     {counters['removed']}")
+        self.stdout.write(f"Rejected removals: {counters['rejected']}")
+        self.stdout.write(f"Database errors:   {counters['errors']}")
+        self.stdout.write(f"Movements written: {movements}")
+        self.stdout.write(f"Final quantity:    {final_quantity} (expected {expected})")
+
+        if not options['keep']:
+            product.delete()
+            warehouse.delete()
+
+        if final_quantity != expected or final_quantity < 0:
+            raise CommandError(f"Lost updates detected: {final_quantity} != {expected}")
+        self.stdout.write(self.style.SUCCESS('No lost updates'))
+
+    def create_fixtures(self, initial_quantity):
+        token = uuid.uuid4().hex[:8]
+        warehouse = Warehouse.objects.create(
+            name=f"Benchmark {token}", address='-', city='-', state='-',
+            country='-', postal_code='-'
+        )
+        product = Product.objects.create(
+            name=f"Benchmark {token}", sku=f"BENCH-{token}",
+            cost_price=1, selling_price=1
+        )
+        inventory = Inventory.objects.create(
+            product=product, warehouse=warehouse, quantity=initial_quantity
+        )
+        return warehouse, product, inventory
+
+    def atomic_worker(self, inventory_id, counters):
+        try:
+            services.add_stock(inventory_id, 2, reference='benchmark')
+            counters['added'] += 2
+            services.remove_stock(inventory_id, 1, reference='benchmark')
+            counters['removed'] += 1
+        except services.InsufficientStock:
+            counters['rejected'] += 1
+        except OperationalError:
+            counters['errors'] += 1
+
+    def legacy_worker(self, inventory_id, counters):
+        try:
+            for quantity in (2, -1):
+                inventory = Inventory.objects.get(pk=inventory_id)
+                if inventory.quantity + quantity < 0:
+                    counters['rejected'] += 1
+                    continue
+                inventory.quantity += quantity
+                inventory.save()
+                InventoryMovement.objects.create(
+                    inventory=inventory,
+                    movement_type='IN' if quantity > 0 else 'OUT',
+                    quantity=abs(quantity),
+                    reference='benchmark'
+                )
+                counters['added' if quantity > 0 else 'removed'] += abs(quantity)
+        except OperationalError:
+            counters['errors'] += 1
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce
+from inventory.models import Product
+from inventory.services import refresh_product_totals
+
+
+class Command(BaseCommand):
+    help = 'Rebuild Product.total_quantity from the inventory rows, or verify it with --verify'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true',
+                            help='Only report products whose stored total is out of date')
+
+    def handle(self, *args, **options):
+        mismatches = (Product.objects
+                      .annotate(actual=Coalesce(Sum('inventory__quantity'), 0))
+                      .exclude(total_quantity=F('actual'))
+                      .values_list('pk', 'sku', 'total_quantity', 'actual'))
+
+        if options['verify']:
+            count = 0
+            for pk, sku, stored, actual in mismatches.iterator():
+                count += 1
+                self.stdout.write(f"Product {pk} ({sku}): stored {stored}, actual {actual}")
+            if count:
+                raise CommandError(f"{count} product total(s) out of date")
+            self.stdout.write(self.style.SUCCESS('All product totals match their inventory rows'))
+            return
+
+        stale = mismatches.count()
+        refresh_product_totals()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt product totals ({stale} were out of date)"))
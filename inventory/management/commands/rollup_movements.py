@@ -0,0 +1,57 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from inventory import rollups
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f"Invalid date: {value} (expected YYYY-MM-DD)")
+
+
+class Command(BaseCommand):
+    help = 'Maintain the daily and hourly inventory movement rollups: fold new movements, backfill or verify'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backfill', action='store_true',
+                            help='Rebuild the rollup instead of folding new movements')
+        parser.add_argument('--verify', action='store_true',
+                            help='Compare the rollup with the movements it was built from')
+        parser.add_argument('--repair', action='store_true',
+                            help='With --verify, backfill the days that do not match')
+        parser.add_argument('--start', type=parse_date, help='First day (YYYY-MM-DD) to backfill or verify')
+        parser.add_argument('--end', type=parse_date, help='Last day (YYYY-MM-DD) to backfill or verify')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Movement ids folded per transaction')
+
+    def handle(self, *args, **options):
+        start, end = options['start'], options['end']
+
+        if options['backfill']:
+            written = rollups.backfill(start, end)
+            self.stdout.write(f"Wrote {written} rollup rows; {self.watermarks()}")
+            return
+
+        if options['verify']:
+            mismatches = rollups.verify(start, end)
+            for name, (day, warehouse_id, movement_type), expected, actual in mismatches:
+                self.stdout.write(f"{name} {day} warehouse {warehouse_id} {movement_type}: "
+                                  f"movements {expected[0]} ({expected[1]}), rollup {actual[0]} ({actual[1]})")
+            if not mismatches:
+                self.stdout.write(self.style.SUCCESS(f"Rollups match the movements; {self.watermarks()}"))
+                return
+            if not options['repair']:
+                raise CommandError(f"{len(mismatches)} rollup totals do not match the movements")
+
+            days = sorted({key[0] for _, key, _, _ in mismatches})
+            for day in days:
+                rollups.backfill(day, day)
+            self.stdout.write(f"Rebuilt the rollups of {len(days)} days")
+            return
+
+        folded = rollups.roll_up(options['batch_size'])
+        self.stdout.write(f"Folded {folded} movements; {self.watermarks()}")
+
+    def watermarks(self):
+        return ', '.join(f"{rollup.name} up to movement {rollups.watermark(rollup)}" for rollup in rollups.ROLLUPS)
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-18 02:57
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def populate_total_quantity(apps, schema_editor):
+    Product = apps.get_model('inventory', 'Product')
+    Inventory = apps.get_model('inventory', 'Inventory')
+    totals = (Inventory.objects
+              .filter(product=OuterRef('pk'))
+              .order_by()
+              .values('product')
+              .annotate(total=Sum('quantity'))
+              .values('total'))
+    Product.objects.update(total_quantity=Coalesce(Subquery(totals), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='total_quantity',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_total_quantity, migrations.RunPython.noop),
+    ]
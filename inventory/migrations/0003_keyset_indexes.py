@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_product_total_quantity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventorymovement',
+            index=models.Index(fields=['created_at', 'id'], name='inv_movement_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:03
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+
+
+def merge_duplicate_inventory(apps, schema_editor):
+    """
+    Fold duplicate (product, warehouse) rows into the oldest one so the
+    unique constraint can be added; movements follow the surviving row
+    """
+    Inventory = apps.get_model('inventory', 'Inventory')
+    InventoryMovement = apps.get_model('inventory', 'InventoryMovement')
+    duplicates = (Inventory.objects
+                  .values('product', 'warehouse')
+                  .annotate(rows=Count('id'))
+                  .filter(rows__gt=1))
+    for group in duplicates:
+        rows = Inventory.objects.filter(product=group['product'], warehouse=group['warehouse'])
+        keep = rows.order_by('id').first()
+        merged = rows.aggregate(quantity=Sum('quantity'), last_restock_date=Max('last_restock_date'))
+        others = rows.exclude(pk=keep.pk)
+        InventoryMovement.objects.filter(inventory__in=others).update(inventory=keep)
+        others.delete()
+        rows.filter(pk=keep.pk).update(**merged)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_keyset_indexes'),
+        ('warehouse', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventorymovement',
+            index=models.Index(fields=['inventory', 'created_at'], name='inv_movement_inv_created_idx'),
+        ),
+        migrations.RunPython(merge_duplicate_inventory, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='inventory',
+            constraint=models.UniqueConstraint(fields=('product', 'warehouse'), name='unique_inventory_product_warehouse'),
+        ),
+    ]
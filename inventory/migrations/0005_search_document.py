@@ -0,0 +1,58 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:06
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+# GIN indexes over to_tsvector('simple', search_document); SQLite gets FTS5
+# tables instead, installed after migrate by inventory.signals
+SEARCH_INDEXES = (
+    ('product', 'product_search_gin'),
+    ('inventorymovement', 'inv_movement_search_gin'),
+)
+
+
+def search_indexes():
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+
+    return [(model_name, GinIndex(SearchVector('search_document', config='simple'), name=name))
+            for model_name, name in SEARCH_INDEXES]
+
+
+def add_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, index in search_indexes():
+        schema_editor.add_index(apps.get_model('inventory', model_name), index)
+
+
+def remove_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, index in search_indexes():
+        schema_editor.remove_index(apps.get_model('inventory', model_name), index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventorymovement',
+            name='search_document',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Concat('reference', models.Value(' '), 'notes', output_field=models.TextField()), output_field=models.TextField()),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='search_document',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Concat('name', models.Value(' '), 'description', models.Value(' '), 'sku', models.Value(' '), 'barcode', output_field=models.TextField()), output_field=models.TextField()),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['barcode'], name='product_barcode_idx'),
+        ),
+        migrations.RunPython(add_search_indexes, remove_search_indexes),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_search_document'),
+        ('warehouse', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyMovementRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('movement_type', models.CharField(choices=[('IN', 'Inbound'), ('OUT', 'Outbound'), ('RETURN', 'Return'), ('ADJUSTMENT', 'Adjustment'), ('TRANSFER', 'Transfer')], max_length=20)),
+                ('quantity', models.BigIntegerField(default=0)),
+                ('movement_count', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movement_rollups', to='inventory.product')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movement_rollups', to='warehouse.warehouse')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'date'], name='movement_rollup_product_idx')],
+                'constraints': [models.UniqueConstraint(fields=('date', 'warehouse', 'product', 'movement_type'), name='unique_movement_rollup_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_movement_rollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventorymovement',
+            index=models.Index(fields=['reference'], name='inv_movement_reference_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-18 04:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_movement_reference_index'),
+        ('warehouse', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HourlyMovementRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('movement_type', models.CharField(choices=[('IN', 'Inbound'), ('OUT', 'Outbound'), ('RETURN', 'Return'), ('ADJUSTMENT', 'Adjustment'), ('TRANSFER', 'Transfer')], max_length=20)),
+                ('units', models.BigIntegerField(default=0)),
+                ('movement_count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='hourly_movement_rollups', to=settings.AUTH_USER_MODEL)),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_movement_rollups', to='warehouse.warehouse')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'hour'], name='hourly_rollup_user_idx')],
+                'constraints': [models.UniqueConstraint(fields=('hour', 'warehouse', 'user', 'movement_type'), name='unique_hourly_rollup_key')],
+            },
+        ),
+    ]
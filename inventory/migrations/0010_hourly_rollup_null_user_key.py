@@ -0,0 +1,48 @@
+# Generated by Django 5.1.7 on 2026-10-18 04:52
+
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def merge_null_user_duplicates(apps, schema_editor):
+    """
+    Fold duplicate rows without a user, which the old constraint let
+    through, into the oldest one so the new key can be added
+    """
+    HourlyMovementRollup = apps.get_model('inventory', 'HourlyMovementRollup')
+    duplicates = (HourlyMovementRollup.objects
+                  .filter(user__isnull=True)
+                  .values('hour', 'warehouse', 'movement_type')
+                  .annotate(rows=Count('id'))
+                  .filter(rows__gt=1))
+    for group in duplicates:
+        rows = HourlyMovementRollup.objects.filter(user__isnull=True, hour=group['hour'],
+                                                   warehouse=group['warehouse'],
+                                                   movement_type=group['movement_type'])
+        keep = rows.order_by('id').first()
+        merged = rows.aggregate(units=Sum('units'), movement_count=Sum('movement_count'))
+        rows.exclude(pk=keep.pk).delete()
+        rows.filter(pk=keep.pk).update(**merged)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_updated_at_indexes'),
+        ('warehouse', '0002_updated_at_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='hourlymovementrollup',
+            name='unique_hourly_rollup_key',
+        ),
+        migrations.RunPython(merge_null_user_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='hourlymovementrollup',
+            constraint=models.UniqueConstraint(models.F('hour'), models.F('warehouse'), django.db.models.functions.comparison.Coalesce(models.F('user'), models.Value(0)), models.F('movement_type'), name='unique_hourly_rollup_key'),
+        ),
+    ]
@@ -1,6 +1,24 @@
 from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, Concat
 from django.utils import timezone
 
+
+def search_document(*fields):
+    """
+    Stored column holding `fields` joined by spaces, computed by the
+    database on every write. inventory.search builds its full-text index
+    over it.
+    """
+    parts = []
+    for field in fields:
+        parts += [field, Value(' ')]
+    return models.GeneratedField(
+        expression=Concat(*parts[:-1], output_field=models.TextField()),
+        output_field=models.TextField(),
+        db_persist=True
+    )
+
 class Category(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True, null=True)
@@ -12,6 +30,10 @@ class Category(models.Model):
 
     class Meta:
         verbose_name_plural = "Categories"
+        indexes = [
+            # Latest change of the data watermark of cached reports
+            models.Index(fields=['updated_at'], name='category_updated_idx'),
+        ]
 
 class Product(models.Model):
     name = models.CharField(max_length=200)
@@ -25,13 +47,25 @@ class Product(models.Model):
     length = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
     cost_price = models.DecimalField(max_digits=10, decimal_places=2)
     selling_price = models.DecimalField(max_digits=10, decimal_places=2)
+    # Sum of Inventory.quantity across warehouses, maintained by
+    # inventory.services and inventory.signals
+    total_quantity = models.IntegerField(default=0, editable=False)
     image = models.ImageField(upload_to='products/', blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    search_document = search_document('name', 'description', 'sku', 'barcode')
 
     def __str__(self):
         return self.name
 
+    class Meta:
+        indexes = [
+            # Exact-match fast path for scanned barcodes
+            models.Index(fields=['barcode'], name='product_barcode_idx'),
+            # Latest change of the data watermark of cached reports
+            models.Index(fields=['updated_at'], name='product_updated_idx'),
+        ]
+
 class Inventory(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='inventory')
     warehouse = models.ForeignKey('warehouse.Warehouse', on_delete=models.CASCADE, related_name='inventory')
@@ -48,6 +82,16 @@ class Inventory(models.Model):
 
     class Meta:
         verbose_name_plural = "Inventories"
+        constraints = [
+            # One stock row per product and warehouse; also serves lookups
+            # by product
+            models.UniqueConstraint(fields=['product', 'warehouse'],
+                                    name='unique_inventory_product_warehouse'),
+        ]
+        indexes = [
+            # Latest change of the data watermark of cached reports
+            models.Index(fields=['updated_at'], name='inventory_updated_idx'),
+        ]
 
 class InventoryMovement(models.Model):
     TYPE_CHOICES = (
@@ -65,10 +109,89 @@ class InventoryMovement(models.Model):
     notes = models.TextField(blank=True, null=True)
     created_by = models.ForeignKey('auth.User', on_delete=models.SET_NULL, null=True, related_name='inventory_movements')
     created_at = models.DateTimeField(auto_now_add=True)
+    search_document = search_document('reference', 'notes')
 
     def __str__(self):
         return f"{self.get_movement_type_display()} - {self.inventory.product.name}"
 
+    class Meta:
+        indexes = [
+            # Keyset for paging the movement ledger
+            models.Index(fields=['created_at', 'id'], name='inv_movement_created_id_idx'),
+            # Movement history of a single inventory row
+            models.Index(fields=['inventory', 'created_at'], name='inv_movement_inv_created_idx'),
+            # Movements booked against one document, e.g. a purchase order
+            models.Index(fields=['reference'], name='inv_movement_reference_idx'),
+        ]
+
+class DailyMovementRollup(models.Model):
+    """
+    Movements summed per day, warehouse, product and movement type.
+    Maintained by inventory.rollups from the movement id watermark, so
+    historical reports read one row per key and day instead of every
+    movement.
+    """
+    date = models.DateField()
+    warehouse = models.ForeignKey('warehouse.Warehouse', on_delete=models.CASCADE, related_name='movement_rollups')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='movement_rollups')
+    movement_type = models.CharField(max_length=20, choices=InventoryMovement.TYPE_CHOICES)
+    quantity = models.BigIntegerField(default=0)
+    movement_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.date} {self.movement_type} - {self.product_id}@{self.warehouse_id}: {self.quantity}"
+
+    class Meta:
+        constraints = [
+            # The rollup key; also serves date range scans
+            models.UniqueConstraint(fields=['date', 'warehouse', 'product', 'movement_type'],
+                                    name='unique_movement_rollup_key'),
+        ]
+        indexes = [
+            # Product history across dates
+            models.Index(fields=['product', 'date'], name='movement_rollup_product_idx'),
+        ]
+
+class HourlyMovementRollup(models.Model):
+    """
+    Movements per hour, warehouse, user and movement type: the lines
+    booked and the units they moved, whatever the sign. Maintained by
+    inventory.rollups under its own watermark, for throughput reports.
+    """
+    hour = models.DateTimeField()
+    warehouse = models.ForeignKey('warehouse.Warehouse', on_delete=models.CASCADE, related_name='hourly_movement_rollups')
+    user = models.ForeignKey('auth.User', on_delete=models.SET_NULL, null=True, related_name='hourly_movement_rollups')
+    movement_type = models.CharField(max_length=20, choices=InventoryMovement.TYPE_CHOICES)
+    units = models.BigIntegerField(default=0)
+    movement_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.hour} {self.movement_type} - {self.user_id}@{self.warehouse_id}: {self.movement_count}"
+
+    class Meta:
+        constraints = [
+            # The rollup key; also serves hour range scans. Movements
+            # without a user share the 0 sentinel, since NULLs never
+            # collide in a unique index
+            models.UniqueConstraint(F('hour'), F('warehouse'), Coalesce(F('user'), Value(0)), F('movement_type'),
+                                    name='unique_hourly_rollup_key'),
+        ]
+        indexes = [
+            # A user's history across hours
+            models.Index(fields=['user', 'hour'], name='hourly_rollup_user_idx'),
+        ]
+
+class RollupWatermark(models.Model):
+    """
+    Highest source row id folded into a rollup table
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.last_id}"
+
 class StockMovement(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_movements')
     quantity = models.IntegerField()
@@ -0,0 +1,232 @@
+import logging
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import Abs, TruncDate, TruncHour
+from django.utils import timezone
+from .models import DailyMovementRollup, HourlyMovementRollup, InventoryMovement, RollupWatermark
+
+logger = logging.getLogger(__name__)
+
+# Rows written or compared per statement
+BATCH_SIZE = 2000
+
+# Granularity of verify(); finer than a day so a drift is easy to locate
+VERIFY_FIELDS = ('date', 'warehouse_id', 'movement_type')
+
+
+class Rollup:
+    """
+    How movements fold into one rollup table: movements are grouped in
+    SQL by a truncated created_at (period) and dimensions, and each group
+    adds its total and movement count to the row with the same key. Every
+    rollup keeps its own watermark, so a newly added one catches up on
+    its own.
+    """
+    def __init__(self, name, model, period, bucket, dimensions, total_field, total, match):
+        self.name = name
+        self.model = model
+        # Rollup field holding the period, and the movement expression for it
+        self.period = period
+        self.bucket = bucket
+        # Rollup field: movement expression
+        self.dimensions = dimensions
+        # Rollup field summing the movements, and the aggregate filling it
+        self.total_field = total_field
+        self.total = total
+        # Fields narrowing the existing rows fetched when merging a batch
+        self.match = match
+        self.key = (period, *dimensions, 'movement_type')
+
+    def groups(self, movements):
+        """
+        Movements grouped by rollup key in SQL, as values rows with their
+        total and movement_count
+        """
+        return (movements.order_by()
+                .values('movement_type', **{self.period: self.bucket('created_at')}, **self.dimensions)
+                .annotate(total=self.total, movement_count=Count('id')))
+
+    def row(self, group):
+        return self.model(**{field: group[field] for field in self.key},
+                          **{self.total_field: group['total']},
+                          movement_count=group['movement_count'])
+
+    def in_days(self, queryset, start, end):
+        return _in_days(queryset, start, end, self.period, dates=self.bucket is TruncDate)
+
+
+DAILY = Rollup(
+    'daily_movements', DailyMovementRollup, 'date', TruncDate,
+    {'warehouse_id': F('inventory__warehouse_id'), 'product_id': F('inventory__product_id')},
+    'quantity', Sum('quantity'), ('date', 'product_id'),
+)
+HOURLY = Rollup(
+    'hourly_movements', HourlyMovementRollup, 'hour', TruncHour,
+    {'warehouse_id': F('inventory__warehouse_id'), 'user_id': F('created_by_id')},
+    'units', Sum(Abs('quantity')), ('hour', 'warehouse_id'),
+)
+ROLLUPS = (DAILY, HOURLY)
+
+
+def watermark(rollup=DAILY):
+    return RollupWatermark.objects.get_or_create(name=rollup.name)[0].last_id
+
+
+def roll_up(batch_size=None):
+    """
+    Fold movements past each rollup's watermark into it, batch_size ids
+    at a time, until caught up. Only movements older than
+    MOVEMENT_ROLLUP_LAG are folded, so rows from transactions still in
+    flight with lower ids are not skipped. Returns the number of
+    movements folded into the daily rollup.
+    """
+    batch_size = batch_size or settings.MOVEMENT_ROLLUP_BATCH_SIZE
+    folded = {}
+
+    for rollup in ROLLUPS:
+        folded[rollup.name] = 0
+        while True:
+            with transaction.atomic():
+                state = _lock_watermark(rollup)
+                upper = _safe_upper_id(state.last_id)
+                if upper is None:
+                    break
+                upper = min(upper, state.last_id + batch_size)
+
+                movements = InventoryMovement.objects.filter(id__gt=state.last_id, id__lte=upper)
+                folded[rollup.name] += _merge(rollup, list(rollup.groups(movements)))
+                state.last_id = upper
+                state.save()
+
+        if folded[rollup.name]:
+            logger.info('Folded %s movements into %s', folded[rollup.name], rollup.name)
+    return folded[DAILY.name]
+
+
+def backfill(start=None, end=None):
+    """
+    Rebuild every rollup over days start..end (default: every day) from
+    the movements up to its watermark. A full backfill first moves the
+    watermark to the newest movement old enough to fold. Returns the
+    number of rollup rows written.
+    """
+    written = 0
+    for rollup in ROLLUPS:
+        with transaction.atomic():
+            state = _lock_watermark(rollup)
+            if start is None and end is None:
+                state.last_id = _safe_upper_id(state.last_id) or state.last_id
+                state.save()
+
+            rollup.in_days(rollup.model.objects.all(), start, end).delete()
+            movements = _in_days(InventoryMovement.objects.filter(id__lte=state.last_id), start, end)
+
+            batch = []
+            for group in rollup.groups(movements).iterator(chunk_size=BATCH_SIZE):
+                batch.append(rollup.row(group))
+                if len(batch) >= BATCH_SIZE:
+                    written += len(rollup.model.objects.bulk_create(batch))
+                    batch = []
+            written += len(rollup.model.objects.bulk_create(batch))
+
+    logger.info('Backfilled %s movement rollup rows', written)
+    return written
+
+
+def verify(start=None, end=None):
+    """
+    Compare every rollup's totals per day, warehouse and movement type
+    with the movements up to its watermark, which catches movements
+    edited or deleted after they were folded. Returns the mismatches as
+    sorted (rollup name, key, (total, count) from movements, (total,
+    count) in rollup).
+    """
+    mismatches = []
+    for rollup in ROLLUPS:
+        with transaction.atomic():
+            state = _lock_watermark(rollup)
+            movements = _in_days(InventoryMovement.objects.filter(id__lte=state.last_id), start, end)
+            expected = {
+                tuple(row[field] for field in VERIFY_FIELDS): (row['total'], row['movement_count'])
+                for row in (movements.order_by()
+                            .values('movement_type', date=TruncDate('created_at'),
+                                    warehouse_id=F('inventory__warehouse_id'))
+                            .annotate(total=rollup.total, movement_count=Count('id')))
+            }
+            # Hourly rows are summed up to their day
+            day = {} if rollup.period == 'date' else {'date': TruncDate(rollup.period)}
+            actual = {
+                tuple(row[field] for field in VERIFY_FIELDS): (row['total'], row['movement_count'])
+                for row in (rollup.in_days(rollup.model.objects.all(), start, end)
+                            .order_by().values(*VERIFY_FIELDS[len(day):], **day)
+                            .annotate(total=Sum(rollup.total_field), movement_count=Sum('movement_count')))
+            }
+
+        mismatches += [(rollup.name, key, expected.get(key, (0, 0)), actual.get(key, (0, 0)))
+                       for key in expected.keys() | actual.keys()
+                       if expected.get(key) != actual.get(key)]
+    return sorted(mismatches)
+
+
+def _lock_watermark(rollup):
+    RollupWatermark.objects.get_or_create(name=rollup.name)
+    return RollupWatermark.objects.select_for_update().get(name=rollup.name)
+
+
+def _safe_upper_id(after_id):
+    cutoff = timezone.now() - timedelta(seconds=settings.MOVEMENT_ROLLUP_LAG)
+    return (InventoryMovement.objects
+            .filter(id__gt=after_id, created_at__lt=cutoff)
+            .aggregate(upper=Max('id'))['upper'])
+
+
+def _merge(rollup, groups):
+    """
+    Add grouped movements to the existing rollup rows, creating missing
+    ones. The caller holds the watermark lock, so nothing else writes the
+    rollup meanwhile.
+    """
+    for start in range(0, len(groups), BATCH_SIZE):
+        chunk = groups[start:start + BATCH_SIZE]
+        existing = {
+            tuple(getattr(row, field) for field in rollup.key): row
+            for row in rollup.model.objects.filter(**{
+                f"{field}__in": {group[field] for group in chunk} for field in rollup.match
+            })
+        }
+
+        created, updated = [], []
+        for group in chunk:
+            row = existing.get(tuple(group[field] for field in rollup.key))
+            if row is None:
+                created.append(rollup.row(group))
+            else:
+                setattr(row, rollup.total_field, getattr(row, rollup.total_field) + group['total'])
+                row.movement_count += group['movement_count']
+                updated.append(row)
+
+        rollup.model.objects.bulk_create(created)
+        rollup.model.objects.bulk_update(updated, [rollup.total_field, 'movement_count'])
+
+    return sum(group['movement_count'] for group in groups)
+
+
+def _in_days(queryset, start, end, field='created_at', dates=False):
+    """
+    Limit to days start..end, inclusive. Datetime fields are bounded on
+    the field itself so their indexes apply.
+    """
+    if dates:
+        if start:
+            queryset = queryset.filter(**{f"{field}__gte": start})
+        if end:
+            queryset = queryset.filter(**{f"{field}__lte": end})
+        return queryset
+
+    if start:
+        queryset = queryset.filter(**{f"{field}__gte": timezone.make_aware(datetime.combine(start, time.min))})
+    if end:
+        queryset = queryset.filter(**{f"{field}__lt": timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min))})
+    return queryset
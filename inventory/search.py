@@ -0,0 +1,226 @@
+import re
+from functools import lru_cache, reduce
+from operator import or_
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from django.db.models import F, Q, GeneratedField
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+from rest_framework import filters
+
+SEARCH_DOCUMENT = 'search_document'
+
+
+def search_tokens(term):
+    """
+    Split a search term into the lower-cased words matched as prefixes
+    """
+    return re.findall(r'\w+', term.lower())
+
+
+def document_fields(model):
+    """
+    Names of the columns a model concatenates into its search document,
+    or an empty tuple if the model is not full-text indexed
+    """
+    try:
+        field = model._meta.get_field(SEARCH_DOCUMENT)
+    except FieldDoesNotExist:
+        return ()
+    if not isinstance(field, GeneratedField):
+        return ()
+    return tuple(e.name for e in field.expression.flatten() if isinstance(e, F))
+
+
+def searchable_models():
+    return [model for model in apps.get_models() if document_fields(model)]
+
+
+class SearchBackend:
+    """
+    Match a model's search document against one search term, every word
+    of the term being a prefix. This base class is the substring fallback
+    for databases without a full-text index.
+    """
+    def match(self, queryset, term):
+        tokens = search_tokens(term)
+        if not tokens:
+            return queryset.none()
+        for token in tokens:
+            queryset = queryset.filter(**{f'{SEARCH_DOCUMENT}__icontains': token})
+        return queryset
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    tsvector match served by the GIN index on
+    to_tsvector('simple', search_document)
+    """
+    config = 'simple'
+
+    def match(self, queryset, term):
+        from django.contrib.postgres.search import SearchQuery
+
+        tokens = search_tokens(term)
+        if not tokens:
+            return queryset.none()
+        query = SearchQuery(' & '.join(f'{token}:*' for token in tokens),
+                            config=self.config, search_type='raw')
+        return queryset.alias(search_vector=search_vector()).filter(search_vector=query)
+
+
+class SqliteSearchBackend(SearchBackend):
+    """
+    FTS5 match against the external-content table kept in step with the
+    model table by triggers (see install_sqlite_fts)
+    """
+    def match(self, queryset, term):
+        tokens = search_tokens(term)
+        if not tokens:
+            return queryset.none()
+        table = fts_table(queryset.model)
+        query = ' AND '.join(f'"{token}"*' for token in tokens)
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {table} WHERE {table} MATCH %s', [query]
+        ))
+
+
+BACKENDS = {
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SqliteSearchBackend,
+}
+
+
+@lru_cache(maxsize=None)
+def get_search_backend(vendor):
+    """
+    The SEARCH_BACKEND setting (a dotted path) wins; otherwise the backend
+    is picked from the database vendor
+    """
+    backend = getattr(settings, 'SEARCH_BACKEND', None)
+    if backend:
+        return import_string(backend)()
+    return BACKENDS.get(vendor, SearchBackend)()
+
+
+def search(queryset, term):
+    """
+    Filter a queryset of a searchable model down to documents matching term
+    """
+    return get_search_backend(connections[queryset.db].vendor).match(queryset, term)
+
+
+def search_vector():
+    from django.contrib.postgres.search import SearchVector
+
+    return SearchVector(SEARCH_DOCUMENT, config=PostgresSearchBackend.config)
+
+
+def fts_table(model):
+    return f'{model._meta.db_table}_fts'
+
+
+def install_sqlite_fts(connection):
+    """
+    Create the FTS5 tables and their sync triggers where missing. SQLite
+    drops triggers whenever a migration rebuilds the underlying table, so
+    this runs after every migrate and rebuilds any index it had to
+    (re)create.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        existing = {row[0] for row in cursor.fetchall()}
+
+        for model in searchable_models():
+            table = model._meta.db_table
+            fts = fts_table(model)
+            if table not in existing:
+                continue
+            columns = [column.name for column in connection.introspection.get_table_description(cursor, table)]
+            if SEARCH_DOCUMENT not in columns:
+                continue
+            if {fts, f'{fts}_insert', f'{fts}_delete', f'{fts}_update'} <= existing:
+                continue
+
+            sources = ', '.join(model._meta.get_field(name).column for name in document_fields(model))
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+                f"{SEARCH_DOCUMENT}, content='{table}', content_rowid='id')"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO {fts}(rowid, {SEARCH_DOCUMENT}) VALUES (new.id, new.{SEARCH_DOCUMENT}); "
+                f"END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {SEARCH_DOCUMENT}) "
+                f"VALUES ('delete', old.id, old.{SEARCH_DOCUMENT}); "
+                f"END"
+            )
+            # Only edits of the indexed columns touch the index, not e.g.
+            # quantity updates
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {sources} ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {SEARCH_DOCUMENT}) "
+                f"VALUES ('delete', old.id, old.{SEARCH_DOCUMENT}); "
+                f"INSERT INTO {fts}(rowid, {SEARCH_DOCUMENT}) VALUES (new.id, new.{SEARCH_DOCUMENT}); "
+                f"END"
+            )
+            cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter that serves the view's `search_fields` from full-text
+    indexes. Fields that are part of a model's search document (local or
+    across relations) are matched as word prefixes through the search
+    backend; other fields fall back to icontains, related ones through an
+    id subquery. Fields listed in the view's `search_exact_fields` are
+    tried first for single-term searches, e.g. a scanned SKU or barcode.
+    Like SearchFilter, every term must match at least one field.
+    """
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+        if not search_fields or not search_terms:
+            return queryset
+
+        exact_fields = getattr(view, 'search_exact_fields', ())
+        if exact_fields and len(search_terms) == 1:
+            exact = queryset.filter(reduce(or_, [Q(**{field: search_terms[0]}) for field in exact_fields]))
+            if exact.exists():
+                return exact
+
+        for term in search_terms:
+            queryset = queryset.filter(self.term_condition(queryset.model, search_fields, term))
+        return queryset
+
+    def term_condition(self, model, search_fields, term):
+        conditions = []
+        searched = set()
+
+        for search_field in search_fields:
+            *relations, field_name = search_field.split('__')
+            prefix = '__'.join(relations)
+            related_model = model
+            for relation in relations:
+                related_model = related_model._meta.get_field(relation).related_model
+
+            if field_name in document_fields(related_model):
+                # One document match covers every indexed field of the model
+                if prefix in searched:
+                    continue
+                searched.add(prefix)
+                matches = search(related_model._default_manager.all(), term).values('pk')
+            elif not prefix:
+                conditions.append(Q(**{f'{field_name}__icontains': term}))
+                continue
+            else:
+                matches = related_model._default_manager.filter(**{f'{field_name}__icontains': term}).values('pk')
+
+            conditions.append(Q(**{f'{prefix}__in' if prefix else 'pk__in': matches}))
+
+        return reduce(or_, conditions)
@@ -8,16 +8,13 @@ class CategorySerializer(serializers.ModelSerializer):
 
 class ProductSerializer(serializers.ModelSerializer):
     category_name = serializers.ReadOnlyField(source='category.name')
-    total_quantity = serializers.SerializerMethodField()
     
     class Meta:
         model = Product
         fields = ['id', 'name', 'description', 'category', 'category_name', 'sku', 'barcode',
                   'weight', 'height', 'width', 'length', 'cost_price', 'selling_price',
                   'image', 'total_quantity', 'created_at', 'updated_at']
-    
-    def get_total_quantity(self, obj):
-        return sum(inv.quantity for inv in obj.inventory.all())
+        read_only_fields = ['total_quantity']
 
 class InventorySerializer(serializers.ModelSerializer):
     product_name = serializers.ReadOnlyField(source='product.name')
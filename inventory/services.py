@@ -0,0 +1,343 @@
+from django.db import transaction
+from django.db.models import (F, Q, Case, When, Value, IntegerField, DateTimeField,
+                              OuterRef, Subquery, Sum)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import Product, Inventory, InventoryMovement
+
+# Sign applied to the quantity of each movement type; adjustments carry
+# their own sign
+MOVEMENT_DIRECTIONS = {
+    'IN': 1,
+    'RETURN': 1,
+    'OUT': -1,
+    'ADJUSTMENT': None,
+}
+
+# Number of rows touched by a single CASE-based UPDATE or INSERT
+BULK_BATCH_SIZE = 1000
+
+# Number of (product, warehouse) conditions ORed into one locking query;
+# SQLite rejects expressions nested deeper than 1000
+LOCK_BATCH_SIZE = 500
+
+
+class StockError(Exception):
+    """
+    Base class for errors raised while mutating stock levels
+    """
+
+
+class InsufficientStock(StockError):
+    """
+    Raised when a removal would take an inventory row below zero
+    """
+    def __init__(self, inventory_id, available, required):
+        self.inventory_id = inventory_id
+        self.available = available
+        self.required = required
+        super().__init__('Insufficient inventory')
+
+
+def add_stock(inventory_id, quantity, user=None, reference='', notes='', movement_type='IN'):
+    """
+    Atomically add stock to an inventory row and record the movement.
+    Returns a (new_quantity, movement) tuple.
+    """
+    return _mutate_stock(inventory_id, quantity, movement_type, user, reference, notes)
+
+
+def remove_stock(inventory_id, quantity, user=None, reference='', notes='', movement_type='OUT'):
+    """
+    Atomically remove stock from an inventory row and record the movement.
+    Raises InsufficientStock instead of letting the quantity go negative.
+    Returns a (new_quantity, movement) tuple.
+    """
+    return _mutate_stock(inventory_id, -quantity, movement_type, user, reference, notes)
+
+
+def _mutate_stock(inventory_id, delta, movement_type, user, reference, notes):
+    """
+    Apply a signed delta with a single conditional UPDATE so concurrent
+    callers never overwrite each other's changes
+    """
+    if delta == 0:
+        raise ValueError('Quantity must be positive')
+
+    now = timezone.now()
+    rows = Inventory.objects.filter(pk=inventory_id)
+    updates = {'quantity': F('quantity') + delta, 'updated_at': now}
+    if delta > 0:
+        updates['last_restock_date'] = now
+
+    with transaction.atomic():
+        if delta < 0:
+            # The stock check is part of the UPDATE's WHERE clause, so the
+            # database decides atomically whether enough stock is on hand
+            updated = rows.filter(quantity__gte=-delta).update(**updates)
+        else:
+            updated = rows.update(**updates)
+
+        if not updated:
+            available = rows.values_list('quantity', flat=True).first()
+            if available is None:
+                raise Inventory.DoesNotExist(f"Inventory {inventory_id} does not exist")
+            raise InsufficientStock(inventory_id, available, -delta)
+
+        # The row stays locked by our UPDATE until commit, so this read
+        # returns exactly the quantity produced by this mutation
+        new_quantity = rows.values_list('quantity', flat=True).get()
+
+        Product.objects.filter(inventory=inventory_id).update(
+            total_quantity=F('total_quantity') + delta
+        )
+
+        movement = InventoryMovement.objects.create(
+            inventory_id=inventory_id,
+            movement_type=movement_type,
+            quantity=abs(delta),
+            reference=reference,
+            notes=notes,
+            created_by=user
+        )
+
+    return new_quantity, movement
+
+
+def apply_stock_deltas(deltas, products, restocked=(), now=None):
+    """
+    Apply {inventory_id: delta} with set-based UPDATEs of
+    quantity = quantity + CASE WHEN id IN (...) THEN delta ... END, one
+    statement per batch. `products` maps each inventory_id to its
+    product_id so Product.total_quantity moves by the same amounts.
+    Rows in `restocked` also get their last_restock_date bumped.
+    """
+    now = now or timezone.now()
+    restocked = set(restocked)
+    inventory_ids = sorted(deltas)
+
+    for start in range(0, len(inventory_ids), BULK_BATCH_SIZE):
+        batch = inventory_ids[start:start + BULK_BATCH_SIZE]
+        updates = {
+            'quantity': F('quantity') + _delta_case({pk: deltas[pk] for pk in batch}),
+            'updated_at': now,
+        }
+        batch_restocked = restocked.intersection(batch)
+        if batch_restocked:
+            updates['last_restock_date'] = Case(
+                When(pk__in=batch_restocked, then=Value(now)),
+                default=F('last_restock_date'),
+                output_field=DateTimeField()
+            )
+        Inventory.objects.filter(pk__in=batch).update(**updates)
+
+    product_deltas = {}
+    for inventory_id, delta in deltas.items():
+        product_id = products[inventory_id]
+        product_deltas[product_id] = product_deltas.get(product_id, 0) + delta
+
+    product_ids = sorted(pk for pk, delta in product_deltas.items() if delta)
+    for start in range(0, len(product_ids), BULK_BATCH_SIZE):
+        batch = product_ids[start:start + BULK_BATCH_SIZE]
+        Product.objects.filter(pk__in=batch).update(
+            total_quantity=F('total_quantity') + _delta_case({pk: product_deltas[pk] for pk in batch})
+        )
+
+
+def refresh_product_totals(product_ids=None):
+    """
+    Recompute Product.total_quantity from the inventory rows in a single
+    UPDATE. Returns the number of products touched.
+    """
+    totals = (Inventory.objects
+              .filter(product=OuterRef('pk'))
+              .order_by()
+              .values('product')
+              .annotate(total=Sum('quantity'))
+              .values('total'))
+    products = Product.objects.all()
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+    return products.update(total_quantity=Coalesce(Subquery(totals), 0))
+
+
+def _delta_case(deltas):
+    """
+    Build CASE WHEN id IN (...) THEN delta ... END for {pk: delta}. Rows
+    sharing a delta share a WHEN branch, which keeps the CASE small for
+    typical scan batches of +1/-1 movements.
+    """
+    by_delta = {}
+    for pk, delta in deltas.items():
+        by_delta.setdefault(delta, []).append(pk)
+
+    return Case(
+        *[When(pk__in=pks, then=Value(delta)) for delta, pks in by_delta.items()],
+        default=Value(0),
+        output_field=IntegerField()
+    )
+
+
+def apply_movements(lines, user=None):
+    """
+    Apply a batch of stock movements in one transaction.
+
+    Each line is a dict with either `inventory_id` or `product` and
+    `warehouse`, plus `type`, `quantity` and optional `reference`/`notes`.
+    Invalid lines and lines that would take stock below zero are rejected
+    individually; every other line is applied. Returns one result dict per
+    line, in input order.
+    """
+    results = [None] * len(lines)
+    parsed = []
+
+    for index, line in enumerate(lines):
+        try:
+            parsed.append((index, _parse_movement_line(line)))
+        except (TypeError, ValueError) as e:
+            results[index] = {'index': index, 'success': False, 'error': str(e)}
+
+    with transaction.atomic():
+        # Lock exactly the referenced rows: the given inventory ids and
+        # each (product, warehouse) pair, not every warehouse of every
+        # product named in the batch
+        inventory_ids = {line['inventory_id'] for _, line in parsed if line['inventory_id']}
+        warehouses_by_product = {}
+        for _, line in parsed:
+            if not line['inventory_id']:
+                warehouses_by_product.setdefault(line['product'], set()).add(line['warehouse'])
+
+        conditions = [Q(pk__in=inventory_ids)] + [
+            Q(product_id=product_id, warehouse_id__in=warehouse_ids)
+            for product_id, warehouse_ids in sorted(warehouses_by_product.items())
+        ]
+
+        balances = {}
+        products = {}
+        by_product_warehouse = {}
+        for start in range(0, len(conditions), LOCK_BATCH_SIZE):
+            condition = Q()
+            for q in conditions[start:start + LOCK_BATCH_SIZE]:
+                condition |= q
+            rows = (Inventory.objects.select_for_update()
+                    .filter(condition)
+                    .order_by('pk')
+                    .values_list('pk', 'product_id', 'warehouse_id', 'quantity'))
+            for pk, product_id, warehouse_id, quantity in rows:
+                balances[pk] = quantity
+                products[pk] = product_id
+                by_product_warehouse.setdefault((product_id, warehouse_id), pk)
+
+        # Validate the lines in order against running balances
+        deltas = {}
+        restocked = set()
+        movements = []
+        applied = []
+        for index, line in parsed:
+            inventory_id = line['inventory_id'] or by_product_warehouse.get(
+                (line['product'], line['warehouse']))
+            if inventory_id not in balances:
+                results[index] = {'index': index, 'success': False, 'error': 'Inventory not found'}
+                continue
+
+            delta = line['delta']
+            if balances[inventory_id] + delta < 0:
+                results[index] = {
+                    'index': index,
+                    'success': False,
+                    'error': 'Insufficient inventory',
+                    'inventory_id': inventory_id,
+                    'available': balances[inventory_id],
+                    'required': -delta
+                }
+                continue
+
+            balances[inventory_id] += delta
+            deltas[inventory_id] = deltas.get(inventory_id, 0) + delta
+            if delta > 0 and line['type'] != 'ADJUSTMENT':
+                restocked.add(inventory_id)
+
+            movements.append(InventoryMovement(
+                inventory_id=inventory_id,
+                movement_type=line['type'],
+                quantity=line['quantity'],
+                reference=line['reference'],
+                notes=line['notes'],
+                created_by=user
+            ))
+            applied.append(index)
+            results[index] = {
+                'index': index,
+                'success': True,
+                'inventory_id': inventory_id,
+                'new_quantity': balances[inventory_id]
+            }
+
+        apply_stock_deltas(
+            {pk: delta for pk, delta in deltas.items() if delta},
+            products,
+            restocked
+        )
+        InventoryMovement.objects.bulk_create(movements, batch_size=BULK_BATCH_SIZE)
+
+    for index, movement in zip(applied, movements):
+        results[index]['movement_id'] = movement.pk
+
+    return results
+
+
+def _parse_movement_line(line):
+    """
+    Validate a raw bulk movement line and normalise it into a dict
+    """
+    if not isinstance(line, dict):
+        raise TypeError('Each movement must be an object')
+
+    movement_type = line.get('type')
+    if movement_type not in MOVEMENT_DIRECTIONS:
+        raise ValueError(f"Unsupported movement type: {movement_type}")
+
+    try:
+        quantity = int(line.get('quantity', 0))
+    except (TypeError, ValueError):
+        raise ValueError('Quantity must be an integer')
+
+    direction = MOVEMENT_DIRECTIONS[movement_type]
+    if direction is None:
+        if quantity == 0:
+            raise ValueError('Adjustment quantity must not be zero')
+        delta = quantity
+    else:
+        if quantity <= 0:
+            raise ValueError('Quantity must be positive')
+        delta = direction * quantity
+
+    inventory_id = line.get('inventory_id')
+    product = line.get('product')
+    warehouse = line.get('warehouse')
+    if inventory_id:
+        inventory_id = int(inventory_id)
+    elif product and warehouse:
+        product = int(product)
+        warehouse = int(warehouse)
+    else:
+        raise ValueError('Either inventory_id or product and warehouse are required')
+
+    reference = line.get('reference') or ''
+    notes = line.get('notes') or ''
+    if not isinstance(reference, str) or not isinstance(notes, str):
+        raise ValueError('Reference and notes must be strings')
+    max_length = InventoryMovement._meta.get_field('reference').max_length
+    if len(reference) > max_length:
+        raise ValueError(f"Reference must be at most {max_length} characters")
+
+    return {
+        'inventory_id': inventory_id,
+        'product': product,
+        'warehouse': warehouse,
+        'type': movement_type,
+        'quantity': quantity,
+        'delta': delta,
+        'reference': reference,
+        'notes': notes,
+    }
@@ -0,0 +1,32 @@
+from django.db import connections
+from django.db.models.signals import post_save, post_delete, post_migrate
+from django.dispatch import receiver
+from .models import Inventory
+from .search import install_sqlite_fts
+from .services import refresh_product_totals
+
+@receiver(post_save, sender=Inventory)
+def update_total_on_save(sender, instance, **kwargs):
+    """
+    Keep Product.total_quantity in step with inventory rows saved through
+    the ORM (admin, CRUD endpoints); inventory.services updates it directly
+    """
+    refresh_product_totals([instance.product_id])
+
+@receiver(post_delete, sender=Inventory)
+def update_total_on_delete(sender, instance, **kwargs):
+    """
+    Drop a deleted inventory row's quantity from its product's total
+    """
+    refresh_product_totals([instance.product_id])
+
+@receiver(post_migrate)
+def install_search_index(sender, using, **kwargs):
+    """
+    (Re)create the SQLite full-text tables once the inventory tables exist
+    """
+    if sender.label != 'inventory':
+        return
+    connection = connections[using]
+    if connection.vendor == 'sqlite':
+        install_sqlite_fts(connection)
@@ -1,3 +1,363 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from itertools import count
+from unittest import skipUnless
+from django.contrib.auth.models import User
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from api.testing import QueryCountTestCase
+from warehouse.models import Warehouse
+from . import rollups, search, services
+from .models import (Category, Product, Inventory, InventoryMovement, DailyMovementRollup,
+                     HourlyMovementRollup)
 
-# Create your tests here.
+serial = count()
+
+
+def make_warehouse():
+    n = next(serial)
+    return Warehouse.objects.create(name=f"Warehouse {n}", address='-', city='-', state='-',
+                                    country='-', postal_code='-')
+
+
+def make_product():
+    n = next(serial)
+    category = Category.objects.create(name=f"Category {n}")
+    return Product.objects.create(name=f"Product {n}", sku=f"SKU-{n}", category=category,
+                                  cost_price=1, selling_price=2)
+
+
+def make_movement(inventory):
+    n = next(serial)
+    user = User.objects.create(username=f"mover{n}")
+    return InventoryMovement.objects.create(inventory=inventory, movement_type='IN',
+                                            quantity=1, created_by=user)
+
+
+class InventoryQueryCountTests(QueryCountTestCase):
+    """
+    Inventory endpoints cost the same number of queries for any number
+    of rows
+    """
+    def setUp(self):
+        super().setUp()
+        self.warehouse = make_warehouse()
+        self.product = make_product()
+        self.inventory = Inventory.objects.create(product=self.product, warehouse=self.warehouse)
+
+    def add_inventories(self, rows):
+        for _ in range(rows):
+            Inventory.objects.create(product=make_product(), warehouse=make_warehouse())
+
+    def test_categories(self):
+        seed = lambda rows: [make_product() for _ in range(rows)]
+        self.assertConstantGet('/api/inventory/categories/', seed)
+        self.assertConstantGet(f"/api/inventory/categories/{self.product.category_id}/", seed)
+
+    def test_products(self):
+        seed = lambda rows: [make_product() for _ in range(rows)]
+        self.assertConstantGet('/api/inventory/products/', seed)
+        self.assertConstantGet(f"/api/inventory/products/{self.product.pk}/", self.add_inventories)
+
+    def test_product_inventory(self):
+        def seed(rows):
+            for _ in range(rows):
+                Inventory.objects.create(product=self.product, warehouse=make_warehouse())
+
+        self.assertConstantGet(f"/api/inventory/products/{self.product.pk}/inventory/", seed)
+
+    def test_inventory(self):
+        self.assertConstantGet('/api/inventory/inventory/', self.add_inventories)
+        self.assertConstantGet(f"/api/inventory/inventory/{self.inventory.pk}/", self.add_inventories)
+
+    def test_inventory_movements(self):
+        seed = lambda rows: [make_movement(self.inventory) for _ in range(rows)]
+        self.assertConstantGet(f"/api/inventory/inventory/{self.inventory.pk}/movements/", seed)
+
+    def test_movements(self):
+        def seed(rows):
+            for _ in range(rows):
+                inventory = Inventory.objects.create(product=make_product(), warehouse=make_warehouse())
+                make_movement(inventory)
+
+        movement = make_movement(self.inventory)
+        self.assertConstantGet('/api/inventory/movements/', seed)
+        self.assertConstantGet(f"/api/inventory/movements/{movement.pk}/", seed)
+
+    def test_daily_summary(self):
+        def seed(rows):
+            for _ in range(rows):
+                DailyMovementRollup.objects.create(
+                    date=date(2024, 1, 1) + timedelta(days=next(serial)), warehouse=self.warehouse,
+                    product=self.product, movement_type='IN', quantity=1, movement_count=1)
+
+        self.assertConstantGet('/api/inventory/movements/daily_summary/?group_by=date,product', seed)
+
+
+class StockServiceTests(TestCase):
+    """
+    add_stock and remove_stock move the inventory row and the product
+    total together and record one movement each
+    """
+    def setUp(self):
+        self.product = make_product()
+        self.inventory = Inventory.objects.create(product=self.product, warehouse=make_warehouse(), quantity=10)
+        Inventory.objects.create(product=self.product, warehouse=make_warehouse(), quantity=5)
+        services.refresh_product_totals()
+
+    def assertTotal(self, total):
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.total_quantity, total)
+
+    def test_add_stock(self):
+        new_quantity, movement = services.add_stock(self.inventory.pk, 4, reference='PO-1')
+        self.assertEqual(new_quantity, 14)
+        self.assertEqual((movement.movement_type, movement.quantity, movement.reference), ('IN', 4, 'PO-1'))
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.quantity, 14)
+        self.assertIsNotNone(self.inventory.last_restock_date)
+        self.assertTotal(19)
+
+    def test_remove_stock(self):
+        new_quantity, movement = services.remove_stock(self.inventory.pk, 10)
+        self.assertEqual(new_quantity, 0)
+        self.assertEqual((movement.movement_type, movement.quantity), ('OUT', 10))
+        self.assertTotal(5)
+
+    def test_insufficient_stock(self):
+        with self.assertRaises(services.InsufficientStock) as raised:
+            services.remove_stock(self.inventory.pk, 11)
+        self.assertEqual((raised.exception.inventory_id, raised.exception.available, raised.exception.required),
+                         (self.inventory.pk, 10, 11))
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.quantity, 10)
+        self.assertTotal(15)
+        self.assertFalse(InventoryMovement.objects.exists())
+
+    def test_missing_inventory(self):
+        missing = Inventory.objects.order_by('-pk').values_list('pk', flat=True).first() + 1
+        with self.assertRaises(Inventory.DoesNotExist):
+            services.add_stock(missing, 1)
+        with self.assertRaises(Inventory.DoesNotExist):
+            services.remove_stock(missing, 1)
+        self.assertTotal(15)
+
+    def test_zero_quantity(self):
+        with self.assertRaises(ValueError):
+            services.add_stock(self.inventory.pk, 0)
+
+
+class StockViewTests(QueryCountTestCase):
+    """
+    The stock actions answer with the new quantity, or a 400 naming what
+    is available
+    """
+    def setUp(self):
+        super().setUp()
+        self.product = make_product()
+        self.inventory = Inventory.objects.create(product=self.product, warehouse=make_warehouse(), quantity=10)
+        services.refresh_product_totals()
+
+    def post(self, action, quantity, pk=None):
+        return self.client.post(f"/api/inventory/inventory/{pk or self.inventory.pk}/{action}/",
+                                {'quantity': quantity}, format='json')
+
+    def test_add_and_remove(self):
+        response = self.post('add_stock', 5)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['new_quantity'], 15)
+        movement = InventoryMovement.objects.get(pk=response.data['movement_id'])
+        self.assertEqual(movement.created_by, self.user)
+
+        response = self.post('remove_stock', 15)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['new_quantity'], 0)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.total_quantity, 0)
+
+    def test_insufficient_stock(self):
+        response = self.post('remove_stock', 12)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'error': 'Insufficient inventory', 'available': 10, 'required': 12})
+
+    def test_quantity_must_be_positive(self):
+        for action in ('add_stock', 'remove_stock'):
+            with self.subTest(action=action):
+                response = self.post(action, 0)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.data, {'error': 'Quantity must be positive'})
+
+    def test_missing_inventory(self):
+        response = self.post('add_stock', 1, pk=self.inventory.pk + 1000)
+        self.assertEqual(response.status_code, 404)
+
+class ProductSearchTests(QueryCountTestCase):
+    """
+    Product search matches every word as a prefix through the full-text
+    index, and a single term equal to a SKU or barcode returns just that
+    product
+    """
+    def setUp(self):
+        super().setUp()
+        self.drill = Product.objects.create(name='Hammer drill', sku='HD-1', barcode='4006381333931',
+                                            cost_price=1, selling_price=2)
+        self.long_drill = Product.objects.create(name='Hammer drill long', sku='HD-10',
+                                                 cost_price=1, selling_price=2)
+        self.saw = Product.objects.create(name='Hand saw', sku='SAW-1', cost_price=1, selling_price=2)
+
+    def search(self, term):
+        return set(search.search(Product.objects.all(), term).values_list('pk', flat=True))
+
+    def api_search(self, term):
+        response = self.client.get('/api/inventory/products/', {'search': term})
+        self.assertEqual(response.status_code, 200)
+        return {product['id'] for product in response.json()['results']}
+
+    def test_prefix_matching(self):
+        self.assertEqual(self.search('ham'), {self.drill.pk, self.long_drill.pk})
+        self.assertEqual(self.search('HAM dri lo'), {self.long_drill.pk})
+        self.assertEqual(self.search('ha'), {self.drill.pk, self.long_drill.pk, self.saw.pk})
+        # Words match from their start only
+        self.assertEqual(self.search('mmer'), set())
+        self.assertEqual(self.search('!!'), set())
+
+    def test_exact_sku_and_barcode(self):
+        # As prefixes, "hd" and "1" would also match HD-10
+        self.assertEqual(self.api_search('HD-1'), {self.drill.pk})
+        self.assertEqual(self.api_search('4006381333931'), {self.drill.pk})
+        self.assertEqual(self.api_search('HD'), {self.drill.pk, self.long_drill.pk})
+
+    def test_rename_updates_the_index(self):
+        self.saw.name = 'Pipe wrench'
+        self.saw.save()
+        self.assertEqual(self.search('wre'), {self.saw.pk})
+        self.assertEqual(self.search('saw'), {self.saw.pk})  # still in the SKU
+        self.assertEqual(self.search('hand'), set())
+
+        self.drill.delete()
+        self.assertEqual(self.search('hammer'), {self.long_drill.pk})
+
+    @skipUnless(connection.vendor == 'sqlite', 'FTS5 tables are SQLite only')
+    def test_post_migrate_installs_the_fts_triggers(self):
+        fts = search.fts_table(Product)
+        names = {fts, f"{fts}_insert", f"{fts}_delete", f"{fts}_update"}
+
+        def installed():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+                return names & {row[0] for row in cursor.fetchall()}
+
+        self.assertEqual(installed(), names)
+
+        # Rebuilding the table in a migration drops its triggers
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TRIGGER {fts}_update")
+        self.assertEqual(installed(), names - {f"{fts}_update"})
+
+        emit_post_migrate_signal(verbosity=0, interactive=False, db=connection.alias)
+        self.assertEqual(installed(), names)
+        self.saw.name = 'Pipe wrench'
+        self.saw.save()
+        self.assertEqual(self.search('wrench'), {self.saw.pk})
+
+class BulkMovementTests(QueryCountTestCase):
+    """
+    Every line of a bulk movement is applied or rejected on its own,
+    against the balance left by the lines before it
+    """
+    def setUp(self):
+        super().setUp()
+        self.product = make_product()
+        self.first = Inventory.objects.create(product=self.product, warehouse=make_warehouse(), quantity=10)
+        self.second = Inventory.objects.create(product=self.product, warehouse=make_warehouse(), quantity=5)
+        # Shares the product and a warehouse with the lines below but is
+        # never named by them
+        self.other = Inventory.objects.create(product=make_product(), warehouse=self.second.warehouse,
+                                              quantity=7)
+        services.refresh_product_totals()
+
+    def test_mixed_lines(self):
+        lines = [
+            {'inventory_id': self.first.pk, 'type': 'OUT', 'quantity': 4, 'reference': 'SO-1'},
+            {'inventory_id': self.first.pk, 'type': 'OUT', 'quantity': 7},
+            {'product': self.product.pk, 'warehouse': self.second.warehouse_id, 'type': 'IN', 'quantity': 3},
+            {'inventory_id': self.first.pk, 'type': 'TRANSFER', 'quantity': 1},
+            {'inventory_id': self.first.pk, 'type': 'IN', 'quantity': 'many'},
+            {'inventory_id': self.first.pk, 'type': 'IN', 'quantity': 1, 'reference': 'x' * 101},
+            {'inventory_id': self.first.pk, 'type': 'IN', 'quantity': 1, 'notes': ['not', 'text']},
+            {'product': self.product.pk, 'warehouse': make_warehouse().pk, 'type': 'IN', 'quantity': 1},
+            {'inventory_id': self.first.pk, 'type': 'ADJUSTMENT', 'quantity': -6},
+        ]
+        response = self.client.post('/api/inventory/inventory/bulk_movements/', {'movements': lines},
+                                    format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['applied'], response.data['failed']), (3, 6))
+
+        results = response.data['results']
+        self.assertEqual([result['index'] for result in results], list(range(len(lines))))
+        self.assertEqual([result['success'] for result in results],
+                         [True, False, True, False, False, False, False, False, True])
+        self.assertEqual(results[0]['new_quantity'], 6)
+        self.assertEqual({key: results[1][key] for key in ('error', 'inventory_id', 'available', 'required')},
+                         {'error': 'Insufficient inventory', 'inventory_id': self.first.pk,
+                          'available': 6, 'required': 7})
+        self.assertEqual((results[2]['inventory_id'], results[2]['new_quantity']), (self.second.pk, 8))
+        self.assertEqual(results[3]['error'], 'Unsupported movement type: TRANSFER')
+        self.assertEqual(results[4]['error'], 'Quantity must be an integer')
+        self.assertEqual(results[5]['error'], 'Reference must be at most 100 characters')
+        self.assertEqual(results[6]['error'], 'Reference and notes must be strings')
+        self.assertEqual(results[7]['error'], 'Inventory not found')
+        self.assertEqual(results[8]['new_quantity'], 0)
+
+        quantities = dict(Inventory.objects.values_list('pk', 'quantity'))
+        self.assertEqual((quantities[self.first.pk], quantities[self.second.pk], quantities[self.other.pk]),
+                         (0, 8, 7))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.total_quantity, 8)
+        self.assertEqual(InventoryMovement.objects.count(), 3)
+        self.assertEqual(InventoryMovement.objects.get(pk=results[0]['movement_id']).reference, 'SO-1')
+
+    def test_empty_batch(self):
+        response = self.client.post('/api/inventory/inventory/bulk_movements/', {'movements': []},
+                                    format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+# Fold movements as soon as they are written
+@override_settings(MOVEMENT_ROLLUP_LAG=-60)
+class HourlyRollupTests(TestCase):
+    """
+    Movements without a user fold into a single hourly row, however many
+    times the rollup runs
+    """
+    def setUp(self):
+        self.inventory = Inventory.objects.create(product=make_product(), warehouse=make_warehouse())
+
+    def move(self, quantity):
+        return InventoryMovement.objects.create(inventory=self.inventory, movement_type='IN', quantity=quantity)
+
+    def totals(self):
+        return list(HourlyMovementRollup.objects.filter(user__isnull=True)
+                    .values_list('units', 'movement_count'))
+
+    def test_movements_without_a_user(self):
+        self.move(3)
+        self.move(4)
+        rollups.roll_up()
+        self.assertEqual(self.totals(), [(7, 2)])
+
+        rollups.roll_up()
+        self.assertEqual(self.totals(), [(7, 2)])
+
+        self.move(5)
+        rollups.roll_up()
+        rollups.roll_up()
+        self.assertEqual(self.totals(), [(12, 3)])
+
+    def test_key_is_unique_without_a_user(self):
+        row = {'hour': timezone.now().replace(minute=0, second=0, microsecond=0),
+               'warehouse': self.inventory.warehouse, 'movement_type': 'IN'}
+        HourlyMovementRollup.objects.create(**row, units=1, movement_count=1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            HourlyMovementRollup.objects.create(**row, units=1, movement_count=1)
@@ -1,47 +1,50 @@
+from datetime import datetime
 from django.shortcuts import render, get_object_or_404
 from rest_framework import viewsets, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.db.models import Sum
-from .models import Category, Product, Inventory, InventoryMovement
+from .models import Category, Product, Inventory, InventoryMovement, DailyMovementRollup
+from . import rollups, services
+from .search import FullTextSearchFilter
+from api.mixins import QueryOptimizationMixin
 from .serializers import (CategorySerializer, ProductSerializer, 
                          InventorySerializer, InventoryMovementSerializer)
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(QueryOptimizationMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter]
     search_fields = ['name', 'description']
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(QueryOptimizationMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [FullTextSearchFilter]
     search_fields = ['name', 'description', 'sku', 'barcode', 'category__name']
+    search_exact_fields = ['sku', 'barcode']
     
     @action(detail=True, methods=['get'])
     def inventory(self, request, pk=None):
         product = self.get_object()
         inventories = Inventory.objects.filter(product=product)
-        serializer = InventorySerializer(inventories, many=True)
-        return Response(serializer.data)
+        return self.list_response(inventories, InventorySerializer)
 
-class InventoryViewSet(viewsets.ModelViewSet):
+class InventoryViewSet(QueryOptimizationMixin, viewsets.ModelViewSet):
     queryset = Inventory.objects.all()
     serializer_class = InventorySerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [FullTextSearchFilter]
     search_fields = ['product__name', 'warehouse__name']
     
     @action(detail=True, methods=['get'])
     def movements(self, request, pk=None):
         inventory = self.get_object()
         movements = InventoryMovement.objects.filter(inventory=inventory).order_by('-created_at')
-        serializer = InventoryMovementSerializer(movements, many=True)
-        return Response(serializer.data)
+        return self.list_response(movements, InventoryMovementSerializer)
 
             
     
@@ -55,24 +58,17 @@ class InventoryViewSet(viewsets.ModelViewSet):
         if quantity <= 0:
             return Response({'error': 'Quantity must be positive'}, status=400)
         
-        # Update inventory
-        inventory.quantity += quantity
-        inventory.last_restock_date = timezone.now()
-        inventory.save()
-        
-        # Create movement record
-        movement = InventoryMovement.objects.create(
-            inventory=inventory,
-            movement_type='IN',
-            quantity=quantity,
+        new_quantity, movement = services.add_stock(
+            inventory.id,
+            quantity,
+            user=request.user,
             reference=reference,
-            notes=notes,
-            created_by=request.user
+            notes=notes
         )
         
         return Response({
             'success': True,
-            'new_quantity': inventory.quantity,
+            'new_quantity': new_quantity,
             'movement_id': movement.id
         })
     
@@ -86,34 +82,93 @@ class InventoryViewSet(viewsets.ModelViewSet):
         if quantity <= 0:
             return Response({'error': 'Quantity must be positive'}, status=400)
         
-        if inventory.quantity < quantity:
-            return Response({'error': 'Insufficient inventory'}, status=400)
-        
-        # Update inventory
-        inventory.quantity -= quantity
-        inventory.save()
-        
-        # Create movement record
-        movement = InventoryMovement.objects.create(
-            inventory=inventory,
-            movement_type='OUT',
-            quantity=quantity,
-            reference=reference,
-            notes=notes,
-            created_by=request.user
-        )
+        try:
+            new_quantity, movement = services.remove_stock(
+                inventory.id,
+                quantity,
+                user=request.user,
+                reference=reference,
+                notes=notes
+            )
+        except services.InsufficientStock as e:
+            return Response({
+                'error': 'Insufficient inventory',
+                'available': e.available,
+                'required': e.required
+            }, status=400)
         
         return Response({
             'success': True,
-            'new_quantity': inventory.quantity,
+            'new_quantity': new_quantity,
             'movement_id': movement.id
         })
 
-class InventoryMovementViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['post'])
+    def bulk_movements(self, request):
+        lines = request.data
+        if isinstance(lines, dict):
+            lines = lines.get('movements')
+        
+        if not isinstance(lines, list) or not lines:
+            return Response({'error': 'A non-empty list of movements is required'}, status=400)
+        
+        results = services.apply_movements(lines, user=request.user)
+        applied = sum(1 for result in results if result['success'])
+        
+        return Response({
+            'applied': applied,
+            'failed': len(results) - applied,
+            'results': results
+        })
+
+class InventoryMovementViewSet(QueryOptimizationMixin, viewsets.ModelViewSet):
     queryset = InventoryMovement.objects.all().order_by('-created_at')
     serializer_class = InventoryMovementSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [FullTextSearchFilter]
     search_fields = ['inventory__product__name', 'inventory__warehouse__name', 'reference', 'notes']
-
-
+    
+    # Dimensions daily_summary can group by, as rollup fields
+    SUMMARY_DIMENSIONS = {
+        'date': 'date',
+        'warehouse': 'warehouse_id',
+        'product': 'product_id',
+        'movement_type': 'movement_type',
+    }
+    
+    @action(detail=False, methods=['get'])
+    def daily_summary(self, request):
+        # Movement totals read from the daily rollup, so a long date range
+        # costs one row per day and key instead of every movement
+        params = request.query_params
+        group_by = [name.strip() for name in params.get('group_by', 'date,movement_type').split(',') if name.strip()]
+        unknown = [name for name in group_by if name not in self.SUMMARY_DIMENSIONS]
+        if unknown:
+            return Response({'error': f"Cannot group by: {', '.join(unknown)}"}, status=400)
+        
+        rollup = DailyMovementRollup.objects.all()
+        
+        # Apply filters from parameters
+        try:
+            if params.get('start_date'):
+                rollup = rollup.filter(date__gte=datetime.strptime(params['start_date'], '%Y-%m-%d').date())
+            if params.get('end_date'):
+                rollup = rollup.filter(date__lte=datetime.strptime(params['end_date'], '%Y-%m-%d').date())
+        except ValueError:
+            return Response({'error': 'Dates must be in YYYY-MM-DD format'}, status=400)
+        if params.get('warehouse_id'):
+            rollup = rollup.filter(warehouse_id=params['warehouse_id'])
+        if params.get('product_id'):
+            rollup = rollup.filter(product_id=params['product_id'])
+        if params.get('movement_type'):
+            rollup = rollup.filter(movement_type=params['movement_type'])
+        
+        fields = [self.SUMMARY_DIMENSIONS[name] for name in group_by]
+        totals = (rollup.values(*fields)
+                  .annotate(quantity_total=Sum('quantity'), movement_count=Sum('movement_count'))
+                  .order_by(*fields))
+        
+        return Response({
+            'up_to_movement_id': rollups.watermark(),
+            'results': list(totals)
+        })
@@ -0,0 +1,73 @@
+import time
+import uuid
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from inventory.models import Product, Inventory
+from orders import services
+from orders.models import Customer, SalesOrder, SalesOrderItem
+from warehouse.models import Warehouse
+
+
+class Command(BaseCommand):
+    help = 'Time availability checks and allocation for sales orders of different sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, nargs='+', default=[1, 50, 500],
+                            help='Order sizes (number of lines) to benchmark')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Runs per order size; the best run is reported')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'lines':>6} {'check ms':>10} {'check queries':>14} "
+                          f"{'allocate ms':>12} {'allocate queries':>17}")
+
+        # Everything runs in one transaction that is rolled back at the end
+        with transaction.atomic():
+            for lines in options['lines']:
+                sales_order = self.create_order(lines)
+                check = self.measure(options['repeat'], services.check_availability, sales_order)
+                allocate = self.measure(options['repeat'], services.allocate_sales_order, sales_order)
+                self.stdout.write(f"{lines:>6} {check[0]:>10.2f} {check[1]:>14} "
+                                  f"{allocate[0]:>12.2f} {allocate[1]:>17}")
+            transaction.set_rollback(True)
+
+    def measure(self, repeat, func, sales_order):
+        best = None
+        for _ in range(repeat):
+            # Roll every run back so each one allocates against the same stock
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    func(sales_order)
+                    elapsed = (time.perf_counter() - started) * 1000
+                transaction.set_rollback(True)
+            if best is None or elapsed < best[0]:
+                best = (elapsed, len(queries.captured_queries))
+        return best
+
+    def create_order(self, lines):
+        token = uuid.uuid4().hex[:8]
+        warehouse = Warehouse.objects.create(
+            name=f"Benchmark {token}", address='-', city='-', state='-',
+            country='-', postal_code='-'
+        )
+        customer = Customer.objects.create(name=f"Benchmark {token}")
+        products = Product.objects.bulk_create([
+            Product(name=f"Benchmark {token} {i}", sku=f"BENCH-{token}-{i}",
+                    cost_price=1, selling_price=2)
+            for i in range(lines)
+        ])
+        Inventory.objects.bulk_create([
+            Inventory(product=product, warehouse=warehouse, quantity=1000)
+            for product in products
+        ])
+        sales_order = SalesOrder.objects.create(
+            order_number=f"BENCH-{token}", customer=customer, warehouse=warehouse,
+            status='PROCESSING', shipping_address='-'
+        )
+        SalesOrderItem.objects.bulk_create([
+            SalesOrderItem(sales_order=sales_order, product=product, quantity=1, unit_price=2)
+            for product in products
+        ])
+        return sales_order
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_query_indexes'),
+        ('warehouse', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='salesorder',
+            index=models.Index(fields=['order_date'], name='so_order_date_idx'),
+        ),
+    ]
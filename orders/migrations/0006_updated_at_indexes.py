@@ -0,0 +1,41 @@
+# Generated by Django 5.1.7 on 2026-10-18 04:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_updated_at_indexes'),
+        ('orders', '0005_purchase_order_date_index'),
+        ('warehouse', '0002_updated_at_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['updated_at'], name='customer_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['updated_at'], name='po_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorderitem',
+            index=models.Index(fields=['updated_at'], name='po_item_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesorder',
+            index=models.Index(fields=['updated_at'], name='so_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesorderitem',
+            index=models.Index(fields=['updated_at'], name='so_item_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=models.Index(fields=['updated_at'], name='supplier_updated_idx'),
+        ),
+    ]
@@ -23,6 +23,12 @@ class Supplier(models.Model):
     def __str__(self):
         return self.name
 
+    class Meta:
+        indexes = [
+            # Latest change of the data watermark of cached reports
+            models.Index(fields=['updated_at'], name='supplier_updated_idx'),
+        ]
+
 class Customer(models.Model):
     name = models.CharField(max_length=200)
     contact_person = models.CharField(max_length=100, blank=True, null=True)
@@ -41,6 +47,12 @@ class Customer(models.Model):
     def __str__(self):
         return self.name
 
+    class Meta:
+        indexes = [
+            # Latest change of the data watermark of cached reports
+            models.Index(fields=['updated_at'], name='customer_updated_idx'),
+        ]
+
 class PurchaseOrder(models.Model):
     STATUS_CHOICES = (
         ('DRAFT', 'Draft'),
@@ -73,6 +85,16 @@ class PurchaseOrder(models.Model):
 
     def __str__(self):
         return self.po_number
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='po_created_id_idx'),
+            models.Index(fields=['status', 'created_at'], name='po_status_created_idx'),
+            # Date range of receiving reports
+            models.Index(fields=['order_date'], name='po_order_date_idx'),
+            # Latest change of the data watermark of cached reports
+            models.Index(fields=['updated_at'], name='po_updated_idx'),
+        ]
     
     def update_totals(self):
         items = self.items.all()
@@ -97,6 +119,12 @@ class PurchaseOrderItem(models.Model):
     def subtotal(self):
         return self.quantity * self.unit_price
 
+    class Meta:
+        indexes = [
+            # Latest change of the data watermark of cached reports
+            models.Index(fields=['updated_at'], name='po_item_updated_idx'),
+        ]
+
 class SalesOrder(models.Model):
     STATUS_CHOICES = (
         ('DRAFT', 'Draft'),
@@ -140,6 +168,16 @@ class SalesOrder(models.Model):
         self.total = self.subtotal + self.tax + self.shipping_cost - self.discount
         self.save()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='so_created_id_idx'),
+            models.Index(fields=['status', 'created_at'], name='so_status_created_idx'),
+            # Date range of sales reports
+            models.Index(fields=['order_date'], name='so_order_date_idx'),
+            # Latest change of the data watermark of cached reports
+            models.Index(fields=['updated_at'], name='so_updated_idx'),
+        ]
+
 class SalesOrderItem(models.Model):
     sales_order = models.ForeignKey(SalesOrder, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='sales_order_items')
@@ -156,6 +194,12 @@ class SalesOrderItem(models.Model):
     
     def subtotal(self):
         return (self.quantity * self.unit_price) - self.discount
+
+    class Meta:
+        indexes = [
+            # Latest change of the data watermark of cached reports
+            models.Index(fields=['updated_at'], name='so_item_updated_idx'),
+        ]
     
     
 
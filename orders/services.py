@@ -0,0 +1,190 @@
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from inventory.models import Inventory, InventoryMovement
+from inventory.services import apply_stock_deltas, InsufficientStock, BULK_BATCH_SIZE
+from .models import PurchaseOrderItem, SalesOrderItem
+
+# Reference of the IN movements booked by receive_purchase_order, followed
+# by the po_number
+RECEIPT_REFERENCE_PREFIX = 'PO #'
+
+
+class OrderShortage(InsufficientStock):
+    """
+    Raised when the warehouse cannot cover every line of a sales order
+    """
+    def __init__(self, product_name, inventory_id, available, required):
+        self.product_name = product_name
+        super().__init__(inventory_id, available, required)
+
+
+def receive_purchase_order(purchase_order, items_data, user=None):
+    """
+    Receive the posted items of a purchase order in a constant number of
+    queries: lock the PO items and inventory rows, update both with bulk
+    UPDATEs, bulk_create the movements and decide completion with a single
+    aggregate. Returns True when the order is now fully received.
+    """
+    # Sum the requested quantities per PO item, skipping invalid lines
+    requested = {}
+    for item_data in items_data:
+        try:
+            item_id = int(item_data.get('id') or 0)
+            received_qty = int(item_data.get('received_quantity') or 0)
+        except (AttributeError, TypeError, ValueError):
+            continue
+        if not item_id or received_qty <= 0:
+            continue
+        requested[item_id] = requested.get(item_id, 0) + received_qty
+
+    warehouse_id = purchase_order.warehouse_id
+    reference = f"{RECEIPT_REFERENCE_PREFIX}{purchase_order.po_number}"
+    now = timezone.now()
+
+    with transaction.atomic():
+        items = list(PurchaseOrderItem.objects.select_for_update()
+                     .filter(purchase_order=purchase_order, id__in=requested)
+                     .order_by('pk'))
+
+        # Never receive more than is still outstanding on a line
+        received = []
+        for item in items:
+            received_qty = min(requested[item.id], item.quantity - item.received_quantity)
+            if received_qty > 0:
+                item.received_quantity += received_qty
+                item.updated_at = now
+                received.append((item, received_qty))
+
+        if received:
+            product_ids = {item.product_id for item, _ in received}
+            inventory_ids = {}
+            rows = (Inventory.objects.select_for_update()
+                    .filter(warehouse_id=warehouse_id, product_id__in=product_ids)
+                    .order_by('pk')
+                    .values_list('product_id', 'pk'))
+            for product_id, pk in rows:
+                inventory_ids.setdefault(product_id, pk)
+
+            missing = [
+                Inventory(product_id=product_id, warehouse_id=warehouse_id, quantity=0)
+                for product_id in product_ids - inventory_ids.keys()
+            ]
+            for inventory in Inventory.objects.bulk_create(missing, batch_size=BULK_BATCH_SIZE):
+                inventory_ids[inventory.product_id] = inventory.pk
+
+            deltas = {}
+            movements = []
+            for item, received_qty in received:
+                inventory_id = inventory_ids[item.product_id]
+                deltas[inventory_id] = deltas.get(inventory_id, 0) + received_qty
+                movements.append(InventoryMovement(
+                    inventory_id=inventory_id,
+                    movement_type='IN',
+                    quantity=received_qty,
+                    reference=reference,
+                    notes=f"Received from {reference}",
+                    created_by=user
+                ))
+
+            PurchaseOrderItem.objects.bulk_update(
+                [item for item, _ in received],
+                ['received_quantity', 'updated_at'],
+                batch_size=BULK_BATCH_SIZE
+            )
+            products = {pk: product_id for product_id, pk in inventory_ids.items()}
+            apply_stock_deltas(deltas, products, restocked=deltas.keys(), now=now)
+            InventoryMovement.objects.bulk_create(movements, batch_size=BULK_BATCH_SIZE)
+
+        # Mark PO as received if all items are fully received
+        outstanding = (PurchaseOrderItem.objects
+                       .filter(purchase_order=purchase_order)
+                       .aggregate(outstanding=Count('pk', filter=Q(received_quantity__lt=F('quantity')))))
+        fully_received = outstanding['outstanding'] == 0
+
+        if fully_received:
+            purchase_order.status = 'RECEIVED'
+            purchase_order.actual_delivery_date = now.date()
+            purchase_order.save()
+
+    return fully_received
+
+
+def check_availability(sales_order, lock=False):
+    """
+    Validate a whole sales order against the warehouse stock using one
+    query for the lines and one for the inventory rows. Raises
+    OrderShortage for the first line that cannot be covered, otherwise
+    returns (items, inventory) where inventory maps product_id to an
+    [inventory_id, quantity] pair.
+    """
+    items = list(SalesOrderItem.objects
+                 .filter(sales_order=sales_order)
+                 .select_related('product')
+                 .order_by('pk'))
+
+    rows = (Inventory.objects
+            .filter(warehouse_id=sales_order.warehouse_id,
+                    product_id__in={item.product_id for item in items})
+            .order_by('pk'))
+    if lock:
+        rows = rows.select_for_update()
+
+    inventory = {}
+    for pk, product_id, quantity in rows.values_list('pk', 'product_id', 'quantity'):
+        inventory.setdefault(product_id, [pk, quantity])
+
+    # Lines for the same product draw from the same row, so check totals
+    required = {}
+    for item in items:
+        required[item.product_id] = required.get(item.product_id, 0) + item.quantity
+
+    for item in items:
+        inventory_id, available = inventory.get(item.product_id, (None, 0))
+        if available < required[item.product_id]:
+            raise OrderShortage(item.product.name, inventory_id, available, required[item.product_id])
+
+    return items, inventory
+
+
+def allocate_sales_order(sales_order, user=None):
+    """
+    Decrement stock for every line of a sales order all-or-nothing: the
+    inventory rows are locked in one query, the order is validated in
+    memory and all decrements and movements are written in bulk inside
+    a single atomic block.
+    """
+    reference = f"SO #{sales_order.order_number}"
+
+    with transaction.atomic():
+        items, inventory = check_availability(sales_order, lock=True)
+
+        deltas = {}
+        products = {}
+        movements = []
+        for item in items:
+            inventory_id = inventory[item.product_id][0]
+            deltas[inventory_id] = deltas.get(inventory_id, 0) - item.quantity
+            products[inventory_id] = item.product_id
+            movements.append(InventoryMovement(
+                inventory_id=inventory_id,
+                movement_type='OUT',
+                quantity=item.quantity,
+                reference=reference,
+                notes=f"Fulfilled for {reference}",
+                created_by=user
+            ))
+
+        apply_stock_deltas(deltas, products)
+
+        # Backends without row locks (SQLite) can race the in-memory check;
+        # never commit a negative balance
+        if Inventory.objects.filter(pk__in=deltas, quantity__lt=0).exists():
+            raise InsufficientStock(None, 0, 0)
+
+        InventoryMovement.objects.bulk_create(movements, batch_size=BULK_BATCH_SIZE)
+
+        sales_order.status = 'PACKED'
+        sales_order.save()
+
+    return movements
@@ -1,3 +1,136 @@
-from django.test import TestCase
+from itertools import count
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from api.testing import QueryCountTestCase
+from inventory.models import Product, Inventory
+from warehouse.models import Warehouse
+from .models import (Supplier, Customer, PurchaseOrder, PurchaseOrderItem,
+                     SalesOrder, SalesOrderItem)
 
-# Create your tests here.
+serial = count()
+
+
+def make_product():
+    n = next(serial)
+    return Product.objects.create(name=f"Product {n}", sku=f"SKU-{n}", cost_price=1, selling_price=2)
+
+
+class OrderQueryCountTests(QueryCountTestCase):
+    """
+    Order endpoints cost the same number of queries for any number of
+    orders and order lines
+    """
+    def setUp(self):
+        super().setUp()
+        self.warehouse = Warehouse.objects.create(name='Warehouse', address='-', city='-', state='-',
+                                                  country='-', postal_code='-')
+        self.supplier = Supplier.objects.create(name='Supplier')
+        self.customer = Customer.objects.create(name='Customer')
+        self.purchase_order = self.make_purchase_order()
+        self.sales_order = self.make_sales_order()
+
+    def make_purchase_order(self, status='DRAFT', supplier=None):
+        creator = User.objects.create(username=f"buyer{next(serial)}")
+        return PurchaseOrder.objects.create(po_number=f"PO-{next(serial)}", supplier=supplier or self.supplier,
+                                            warehouse=self.warehouse, status=status,
+                                            created_by=creator, approved_by=creator)
+
+    def make_sales_order(self, customer=None):
+        creator = User.objects.create(username=f"seller{next(serial)}")
+        return SalesOrder.objects.create(order_number=f"SO-{next(serial)}", customer=customer or self.customer,
+                                         warehouse=self.warehouse, shipping_address='-',
+                                         created_by=creator, processed_by=creator)
+
+    def add_purchase_order_items(self, purchase_order, rows):
+        for _ in range(rows):
+            PurchaseOrderItem.objects.create(purchase_order=purchase_order, product=make_product(),
+                                             quantity=5, unit_price=1)
+
+    def add_sales_order_items(self, sales_order, rows):
+        for _ in range(rows):
+            SalesOrderItem.objects.create(sales_order=sales_order, product=make_product(),
+                                          quantity=5, unit_price=1)
+
+    def add_purchase_orders(self, rows):
+        for _ in range(rows):
+            supplier = Supplier.objects.create(name=f"Supplier {next(serial)}")
+            self.add_purchase_order_items(self.make_purchase_order(supplier=supplier), 2)
+
+    def add_sales_orders(self, rows):
+        for _ in range(rows):
+            customer = Customer.objects.create(name=f"Customer {next(serial)}")
+            self.add_sales_order_items(self.make_sales_order(customer=customer), 2)
+
+    def test_suppliers(self):
+        self.assertConstantGet('/api/orders/suppliers/', self.add_purchase_orders)
+        self.assertConstantGet(f"/api/orders/suppliers/{self.supplier.pk}/", self.add_purchase_orders)
+
+    def test_supplier_purchase_orders(self):
+        def seed(rows):
+            for _ in range(rows):
+                self.add_purchase_order_items(self.make_purchase_order(), 2)
+
+        self.assertConstantGet(f"/api/orders/suppliers/{self.supplier.pk}/purchase_orders/", seed)
+
+    def test_customers(self):
+        self.assertConstantGet('/api/orders/customers/', self.add_sales_orders)
+        self.assertConstantGet(f"/api/orders/customers/{self.customer.pk}/", self.add_sales_orders)
+
+    def test_customer_sales_orders(self):
+        def seed(rows):
+            for _ in range(rows):
+                self.add_sales_order_items(self.make_sales_order(), 2)
+
+        self.assertConstantGet(f"/api/orders/customers/{self.customer.pk}/sales_orders/", seed)
+
+    def test_purchase_orders(self):
+        self.assertConstantGet('/api/orders/purchase-orders/', self.add_purchase_orders)
+        self.assertConstantGet(f"/api/orders/purchase-orders/{self.purchase_order.pk}/",
+                               lambda rows: self.add_purchase_order_items(self.purchase_order, rows))
+
+    def test_purchase_order_items(self):
+        item = PurchaseOrderItem.objects.create(purchase_order=self.purchase_order, product=make_product(),
+                                                quantity=5, unit_price=1)
+        self.assertConstantGet('/api/orders/purchase-order-items/', self.add_purchase_orders)
+        self.assertConstantGet(f"/api/orders/purchase-order-items/{item.pk}/", self.add_purchase_orders)
+
+    def test_sales_orders(self):
+        self.assertConstantGet('/api/orders/sales-orders/', self.add_sales_orders)
+        self.assertConstantGet(f"/api/orders/sales-orders/{self.sales_order.pk}/",
+                               lambda rows: self.add_sales_order_items(self.sales_order, rows))
+
+    def test_sales_order_items(self):
+        item = SalesOrderItem.objects.create(sales_order=self.sales_order, product=make_product(),
+                                             quantity=5, unit_price=1)
+        self.assertConstantGet('/api/orders/sales-order-items/', self.add_sales_orders)
+        self.assertConstantGet(f"/api/orders/sales-order-items/{item.pk}/", self.add_sales_orders)
+
+    def receipt(self, rows):
+        """
+        A new approved purchase order of rows lines, half of whose
+        products have no stock row in the warehouse yet, and a request
+        receiving all of it
+        """
+        purchase_order = self.make_purchase_order(status='APPROVED')
+        self.add_purchase_order_items(purchase_order, rows)
+        items = list(purchase_order.items.all())
+        for item in items[::2]:
+            Inventory.objects.create(product_id=item.product_id, warehouse=self.warehouse)
+
+        url = f"/api/orders/purchase-orders/{purchase_order.pk}/receive/"
+        data = {'items': [{'id': item.pk, 'received_quantity': item.quantity} for item in items]}
+        return lambda: self.client.post(url, data, format='json')
+
+    def test_receive_purchase_order(self):
+        self.assertSuccess(self.receipt(2)())
+
+        receive = self.receipt(3)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertSuccess(receive())
+
+        receive = self.receipt(6)
+        with self.assertNumQueries(len(queries)):
+            response = receive()
+        self.assertEqual(response.data['status'], 'RECEIVED')
+        self.assertEqual(len(response.data['items']), 6)
@@ -10,8 +10,10 @@ from .serializers import (SupplierSerializer, CustomerSerializer,
                          PurchaseOrderSerializer, PurchaseOrderItemSerializer,
                          SalesOrderSerializer, SalesOrderItemSerializer)
 from inventory.models import Inventory, InventoryMovement
+from . import services
+from api.mixins import QueryOptimizationMixin
 
-class SupplierViewSet(viewsets.ModelViewSet):
+class SupplierViewSet(QueryOptimizationMixin, viewsets.ModelViewSet):
     queryset = Supplier.objects.all()
     serializer_class = SupplierSerializer
     permission_classes = [IsAuthenticated]
@@ -22,10 +24,9 @@ class SupplierViewSet(viewsets.ModelViewSet):
     def purchase_orders(self, request, pk=None):
         supplier = self.get_object()
         purchase_orders = PurchaseOrder.objects.filter(supplier=supplier)
-        serializer = PurchaseOrderSerializer(purchase_orders, many=True)
-        return Response(serializer.data)
+        return self.list_response(purchase_orders, PurchaseOrderSerializer)
 
-class CustomerViewSet(viewsets.ModelViewSet):
+class CustomerViewSet(QueryOptimizationMixin, viewsets.ModelViewSet):
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
     permission_classes = [IsAuthenticated]
@@ -36,10 +37,9 @@ class CustomerViewSet(viewsets.ModelViewSet):
     def sales_orders(self, request, pk=None):
         customer = self.get_object()
         sales_orders = SalesOrder.objects.filter(customer=customer)
-        serializer = SalesOrderSerializer(sales_orders, many=True)
-        return Response(serializer.data)
+        return self.list_response(sales_orders, SalesOrderSerializer)
 
-class PurchaseOrderViewSet(viewsets.ModelViewSet):
+class PurchaseOrderViewSet(QueryOptimizationMixin, viewsets.ModelViewSet):
     queryset = PurchaseOrder.objects.all().order_by('-created_at')
     serializer_class = PurchaseOrderSerializer
     permission_classes = [IsAuthenticated]
@@ -76,8 +76,7 @@ class PurchaseOrderViewSet(viewsets.ModelViewSet):
         purchase_order.approved_by = request.user
         purchase_order.save()
         
-        serializer = PurchaseOrderSerializer(purchase_order)
-        return Response(serializer.data)
+        return self.detail_response(purchase_order)
     
     @action(detail=True, methods=['post'])
     def receive(self, request, pk=None):
@@ -87,64 +86,12 @@ class PurchaseOrderViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Only approved or shipped purchase orders can be received'}, 
                            status=status.HTTP_400_BAD_REQUEST)
         
-        # Process received items
         received_items = request.data.get('items', [])
-        for item_data in received_items:
-            item_id = item_data.get('id')
-            received_qty = item_data.get('received_quantity', 0)
-            
-            if not item_id or received_qty <= 0:
-                continue
-            
-            try:
-                po_item = PurchaseOrderItem.objects.get(id=item_id, purchase_order=purchase_order)
-                
-                # Update received quantity
-                remaining_qty = po_item.quantity - po_item.received_quantity
-                if received_qty > remaining_qty:
-                    received_qty = remaining_qty
-                
-                po_item.received_quantity += received_qty
-                po_item.save()
-                
-                # Update inventory
-                inventory, created = Inventory.objects.get_or_create(
-                    product=po_item.product,
-                    warehouse=purchase_order.warehouse,
-                    defaults={'quantity': 0}
-                )
-                
-                old_qty = inventory.quantity
-                inventory.quantity += received_qty
-                inventory.last_restock_date = timezone.now()
-                inventory.save()
-                
-                # Create inventory movement record
-                InventoryMovement.objects.create(
-                    inventory=inventory,
-                    movement_type='IN',
-                    quantity=received_qty,
-                    reference=f"PO #{purchase_order.po_number}",
-                    notes=f"Received from PO #{purchase_order.po_number}",
-                    created_by=request.user
-                )
-                
-            except PurchaseOrderItem.DoesNotExist:
-                continue
-        
-        # Mark PO as received if all items are fully received
-        items = PurchaseOrderItem.objects.filter(purchase_order=purchase_order)
-        all_received = all(item.received_quantity >= item.quantity for item in items)
-        
-        if all_received:
-            purchase_order.status = 'RECEIVED'
-            purchase_order.actual_delivery_date = timezone.now().date()
-            purchase_order.save()
+        services.receive_purchase_order(purchase_order, received_items, user=request.user)
         
-        serializer = PurchaseOrderSerializer(purchase_order)
-        return Response(serializer.data)
+        return self.detail_response(purchase_order)
 
-class PurchaseOrderItemViewSet(viewsets.ModelViewSet):
+class PurchaseOrderItemViewSet(QueryOptimizationMixin, viewsets.ModelViewSet):
     queryset = PurchaseOrderItem.objects.all()
     serializer_class = PurchaseOrderItemSerializer
     permission_classes = [IsAuthenticated]
@@ -156,7 +103,7 @@ class PurchaseOrderItemViewSet(viewsets.ModelViewSet):
         instance.delete()
         purchase_order.update_totals()
 
-class SalesOrderViewSet(viewsets.ModelViewSet):
+class SalesOrderViewSet(QueryOptimizationMixin, viewsets.ModelViewSet):
     queryset = SalesOrder.objects.all().order_by('-created_at')
     serializer_class = SalesOrderSerializer
     permission_classes = [IsAuthenticated]
@@ -204,28 +151,20 @@ class SalesOrderViewSet(viewsets.ModelViewSet):
                            status=status.HTTP_400_BAD_REQUEST)
         
         # Check inventory availability for all items
-        items = SalesOrderItem.objects.filter(sales_order=sales_order)
-        warehouse_id = sales_order.warehouse.id
-        
-        for item in items:
-            inventory = Inventory.objects.filter(
-                product=item.product,
-                warehouse_id=warehouse_id
-            ).first()
-            
-            if not inventory or inventory.quantity < item.quantity:
-                return Response({
-                    'error': f'Insufficient inventory for {item.product.name}',
-                    'available': inventory.quantity if inventory else 0,
-                    'required': item.quantity
-                }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            services.check_availability(sales_order)
+        except services.OrderShortage as e:
+            return Response({
+                'error': f'Insufficient inventory for {e.product_name}',
+                'available': e.available,
+                'required': e.required
+            }, status=status.HTTP_400_BAD_REQUEST)
         
         sales_order.status = 'PROCESSING'
         sales_order.processed_by = request.user
         sales_order.save()
         
-        serializer = SalesOrderSerializer(sales_order)
-        return Response(serializer.data)
+        return self.detail_response(sales_order)
     
     @action(detail=True, methods=['post'])
     def ship(self, request, pk=None):
@@ -248,8 +187,7 @@ class SalesOrderViewSet(viewsets.ModelViewSet):
         sales_order.shipping_date = timezone.now().date()
         sales_order.save()
         
-        serializer = SalesOrderSerializer(sales_order)
-        return Response(serializer.data)
+        return self.detail_response(sales_order)
     
     @action(detail=True, methods=['post'])
     def fulfill(self, request, pk=None):
@@ -259,44 +197,22 @@ class SalesOrderViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Order must be in processing or picking status'}, 
                            status=status.HTTP_400_BAD_REQUEST)
         
-        # Process fulfilled items
-        items = SalesOrderItem.objects.filter(sales_order=sales_order)
-        warehouse = sales_order.warehouse
-        
-        for item in items:
-            inventory = Inventory.objects.get(
-                product=item.product,
-                warehouse=warehouse
-            )
-            
-            if inventory.quantity < item.quantity:
-                return Response({
-                    'error': f'Insufficient inventory for {item.product.name}',
-                    'available': inventory.quantity,
-                    'required': item.quantity
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Update inventory
-            inventory.quantity -= item.quantity
-            inventory.save()
-            
-            # Create inventory movement record
-            InventoryMovement.objects.create(
-                inventory=inventory,
-                movement_type='OUT',
-                quantity=item.quantity,
-                reference=f"SO #{sales_order.order_number}",
-                notes=f"Fulfilled for SO #{sales_order.order_number}",
-                created_by=request.user
-            )
-        
-        sales_order.status = 'PACKED'
-        sales_order.save()
+        # Allocate every line or none of them
+        try:
+            services.allocate_sales_order(sales_order, user=request.user)
+        except services.OrderShortage as e:
+            return Response({
+                'error': f'Insufficient inventory for {e.product_name}',
+                'available': e.available,
+                'required': e.required
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except services.InsufficientStock:
+            return Response({'error': 'Insufficient inventory'},
+                           status=status.HTTP_400_BAD_REQUEST)
         
-        serializer = SalesOrderSerializer(sales_order)
-        return Response(serializer.data)
+        return self.detail_response(sales_order)
 
-class SalesOrderItemViewSet(viewsets.ModelViewSet):
+class SalesOrderItemViewSet(QueryOptimizationMixin, viewsets.ModelViewSet):
     queryset = SalesOrderItem.objects.all()
     serializer_class = SalesOrderItemSerializer
     permission_classes = [IsAuthenticated]
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Report, ReportSchedule, ReportTemplate, GeneratedReport
+from .models import Report, ReportSchedule, ReportTemplate, GeneratedReport, ReportCacheEntry
 
 class ReportAdmin(admin.ModelAdmin):
     list_display = ('title', 'report_type', 'created_by', 'format', 'is_scheduled', 'is_public', 'created_at')
@@ -78,7 +78,14 @@ class GeneratedReportAdmin(admin.ModelAdmin):
         }),
     )
 
+class ReportCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('key', 'report_type', 'format', 'size', 'hits', 'created_at', 'last_used_at')
+    list_filter = ('report_type', 'format')
+    search_fields = ('key',)
+    readonly_fields = ('key', 'source', 'size', 'hits', 'created_at', 'last_used_at')
+
 admin.site.register(Report, ReportAdmin)
 admin.site.register(ReportSchedule, ReportScheduleAdmin)
 admin.site.register(ReportTemplate, ReportTemplateAdmin)
-admin.site.register(GeneratedReport, GeneratedReportAdmin)
\ No newline at end of file
+admin.site.register(GeneratedReport, GeneratedReportAdmin)
+admin.site.register(ReportCacheEntry, ReportCacheEntryAdmin)
\ No newline at end of file
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import logging
+from django.conf import settings
+from django.db.models import Count, F, Max, Q, Sum
+from django.utils import timezone
+from .datasets import DATASETS
+from .models import GeneratedReport, ReportCacheEntry
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_parameters(parameters):
+    """
+    Parameters as they affect the output: empty values are dropped and
+    scalars compared as strings, so {"warehouse_id": 1} and
+    {"warehouse_id": "1", "status": ""} share a key
+    """
+    normalized = {}
+    for name, value in (parameters or {}).items():
+        if value is None or value == '' or value == []:
+            continue
+        if isinstance(value, (list, tuple)):
+            value = [str(item) for item in value]
+        elif not isinstance(value, dict):
+            value = str(value)
+        normalized[name] = value
+    return normalized
+
+
+def data_watermark(report_type):
+    """
+    (latest id, latest change) of every source table of a report type's
+    dataset, or None if it has no dataset and cannot be cached. Both are
+    read from an index, so the cost does not grow with the tables. Inserts
+    and updates move the watermark, as does deleting the newest row;
+    deleting an older row does not. Movements are tracked by id because
+    stock updates may bypass auto_now.
+    """
+    dataset = DATASETS.get(report_type)
+    if dataset is None or not dataset.sources:
+        return None
+
+    watermark = []
+    for model, field in dataset.sources:
+        aggregates = {'latest_id': Max('pk')}
+        if field != model._meta.pk.name:
+            aggregates['latest'] = Max(field)
+        totals = model.objects.order_by().aggregate(**aggregates)
+        watermark.append([model._meta.label, totals['latest_id'], totals.get('latest')])
+    return watermark
+
+
+def cache_key(report_type, format, parameters):
+    """
+    Content address of a report output, or None if it cannot be cached
+    """
+    if settings.REPORT_CACHE_MAX_ENTRIES <= 0:
+        return None
+
+    watermark = data_watermark(report_type)
+    if watermark is None:
+        return None
+
+    payload = json.dumps({
+        'report_type': report_type,
+        'format': format,
+        'parameters': normalize_parameters(parameters),
+        'watermark': watermark,
+        # Rows computed against today's date change at midnight even when
+        # no table does
+        'date': timezone.localdate() if DATASETS[report_type].date_relative else None,
+    }, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def lookup(key):
+    """
+    The cache entry for key, or None. An entry whose file has gone missing
+    from storage is dropped.
+    """
+    entry = ReportCacheEntry.objects.select_related('source').filter(key=key).first()
+    if entry is None:
+        return None
+
+    file = entry.source.file
+    if not file or not file.storage.exists(file.name):
+        entry.delete()
+        return None
+
+    ReportCacheEntry.objects.filter(pk=entry.pk).update(hits=F('hits') + 1, last_used_at=timezone.now())
+    return entry
+
+
+def store(key, generated_report):
+    """
+    Record a freshly generated report under key and evict past the limits
+    """
+    # A concurrent worker may have stored the same output first; its entry wins
+    ReportCacheEntry.objects.get_or_create(key=key, defaults={
+        'report_type': generated_report.report.report_type,
+        'format': generated_report.report.format,
+        'source': generated_report,
+        'size': generated_report.file.size,
+    })
+    evict()
+
+
+def evict():
+    """
+    Drop least recently used entries until both REPORT_CACHE_MAX_ENTRIES
+    and REPORT_CACHE_MAX_BYTES hold. Files are left alone: they still
+    belong to the generated reports that link them.
+    """
+    max_entries = settings.REPORT_CACHE_MAX_ENTRIES
+    max_bytes = settings.REPORT_CACHE_MAX_BYTES
+    kept = total = 0
+    evicted = []
+
+    for pk, size in ReportCacheEntry.objects.order_by('-last_used_at', '-id').values_list('pk', 'size'):
+        if kept < max_entries and total + size <= max_bytes:
+            kept += 1
+            total += size
+        else:
+            evicted.append(pk)
+
+    if evicted:
+        ReportCacheEntry.objects.filter(pk__in=evicted).delete()
+        logger.info('Evicted %s report cache entries', len(evicted))
+
+
+def stats():
+    """
+    Hit and miss counts over all generated reports, plus current cache size
+    """
+    counts = GeneratedReport.objects.filter(cache_key__isnull=False).aggregate(
+        hits=Count('pk', filter=Q(cache_hit=True)),
+        misses=Count('pk', filter=Q(cache_hit=False))
+    )
+    entries = ReportCacheEntry.objects.aggregate(entries=Count('pk'), size=Sum('size'))
+    lookups = counts['hits'] + counts['misses']
+    return {
+        'hits': counts['hits'],
+        'misses': counts['misses'],
+        'hit_rate': round(counts['hits'] / lookups, 4) if lookups else None,
+        'entries': entries['entries'],
+        'size': entries['size'] or 0,
+        'max_entries': settings.REPORT_CACHE_MAX_ENTRIES,
+        'max_bytes': settings.REPORT_CACHE_MAX_BYTES,
+    }
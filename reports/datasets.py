@@ -0,0 +1,924 @@
+import calendar
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import (Avg, Count, DateField, DecimalField, ExpressionWrapper, F, FloatField,
+                              Func, IntegerField, Max, Min, OuterRef, Q, Subquery, Sum, Value)
+from django.db.models.functions import (Abs, Coalesce, Concat, NullIf, Round, TruncDay, TruncHour, TruncMonth,
+                                        TruncQuarter, TruncWeek)
+from django.db.models.lookups import GreaterThanOrEqual, LessThanOrEqual
+from django.utils import timezone
+from inventory import rollups
+from inventory.models import (Category, DailyMovementRollup, HourlyMovementRollup, Inventory, InventoryMovement,
+                              Product, RollupWatermark)
+from orders.models import Customer, PurchaseOrder, PurchaseOrderItem, SalesOrder, SalesOrderItem, Supplier
+from orders.services import RECEIPT_REFERENCE_PREFIX
+from users.models import Activity, UserProfile
+from warehouse.models import Warehouse
+
+
+def parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def start_of_day(value):
+    return timezone.make_aware(datetime.combine(parse_date(value), time.min))
+
+
+def start_of_next_day(value):
+    return start_of_day(value) + timedelta(days=1)
+
+
+def money(value):
+    return f"${value or Decimal('0'):,.2f}"
+
+
+def percent(value):
+    return f"{value:.2f}%" if value is not None else ''
+
+
+def ratio(numerator, denominator):
+    """
+    numerator / denominator as a percentage rounded to two places, NULL
+    when the denominator is zero. Float division, as SQLite divides
+    integer values as integers.
+    """
+    return Round(ExpressionWrapper(numerator * 100.0 / NullIf(denominator, 0), output_field=FloatField()), 2)
+
+
+# Date buckets of the period parameter
+PERIODS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+    'quarter': TruncQuarter,
+}
+
+
+def period_bucket(period, lookup):
+    """
+    Expression truncating the date at lookup to the start of its period
+    """
+    if period not in PERIODS:
+        raise ValueError(f"period must be one of: {', '.join(PERIODS)}")
+    return PERIODS[period](lookup, output_field=DateField())
+
+
+def locked_watermark(rollup):
+    """
+    Last movement id folded into the rollup, locked until the end of the
+    transaction so the rollup does not move while it and the movements
+    past it are read
+    """
+    return (RollupWatermark.objects.select_for_update()
+            .filter(name=rollup.name)
+            .values_list('last_id', flat=True).first()) or 0
+
+
+class DaysBetween(Func):
+    """
+    Whole days from the start date to the end date, NULL when either is.
+    Native date arithmetic on each backend, so it stays cheap over many
+    rows; a DurationField subtraction runs a Python function per row on
+    SQLite.
+    """
+    arg_joiner = ' - '
+    template = '(%(expressions)s)'
+    output_field = IntegerField()
+
+    def __init__(self, end, start, **extra):
+        super().__init__(end, start, **extra)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template='CAST(julianday(%(expressions)s) AS INTEGER)',
+                           arg_joiner=') - julianday(', **extra_context)
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template='DATEDIFF(%(expressions)s)', arg_joiner=', ',
+                           **extra_context)
+
+
+class Dataset:
+    """
+    Declarative description of the rows behind a report. Subclasses name
+    the model, the output columns as lookups across its joins, the
+    parameters they filter on and the aggregates of the summary; filtering,
+    grouping and totals are all done by the database.
+    """
+    title = None
+    model = None
+    # Output column name: lookup
+    columns = {}
+    # Parameter name: (lookup, parser)
+    filters = {}
+    # Aggregate name: (summary label, aggregate expression, formatter or None)
+    summary = {}
+    # (model, field) of every table read; their latest id and latest
+    # change are the data watermark of reports.cache
+    sources = []
+    # Whether rows depend on today's date, which reports.cache then adds
+    # to the key
+    date_relative = False
+
+    def __init__(self, parameters=None):
+        self.parameters = parameters or {}
+
+    def queryset(self):
+        """
+        The model's rows with the parameter filters applied
+        """
+        return self.apply_filters(self.model.objects.all(), self.filters)
+
+    def apply_filters(self, queryset, filters):
+        """
+        Filter queryset by the parameters named in filters, a
+        {parameter: (lookup, parser)} mapping; empty values mean no filter
+        """
+        for parameter, (lookup, parse) in filters.items():
+            value = self.parameters.get(parameter)
+            if value is not None and value != '':
+                queryset = queryset.filter(**{lookup: parse(value)})
+        return queryset
+
+    def rows(self):
+        """
+        Column names and a values_list queryset producing the rows
+        """
+        return list(self.columns), self.queryset().order_by('pk').values_list(*self.columns.values())
+
+    def aggregates(self):
+        return {name: expression for name, (_, expression, _) in self.summary.items()}
+
+    def totals(self):
+        """
+        Every summary aggregate in one query, as {name: value}
+        """
+        return self.queryset().order_by().aggregate(**self.aggregates())
+
+    def summary_rows(self):
+        """
+        Formatted [label, value] pairs for a summary page
+        """
+        totals = self.totals()
+        return [[label, formatter(totals[name]) if formatter else totals[name]]
+                for name, (label, _, formatter) in self.summary.items()]
+
+    def grouped(self, *by, **aggregates):
+        """
+        One row per distinct value of the `by` lookups with the aggregates
+        (default: the summary's) computed by GROUP BY, as a values queryset
+        """
+        return self.queryset().values(*by).annotate(**(aggregates or self.aggregates())).order_by(*by)
+
+    def frame(self, *by, **aggregates):
+        """
+        grouped() as a pandas DataFrame; only the aggregated rows leave the
+        database
+        """
+        import pandas as pd
+
+        groups = self.grouped(*by, **aggregates)
+        return pd.DataFrame.from_records(list(groups), columns=[*by, *(aggregates or self.summary)])
+
+
+class InventoryDataset(Dataset):
+    """
+    One row per inventory record (product stock in a warehouse), or
+    (section: movements) the quantity moved per period, product,
+    warehouse and movement type. Movements up to the daily rollup's
+    watermark are read from DailyMovementRollup and later ones from the
+    ledger, both grouped in SQL, so a year of history costs about one
+    row per product, warehouse and day.
+    """
+    title = 'Inventory Report'
+    model = Inventory
+    columns = {
+        'product_id': 'product_id',
+        'name': 'product__name',
+        'sku': 'product__sku',
+        'category': 'product__category__name',
+        'warehouse': 'warehouse__name',
+        'quantity': 'quantity',
+        'min_quantity': 'min_quantity',
+        'max_quantity': 'max_quantity',
+        'reorder_level': 'reorder_level',
+        'cost_price': 'product__cost_price',
+        'selling_price': 'product__selling_price',
+    }
+    filters = {
+        'category_id': ('product__category_id', int),
+        'warehouse_id': ('warehouse_id', int),
+        'min_stock': ('quantity__gte', int),
+        'max_stock': ('quantity__lte', int),
+    }
+    summary = {
+        'products': ('Total Products', Count('product', distinct=True), None),
+        'units': ('Total Units', Sum('quantity'), None),
+        'value': ('Total Inventory Value',
+                  Sum(F('quantity') * F('product__cost_price'), output_field=DecimalField()), money),
+        'low_stock': ('Low Stock Items', Count('pk', filter=Q(quantity__lt=F('reorder_level'))), None),
+    }
+    # Filters of the movements section, on the rollup and on movements
+    # not folded into it yet
+    rollup_filters = {
+        'start_date': ('date__gte', parse_date),
+        'end_date': ('date__lte', parse_date),
+        'category_id': ('product__category_id', int),
+        'warehouse_id': ('warehouse_id', int),
+        'product_id': ('product_id', int),
+    }
+    movement_filters = {
+        'start_date': ('created_at__gte', start_of_day),
+        'end_date': ('created_at__lt', start_of_next_day),
+        'category_id': ('inventory__product__category_id', int),
+        'warehouse_id': ('inventory__warehouse_id', int),
+        'product_id': ('inventory__product_id', int),
+    }
+    # Movements section: output column name: (rollup lookup, movement lookup)
+    MOVEMENT_GROUPS = {
+        'product_id': ('product_id', 'inventory__product_id'),
+        'sku': ('product__sku', 'inventory__product__sku'),
+        'product': ('product__name', 'inventory__product__name'),
+        'warehouse_id': ('warehouse_id', 'inventory__warehouse_id'),
+        'warehouse': ('warehouse__name', 'inventory__warehouse__name'),
+    }
+    MOVEMENT_TYPES = [movement_type for movement_type, _ in InventoryMovement.TYPE_CHOICES]
+    sources = [(Inventory, 'updated_at'), (Product, 'updated_at'), (Category, 'updated_at'),
+               (Warehouse, 'updated_at'), (InventoryMovement, 'id')]
+
+    def rows(self):
+        section = self.parameters.get('section') or 'stock'
+        if section == 'stock':
+            return super().rows()
+        elif section == 'movements':
+            return self.movement_rows()
+        raise ValueError('section must be one of: stock, movements')
+
+    def movement_rows(self):
+        period = self.parameters.get('period') or 'month'
+        rollup_lookups = [lookup for lookup, _ in self.MOVEMENT_GROUPS.values()]
+        movement_lookups = [lookup for _, lookup in self.MOVEMENT_GROUPS.values()]
+
+        # Hold the watermark so the rollup does not move while both halves
+        # are read
+        with transaction.atomic():
+            last_id = locked_watermark(rollups.DAILY)
+            groups = list(self.apply_filters(DailyMovementRollup.objects.all(), self.rollup_filters)
+                          .values(*rollup_lookups, 'movement_type', period=period_bucket(period, 'date'))
+                          .annotate(quantity=Sum('quantity'), movements=Sum('movement_count'))
+                          .order_by()
+                          .values_list('period', *rollup_lookups, 'movement_type', 'quantity', 'movements'))
+            movements = InventoryMovement.objects.filter(id__gt=last_id)
+            groups += list(self.apply_filters(movements, self.movement_filters)
+                           .values(*movement_lookups, 'movement_type', period=period_bucket(period, 'created_at'))
+                           .annotate(quantity=Sum('quantity'), movements=Count('pk'))
+                           .order_by()
+                           .values_list('period', *movement_lookups, 'movement_type', 'quantity', 'movements'))
+
+        # Both halves may hold the same key; add them up per movement type
+        totals = {}
+        for *key, movement_type, quantity, count in groups:
+            row = totals.setdefault(tuple(key), dict.fromkeys(self.MOVEMENT_TYPES, 0) | {'movements': 0})
+            row[movement_type] += quantity
+            row['movements'] += count
+
+        columns = ['period', *self.MOVEMENT_GROUPS, *(t.lower() for t in self.MOVEMENT_TYPES), 'movements']
+        rows = [(*key, *row.values()) for key, row in sorted(totals.items())]
+        return columns, rows
+
+
+class OrderDataset(Dataset):
+    """
+    One row per sales order
+    """
+    title = 'Order Report'
+    model = SalesOrder
+    columns = {
+        'id': 'id',
+        'order_number': 'order_number',
+        'customer': 'customer__name',
+        'status': 'status',
+        'order_date': 'order_date',
+        'shipping_date': 'shipping_date',
+        'delivery_date': 'delivery_date',
+        'total': 'total',
+        'warehouse': 'warehouse__name',
+    }
+    filters = {
+        'start_date': ('order_date__gte', parse_date),
+        'end_date': ('order_date__lte', parse_date),
+        'status': ('status', str),
+        'warehouse_id': ('warehouse_id', int),
+    }
+    summary = {
+        'orders': ('Total Orders', Count('pk'), None),
+        'value': ('Total Value', Sum('total'), money),
+        'customers': ('Customers', Count('customer', distinct=True), None),
+        'delivered': ('Delivered Orders', Count('pk', filter=Q(status='DELIVERED')), None),
+        'cancelled': ('Cancelled Orders', Count('pk', filter=Q(status='CANCELLED')), None),
+    }
+    sources = [(SalesOrder, 'updated_at'), (Customer, 'updated_at'), (Warehouse, 'updated_at')]
+
+
+# Sales order line measures; margin is revenue less cost at the product's
+# current cost_price
+SALES_REVENUE = Sum(F('quantity') * F('unit_price') - F('discount'), output_field=DecimalField())
+SALES_COST = Sum(F('quantity') * F('product__cost_price'), output_field=DecimalField())
+
+
+class SalesDataset(Dataset):
+    """
+    Sales order lines bucketed by order date (period: day, week, month or
+    quarter) and grouped by product, category or warehouse (group_by).
+    Buckets and measures are computed by one GROUP BY query. With pivot
+    set to a measure, the small grouped result is pivoted with pandas into
+    one row per group and one column per period.
+    """
+    title = 'Sales Report'
+    model = SalesOrderItem
+    filters = {
+        'start_date': ('sales_order__order_date__gte', parse_date),
+        'end_date': ('sales_order__order_date__lte', parse_date),
+        'status': ('sales_order__status', str),
+        'warehouse_id': ('sales_order__warehouse_id', int),
+        'category_id': ('product__category_id', int),
+        'product_id': ('product_id', int),
+    }
+    # Orders that never turned into a sale, unless a status is asked for
+    EXCLUDED_STATUSES = ('DRAFT', 'CANCELLED')
+    # Group: output column name: lookup
+    GROUPS = {
+        'product': {'product_id': 'product_id', 'sku': 'product__sku', 'product': 'product__name'},
+        'category': {'category_id': 'product__category_id', 'category': 'product__category__name'},
+        'warehouse': {'warehouse_id': 'sales_order__warehouse_id', 'warehouse': 'sales_order__warehouse__name'},
+    }
+    summary = {
+        'orders': ('Orders', Count('sales_order', distinct=True), None),
+        'units': ('Units Sold', Sum('quantity'), None),
+        'revenue': ('Revenue', SALES_REVENUE, money),
+        'discounts': ('Discounts', Sum('discount'), money),
+        'cost': ('Cost of Goods', SALES_COST, money),
+        'margin': ('Margin', SALES_REVENUE - SALES_COST, money),
+        'margin_pct': ('Margin %', ratio(SALES_REVENUE - SALES_COST, SALES_REVENUE), percent),
+    }
+    sources = [(SalesOrderItem, 'updated_at'), (SalesOrder, 'updated_at'), (Product, 'updated_at'),
+               (Category, 'updated_at'), (Warehouse, 'updated_at')]
+
+    def queryset(self):
+        queryset = super().queryset()
+        if not self.parameters.get('status'):
+            queryset = queryset.exclude(sales_order__status__in=self.EXCLUDED_STATUSES)
+        return queryset
+
+    def rows(self):
+        period = self.parameters.get('period') or 'month'
+        group = self.parameters.get('group_by') or 'product'
+        if group not in self.GROUPS:
+            raise ValueError(f"group_by must be one of: {', '.join(self.GROUPS)}")
+
+        lookups = list(self.GROUPS[group].values())
+        groups = (self.queryset()
+                  .annotate(period=period_bucket(period, 'sales_order__order_date'))
+                  .values('period', *lookups)
+                  .annotate(**self.aggregates())
+                  .order_by('period', *lookups))
+        columns = ['period', *self.GROUPS[group], *self.summary]
+
+        measure = self.parameters.get('pivot')
+        if not measure:
+            return columns, groups.values_list('period', *lookups, *self.summary)
+        return self._pivot(groups, lookups, list(self.GROUPS[group]), measure)
+
+    def _pivot(self, groups, lookups, names, measure):
+        import pandas as pd
+
+        if measure not in self.summary or measure == 'margin_pct':
+            raise ValueError(f"pivot must be one of: {', '.join(m for m in self.summary if m != 'margin_pct')}")
+
+        frame = pd.DataFrame.from_records(list(groups.values('period', *lookups, measure)),
+                                          columns=['period', *lookups, measure])
+        if frame.empty:
+            return [*names, 'total'], []
+
+        table = frame.pivot_table(index=lookups, columns='period', values=measure,
+                                  aggfunc='sum', fill_value=0, sort=True)
+        table['total'] = table.sum(axis=1)
+        columns = [*names, *(str(period) for period in table.columns[:-1]), 'total']
+        return columns, [(*(key if isinstance(key, tuple) else (key,)), *values)
+                         for key, values in zip(table.index, table.itertuples(index=False))]
+
+
+class ReceivingDataset(Dataset):
+    """
+    Purchase orders summarised per supplier: fill rate of the ordered
+    units, late deliveries, receipts booked as IN movements against the
+    order reference and lead time (order date to actual delivery date)
+    percentiles. Counts and sums are GROUP BY queries; the percentiles are
+    computed with NumPy over one (supplier, lead time) array fetched from
+    the delivered orders.
+    """
+    title = 'Receiving Report'
+    model = PurchaseOrder
+    filters = {
+        'start_date': ('order_date__gte', parse_date),
+        'end_date': ('order_date__lte', parse_date),
+        'status': ('status', str),
+        'supplier_id': ('supplier_id', int),
+        'warehouse_id': ('warehouse_id', int),
+    }
+    # Orders that were never placed with the supplier, unless a status is
+    # asked for
+    EXCLUDED_STATUSES = ('DRAFT', 'CANCELLED')
+    PERCENTILES = (50, 90, 95)
+    COLUMNS = [
+        'supplier_id', 'supplier', 'orders', 'delivered', 'late', 'overdue', 'lines', 'ordered_units',
+        'received_units', 'fill_rate', 'receipts', 'receipt_units', 'lead_days_mean',
+        *(f"lead_days_p{p}" for p in PERCENTILES),
+    ]
+    summary = {
+        'orders': ('Purchase Orders', Count('pk', distinct=True), None),
+        'suppliers': ('Suppliers', Count('supplier', distinct=True), None),
+        'ordered_units': ('Units Ordered', Sum('items__quantity'), None),
+        'received_units': ('Units Received', Sum('items__received_quantity'), None),
+        'fill_rate': ('Fill Rate', ratio(Sum('items__received_quantity'), Sum('items__quantity')), percent),
+        'late': ('Late Deliveries',
+                 Count('pk', distinct=True, filter=Q(actual_delivery_date__gt=F('expected_delivery_date'))), None),
+    }
+    sources = [(PurchaseOrder, 'updated_at'), (PurchaseOrderItem, 'updated_at'), (Supplier, 'updated_at'),
+               (InventoryMovement, 'id')]
+    # Overdue orders are counted against today
+    date_relative = True
+
+    def queryset(self):
+        queryset = super().queryset()
+        if not self.parameters.get('status'):
+            queryset = queryset.exclude(status__in=self.EXCLUDED_STATUSES)
+        return queryset
+
+    def rows(self):
+        """
+        One row per supplier, ordered by supplier name. The result is a
+        small list, computed up front.
+        """
+        orders = self.queryset()
+        today = timezone.localdate()
+
+        suppliers = (orders.order_by()
+                     .values('supplier_id', 'supplier__name')
+                     .annotate(orders=Count('pk'),
+                               delivered=Count('pk', filter=Q(actual_delivery_date__isnull=False)),
+                               late=Count('pk', filter=Q(actual_delivery_date__gt=F('expected_delivery_date'))),
+                               overdue=Count('pk', filter=Q(actual_delivery_date__isnull=True,
+                                                            expected_delivery_date__lt=today)),
+                               receipts=Sum(self._movements('receipts', Count('pk'))),
+                               receipt_units=Sum(self._movements('units', Sum('quantity'))))
+                     .order_by('supplier__name', 'supplier_id'))
+        items = {
+            row['purchase_order__supplier_id']: row
+            for row in (PurchaseOrderItem.objects
+                        .filter(purchase_order__in=orders.values('pk'))
+                        .values('purchase_order__supplier_id')
+                        .annotate(lines=Count('pk'), ordered=Sum('quantity'), received=Sum('received_quantity'),
+                                  fill_rate=ratio(Sum('received_quantity'), Sum('quantity')))
+                        .order_by())
+        }
+        lead_times = self.lead_times()
+
+        rows = []
+        for supplier in suppliers:
+            item = items.get(supplier['supplier_id'], {})
+            lead = lead_times.get(supplier['supplier_id'], (None,) * (len(self.PERCENTILES) + 1))
+            rows.append((
+                supplier['supplier_id'], supplier['supplier__name'], supplier['orders'], supplier['delivered'],
+                supplier['late'], supplier['overdue'], item.get('lines', 0), item.get('ordered', 0),
+                item.get('received', 0), item.get('fill_rate'), supplier['receipts'] or 0,
+                supplier['receipt_units'] or 0, *lead,
+            ))
+        return list(self.COLUMNS), rows
+
+    def lead_times(self, by_supplier=True):
+        """
+        Lead time statistics in days of the delivered orders: (mean,
+        *PERCENTILES) per supplier_id, or overall with by_supplier False
+        """
+        import numpy as np
+
+        values = (self.queryset()
+                  .filter(actual_delivery_date__isnull=False)
+                  .annotate(lead=DaysBetween('actual_delivery_date', 'order_date'))
+                  .order_by('supplier_id')
+                  .values_list('supplier_id', 'lead'))
+        fetched = list(values)
+        if not fetched:
+            return {}
+
+        supplier_ids = np.fromiter((row[0] for row in fetched), dtype=np.int64, count=len(fetched))
+        days = np.fromiter((row[1] for row in fetched), dtype=np.float64, count=len(fetched))
+        if not by_supplier:
+            return self._lead_stats(days)
+
+        # Rows arrive sorted by supplier, so each supplier is one slice
+        starts = np.flatnonzero(np.r_[True, supplier_ids[1:] != supplier_ids[:-1]])
+        return {int(supplier_ids[start]): self._lead_stats(group)
+                for start, group in zip(starts, np.split(days, starts[1:]))}
+
+    def summary_rows(self):
+        rows = super().summary_rows()
+        lead = self.lead_times(by_supplier=False)
+        if lead:
+            rows.append(['Mean Lead Time (days)', lead[0]])
+            rows += [[f"Lead Time P{p} (days)", value] for p, value in zip(self.PERCENTILES, lead[1:])]
+        return rows
+
+    def _lead_stats(self, days):
+        import numpy as np
+
+        return (round(float(days.mean()), 1),
+                *(round(float(value), 1) for value in np.percentile(days, self.PERCENTILES)))
+
+    def _movements(self, name, aggregate):
+        """
+        Correlated subquery over the IN movements booked against the
+        purchase order's reference by receive_purchase_order
+        """
+        movements = (InventoryMovement.objects
+                     .filter(movement_type='IN',
+                             reference=Concat(Value(RECEIPT_REFERENCE_PREFIX), OuterRef('po_number')))
+                     .order_by()
+                     .values('reference')
+                     .annotate(**{name: aggregate})
+                     .values(name))
+        return Coalesce(Subquery(movements, output_field=IntegerField()), 0)
+
+
+# Order fulfilment intervals in days; NULL until the later date is set
+SHIP_DAYS = DaysBetween('shipping_date', 'order_date')
+DELIVERY_DAYS = DaysBetween('delivery_date', 'shipping_date')
+
+
+class ShippingDataset(Dataset):
+    """
+    Sales order fulfilment by order date period, warehouse and shipping
+    method (section: cycle), or the open orders by warehouse and status
+    (section: backlog). Each section is one GROUP BY query streamed in
+    chunks, with the date intervals computed by the database; the
+    order-to-ship and ship-to-deliver distributions are day-bucket counts.
+    """
+    title = 'Shipping Report'
+    model = SalesOrder
+    filters = {
+        'start_date': ('order_date__gte', parse_date),
+        'end_date': ('order_date__lte', parse_date),
+        'status': ('status', str),
+        'warehouse_id': ('warehouse_id', int),
+        'shipping_method': ('shipping_method', str),
+    }
+    EXCLUDED_STATUSES = ('DRAFT', 'CANCELLED')
+    # Orders placed but not shipped yet
+    OPEN_STATUSES = ('SUBMITTED', 'PROCESSING', 'PICKING', 'PACKED')
+    # Distribution buckets: name suffix, first day, last day (None: open)
+    DAY_BUCKETS = (('0d', 0, 0), ('1d', 1, 1), ('2_3d', 2, 3), ('4_7d', 4, 7), ('8d_plus', 8, None))
+    # Backlog age buckets, by days since the order date
+    AGE_BUCKETS = (('0_2d', 0, 2), ('3_7d', 3, 7), ('8d_plus', 8, None))
+    summary = {
+        'orders': ('Orders', Count('pk'), None),
+        'shipped': ('Shipped', Count('pk', filter=Q(shipping_date__isnull=False)), None),
+        'delivered': ('Delivered', Count('pk', filter=Q(delivery_date__isnull=False)), None),
+        'same_day_pct': ('Shipped Same Day', ratio(Count('pk', filter=Q(shipping_date=F('order_date'))),
+                                                   Count('pk', filter=Q(shipping_date__isnull=False))), percent),
+        'ship_days': ('Avg Days to Ship', Round(Avg(SHIP_DAYS), 2), None),
+        'delivery_days': ('Avg Days in Transit', Round(Avg(DELIVERY_DAYS), 2), None),
+        **{f"backlog_{status.lower()}": (f"Backlog: {status.title()}", Count('pk', filter=Q(status=status)), None)
+           for status in OPEN_STATUSES},
+    }
+    sources = [(SalesOrder, 'updated_at'), (Warehouse, 'updated_at')]
+    # Backlog ages are counted from today
+    date_relative = True
+
+    def queryset(self):
+        queryset = super().queryset()
+        if not self.parameters.get('status'):
+            queryset = queryset.exclude(status__in=self.EXCLUDED_STATUSES)
+        return queryset
+
+    def rows(self):
+        section = self.parameters.get('section') or 'cycle'
+        if section == 'cycle':
+            return self.cycle_rows()
+        elif section == 'backlog':
+            return self.backlog_rows()
+        raise ValueError('section must be one of: cycle, backlog')
+
+    def cycle_rows(self):
+        groups = ('warehouse_id', 'warehouse__name', 'shipping_method')
+        aggregates = {
+            'orders': Count('pk'),
+            'shipped': Count('pk', filter=Q(shipping_date__isnull=False)),
+            'delivered': Count('pk', filter=Q(delivery_date__isnull=False)),
+            'same_day': Count('pk', filter=Q(shipping_date=F('order_date'))),
+            'same_day_pct': ratio(Count('pk', filter=Q(shipping_date=F('order_date'))),
+                                  Count('pk', filter=Q(shipping_date__isnull=False))),
+            'ship_days': Round(Avg(SHIP_DAYS), 2),
+            **self._distribution('ship', SHIP_DAYS),
+            'delivery_days': Round(Avg(DELIVERY_DAYS), 2),
+            **self._distribution('delivery', DELIVERY_DAYS),
+        }
+        period = self.parameters.get('period') or 'month'
+        rows = (self.queryset()
+                .annotate(period=period_bucket(period, 'order_date'))
+                .values('period', *groups)
+                .annotate(**aggregates)
+                .order_by('period', *groups)
+                .values_list('period', *groups, *aggregates))
+        return ['period', 'warehouse_id', 'warehouse', 'shipping_method', *aggregates], rows
+
+    def backlog_rows(self):
+        today = timezone.localdate()
+        groups = ('warehouse_id', 'warehouse__name', 'status')
+        aggregates = {
+            'orders': Count('pk'),
+            'value': Sum('total'),
+            'oldest_order_date': Min('order_date'),
+            **{f"age_{name}": Count('pk', filter=Q(order_date__lte=today - timedelta(days=first),
+                                                   **({'order_date__gte': today - timedelta(days=last)}
+                                                      if last is not None else {})))
+               for name, first, last in self.AGE_BUCKETS},
+        }
+        rows = (self.queryset()
+                .filter(status__in=self.OPEN_STATUSES)
+                .values(*groups)
+                .annotate(**aggregates)
+                .order_by(*groups)
+                .values_list(*groups, *aggregates))
+        return ['warehouse_id', 'warehouse', 'status', *aggregates], rows
+
+    def _distribution(self, prefix, interval):
+        """
+        Count of orders per DAY_BUCKETS range of the interval in days
+        """
+        buckets = {}
+        for name, first, last in self.DAY_BUCKETS:
+            condition = GreaterThanOrEqual(interval, first)
+            if last is not None:
+                condition = Q(condition, LessThanOrEqual(interval, last))
+            buckets[f"{prefix}_{name}"] = Count('pk', filter=condition)
+        return buckets
+
+
+class PerformanceDataset(Dataset):
+    """
+    Movement throughput per user, role or warehouse (group_by): lines and
+    units booked, the hours with any activity, lines and units per active
+    hour and the busiest hour, or (section: heatmap) lines or units
+    (measure) per weekday and hour of day.
+
+    Hours up to the hourly rollup's watermark are read from
+    HourlyMovementRollup and later movements from the ledger, both
+    grouped by hour in SQL; the two compact results are combined and
+    pivoted with NumPy.
+    """
+    title = 'Performance Report'
+    model = HourlyMovementRollup
+    filters = {
+        'start_date': ('hour__gte', start_of_day),
+        'end_date': ('hour__lt', start_of_next_day),
+        'warehouse_id': ('warehouse_id', int),
+        'user_id': ('user_id', int),
+        'role': ('user__profile__role', str),
+        'movement_type': ('movement_type', str),
+    }
+    # The same filters on movements not folded into the rollup yet
+    movement_filters = {
+        'start_date': ('created_at__gte', start_of_day),
+        'end_date': ('created_at__lt', start_of_next_day),
+        'warehouse_id': ('inventory__warehouse_id', int),
+        'user_id': ('created_by_id', int),
+        'role': ('created_by__profile__role', str),
+        'movement_type': ('movement_type', str),
+    }
+    # Group: output column name: (rollup lookup, movement lookup)
+    GROUPS = {
+        'user': {
+            'user_id': ('user_id', 'created_by_id'),
+            'username': ('user__username', 'created_by__username'),
+            'role': ('user__profile__role', 'created_by__profile__role'),
+        },
+        'role': {'role': ('user__profile__role', 'created_by__profile__role')},
+        'warehouse': {
+            'warehouse_id': ('warehouse_id', 'inventory__warehouse_id'),
+            'warehouse': ('warehouse__name', 'inventory__warehouse__name'),
+        },
+    }
+    MEASURES = ('lines', 'units')
+    sources = [(InventoryMovement, 'id'), (UserProfile, 'updated_at'), (Warehouse, 'updated_at')]
+
+    def rows(self):
+        group = self.parameters.get('group_by') or 'user'
+        if group not in self.GROUPS:
+            raise ValueError(f"group_by must be one of: {', '.join(self.GROUPS)}")
+        section = self.parameters.get('section') or 'throughput'
+        if section not in ('throughput', 'heatmap'):
+            raise ValueError('section must be one of: throughput, heatmap')
+
+        keys, hourly = self.hourly(group)
+        if section == 'heatmap':
+            return self._heatmap(group, keys, hourly)
+        return self._throughput(group, keys, hourly)
+
+    def hourly(self, group):
+        """
+        Lines and units per group and hour, as (group keys, arrays): the
+        arrays hold the index into keys, the hour (epoch hours), whether
+        the movements were IN or OUT, and the lines and units
+        """
+        import numpy as np
+
+        rollup_lookups = [lookup for lookup, _ in self.GROUPS[group].values()]
+        movement_lookups = [lookup for _, lookup in self.GROUPS[group].values()]
+
+        # Hold the watermark so the rollup does not move while both halves
+        # are read
+        with transaction.atomic():
+            last_id = locked_watermark(rollups.HOURLY)
+            rows = list(self.queryset()
+                        .values(*rollup_lookups, 'hour', 'movement_type')
+                        .annotate(units=Sum('units'), lines=Sum('movement_count'))
+                        .order_by()
+                        .values_list(*rollup_lookups, 'hour', 'movement_type', 'lines', 'units'))
+            rows += list(self.movements(last_id)
+                         .values(*movement_lookups, 'movement_type', hour=TruncHour('created_at'))
+                         .annotate(units=Sum(Abs('quantity')), lines=Count('pk'))
+                         .order_by()
+                         .values_list(*movement_lookups, 'hour', 'movement_type', 'lines', 'units'))
+
+        width = len(rollup_lookups)
+        keys = {}
+        codes = np.fromiter((keys.setdefault(row[:width], len(keys)) for row in rows), dtype=np.int64, count=len(rows))
+        hours = np.fromiter((int(row[width].timestamp()) // 3600 for row in rows), dtype=np.int64, count=len(rows))
+        types = np.array([row[width + 1] for row in rows], dtype=object)
+        hourly = {
+            'code': codes,
+            'hour': hours,
+            'in': types == 'IN',
+            'out': types == 'OUT',
+            'lines': np.fromiter((row[width + 2] for row in rows), dtype=np.int64, count=len(rows)),
+            'units': np.fromiter((row[width + 3] for row in rows), dtype=np.int64, count=len(rows)),
+        }
+        return list(keys), hourly
+
+    def movements(self, after_id):
+        """
+        Ledger movements past the rollup watermark, with the filters applied
+        """
+        return self.apply_filters(InventoryMovement.objects.filter(id__gt=after_id), self.movement_filters)
+
+    def summary_rows(self):
+        import numpy as np
+
+        keys, hourly = self.hourly('user')
+        lines, units = int(hourly['lines'].sum()), int(hourly['units'].sum())
+        user_hours = np.unique(np.stack([hourly['code'], hourly['hour']]), axis=1).shape[1]
+        return [
+            ['Lines', lines],
+            ['Units', units],
+            ['Users', len(keys)],
+            ['Active User Hours', user_hours],
+            ['Lines per User Hour', round(lines / user_hours, 2) if user_hours else None],
+        ]
+
+    def _throughput(self, group, keys, hourly):
+        import numpy as np
+
+        columns = [*self.GROUPS[group], 'lines', 'units', 'inbound_lines', 'outbound_lines', 'active_hours',
+                   'lines_per_hour', 'units_per_hour', 'peak_hour_lines']
+        count = len(keys)
+        code, lines = hourly['code'], hourly['lines']
+
+        # Lines of each (group, hour) pair, movement types added together
+        pairs, inverse = np.unique(np.stack([code, hourly['hour']]), axis=1, return_inverse=True)
+        pair_lines = np.bincount(inverse.ravel(), weights=lines, minlength=pairs.shape[1])
+        peak = np.zeros(count)
+        np.maximum.at(peak, pairs[0], pair_lines)
+
+        totals = {
+            'lines': np.bincount(code, weights=lines, minlength=count),
+            'units': np.bincount(code, weights=hourly['units'], minlength=count),
+            'inbound_lines': np.bincount(code, weights=lines * hourly['in'], minlength=count),
+            'outbound_lines': np.bincount(code, weights=lines * hourly['out'], minlength=count),
+            'active_hours': np.bincount(pairs[0], minlength=count),
+        }
+        rows = []
+        for index in np.argsort(-totals['lines'], kind='stable'):
+            active = int(totals['active_hours'][index])
+            rows.append((
+                *keys[index],
+                *(int(totals[name][index]) for name in ('lines', 'units', 'inbound_lines', 'outbound_lines')),
+                active,
+                round(float(totals['lines'][index]) / active, 2),
+                round(float(totals['units'][index]) / active, 2),
+                int(peak[index]),
+            ))
+        return columns, rows
+
+    def _heatmap(self, group, keys, hourly):
+        import numpy as np
+
+        measure = self.parameters.get('measure') or 'lines'
+        if measure not in self.MEASURES:
+            raise ValueError(f"measure must be one of: {', '.join(self.MEASURES)}")
+
+        columns = [*self.GROUPS[group], 'weekday', *(f"h{hour:02d}" for hour in range(24)), 'total']
+        if not keys:
+            return columns, []
+
+        # Weekday and hour of day in the current time zone, worked out once
+        # per distinct hour
+        distinct, inverse = np.unique(hourly['hour'], return_inverse=True)
+        local = [timezone.localtime(datetime.fromtimestamp(int(hour) * 3600, tz=dt_timezone.utc)) for hour in distinct]
+        weekdays = np.array([moment.weekday() for moment in local])[inverse]
+        hours_of_day = np.array([moment.hour for moment in local])[inverse]
+
+        grid = np.zeros((len(keys), 7, 24), dtype=np.int64)
+        np.add.at(grid, (hourly['code'], weekdays, hours_of_day), hourly[measure])
+
+        rows = []
+        for index, key in sorted(enumerate(keys), key=lambda item: tuple('' if v is None else str(v) for v in item[1])):
+            for weekday in range(7):
+                counts = grid[index, weekday]
+                rows.append((*key, calendar.day_abbr[weekday], *(int(value) for value in counts), int(counts.sum())))
+        return columns, rows
+
+
+class UserActivityDataset(Dataset):
+    """
+    Activity counted per period, user, action and model (section: summary)
+    by one GROUP BY query, or the raw events in timestamp order (section:
+    events). Both come back as values_list querysets, so the report
+    pipeline streams them through a server-side cursor in
+    REPORT_STREAM_CHUNK_SIZE chunks and memory stays flat however many
+    rows match.
+    """
+    title = 'User Activity Report'
+    model = Activity
+    filters = {
+        'start_date': ('timestamp__gte', start_of_day),
+        'end_date': ('timestamp__lt', start_of_next_day),
+        'user_id': ('user_id', int),
+        'action': ('action', str),
+        'model_name': ('model_name', str),
+    }
+    GROUPS = {'user_id': 'user_id', 'username': 'user__username', 'action': 'action', 'model_name': 'model_name'}
+    EVENT_COLUMNS = {
+        'timestamp': 'timestamp',
+        'user_id': 'user_id',
+        'username': 'user__username',
+        'action': 'action',
+        'model_name': 'model_name',
+        'object_id': 'object_id',
+        'ip_address': 'ip_address',
+        'description': 'description',
+    }
+    summary = {
+        'events': ('Events', Count('pk'), None),
+        'users': ('Users', Count('user', distinct=True), None),
+        **{action.lower(): (label, Count('pk', filter=Q(action=action)), None)
+           for action, label in Activity.ACTION_CHOICES},
+    }
+    # Not cached: every request adds activity, so an output would never be
+    # reused
+    sources = []
+
+    def rows(self):
+        section = self.parameters.get('section') or 'summary'
+        if section == 'summary':
+            return self.summary_section()
+        elif section == 'events':
+            return self.events()
+        raise ValueError('section must be one of: summary, events')
+
+    def summary_section(self):
+        period = self.parameters.get('period') or 'day'
+        lookups = list(self.GROUPS.values())
+        rows = (self.queryset()
+                .annotate(period=period_bucket(period, 'timestamp'))
+                .values('period', *lookups)
+                .annotate(events=Count('pk'), first_seen=Min('timestamp'), last_seen=Max('timestamp'))
+                .order_by('period', *lookups)
+                .values_list('period', *lookups, 'events', 'first_seen', 'last_seen'))
+        return ['period', *self.GROUPS, 'events', 'first_seen', 'last_seen'], rows
+
+    def events(self):
+        rows = self.queryset().order_by('timestamp', 'id').values_list(*self.EVENT_COLUMNS.values())
+        return list(self.EVENT_COLUMNS), rows
+
+
+# Datasets of the report types whose rows can be exported and rendered
+DATASETS = {
+    'INVENTORY': InventoryDataset,
+    'ORDER': OrderDataset,
+    'RECEIVING': ReceivingDataset,
+    'SALES': SalesDataset,
+    'SHIPPING': ShippingDataset,
+    'PERFORMANCE': PerformanceDataset,
+    'USER_ACTIVITY': UserActivityDataset,
+}
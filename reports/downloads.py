@@ -0,0 +1,161 @@
+import os
+import re
+from urllib.parse import quote
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.http import content_disposition_header, http_date
+from .streaming import STREAM_FORMATS
+
+# Every report format: (content type, file extension)
+FILE_FORMATS = {
+    'PDF': ('application/pdf', 'pdf'),
+    'EXCEL': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+    **STREAM_FORMATS,
+}
+
+# Content types by stored file extension; files generated before .xlsx
+# was used carry the format name
+CONTENT_TYPES = {extension: content_type for content_type, extension in FILE_FORMATS.values()}
+CONTENT_TYPES['excel'] = FILE_FORMATS['EXCEL'][0]
+
+# Bytes read per iteration when the file is streamed by Django
+BLOCK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class UnsatisfiableRange(Exception):
+    pass
+
+
+class FileRange:
+    """
+    Read-only view of bytes start..end (inclusive) of an open file. It
+    keeps fileno() so WSGI servers with a sendfile file_wrapper can still
+    send the range straight from the file.
+    """
+    def __init__(self, file, start, end):
+        file.seek(start)
+        self.file = file
+        self.remaining = end - start + 1
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def file_extension(format):
+    return FILE_FORMATS[format][1] if format in FILE_FORMATS else format.lower()
+
+
+def parse_range(header, size):
+    """
+    (start, end) of a single byte range request, or None to send the whole
+    file. Malformed and multi-range headers are ignored, as RFC 9110
+    allows; a range starting past the end raises UnsatisfiableRange.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # Suffix range: the last `end` bytes
+        if int(end) == 0 or size == 0:
+            raise UnsatisfiableRange()
+        return max(size - int(end), 0), size - 1
+
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size:
+        raise UnsatisfiableRange()
+    if end < start:
+        return None
+    return start, end
+
+
+def file_response(request, generated_report, filename):
+    """
+    Serve a generated report file without reading it into memory.
+
+    With REPORT_DOWNLOAD_OFFLOAD set, the response only carries an
+    X-Accel-Redirect (nginx) or X-Sendfile (Apache, lighttpd) header and
+    the web server sends the file, ranges included. Otherwise the file is
+    streamed in BLOCK_SIZE reads, honouring a single-range Range header so
+    interrupted downloads can resume.
+    """
+    file = generated_report.file
+    extension = os.path.splitext(file.name)[1].lstrip('.').lower()
+    content_type = CONTENT_TYPES.get(extension, 'application/octet-stream')
+    filename = f"{filename}.{'xlsx' if extension == 'excel' else extension}"
+
+    response = _offload_response(file, content_type)
+    if response is None:
+        response = _streamed_response(request, generated_report, file, content_type)
+
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    return response
+
+
+def _offload_response(file, content_type):
+    offload = settings.REPORT_DOWNLOAD_OFFLOAD
+    if not offload:
+        return None
+
+    response = HttpResponse(content_type=content_type)
+    if offload == 'X-Accel-Redirect':
+        # An internal nginx location that maps this prefix onto MEDIA_ROOT
+        response['X-Accel-Redirect'] = settings.REPORT_DOWNLOAD_ACCEL_PREFIX.rstrip('/') + '/' + quote(file.name)
+    elif offload == 'X-Sendfile':
+        try:
+            response['X-Sendfile'] = file.path
+        except NotImplementedError:
+            # Remote storage: there is no local path to hand over
+            return None
+    else:
+        raise ValueError(f"Unsupported REPORT_DOWNLOAD_OFFLOAD: {offload}")
+    return response
+
+
+def _streamed_response(request, generated_report, file, content_type):
+    size = file.size
+    # Generated files never change, so the row id and size identify them
+    etag = f'"report-{generated_report.pk}-{size}"'
+    last_modified = http_date(generated_report.end_time.timestamp()) if generated_report.end_time else None
+
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    if if_range is None or if_range in (etag, last_modified):
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except UnsatisfiableRange:
+            response = HttpResponse(status=416, content_type=content_type)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        response = FileResponse(file.open('rb'), content_type=content_type)
+        response['Content-Length'] = size
+    else:
+        start, end = byte_range
+        response = FileResponse(FileRange(file.open('rb'), start, end), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+
+    response.block_size = BLOCK_SIZE
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = last_modified
+    return response
@@ -0,0 +1,84 @@
+import tempfile
+from datetime import datetime
+from django.core.files import File
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+# Excel's hard limit of rows per worksheet, header included
+SHEET_MAX_ROWS = 1048576
+
+COLUMN_WIDTH = 15
+
+# Header styles are built once and shared by every header cell
+HEADER_FONT = Font(bold=True)
+HEADER_ALIGNMENT = Alignment(horizontal='center')
+HEADER_FILL = PatternFill(start_color="DDDDDD", end_color="DDDDDD", fill_type="solid")
+
+
+def write_workbook(target, title, columns, rows, sheet_max_rows=SHEET_MAX_ROWS):
+    """
+    Write rows to an .xlsx file (path or binary file object) with
+    openpyxl's write-only mode, which serializes each row as it is
+    appended instead of keeping every cell in memory. A new worksheet is
+    started, header repeated, whenever one fills up.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = None
+    sheet_rows = 0
+    sheets = 0
+
+    for row in rows:
+        if sheet is None or sheet_rows >= sheet_max_rows:
+            sheets += 1
+            sheet = _add_sheet(workbook, title, sheets, columns)
+            sheet_rows = 1
+        sheet.append(_excel_row(row))
+        sheet_rows += 1
+
+    if sheet is None:
+        _add_sheet(workbook, title, 1, columns)
+
+    workbook.save(target)
+
+
+def export_file(title, columns, rows):
+    """
+    Write rows to a temporary .xlsx file, returned as a File ready to be
+    saved to storage
+    """
+    spool = tempfile.TemporaryFile()
+    write_workbook(spool, title, columns, rows)
+    spool.seek(0)
+    return File(spool)
+
+
+def _add_sheet(workbook, title, number, columns):
+    name = _sheet_title(title) if number == 1 else f"{_sheet_title(title)[:25]} ({number})"
+    sheet = workbook.create_sheet(name)
+
+    # Column widths must be set before the first row is written
+    for col_num in range(1, len(columns) + 1):
+        sheet.column_dimensions[get_column_letter(col_num)].width = COLUMN_WIDTH
+
+    header = []
+    for column in columns:
+        cell = WriteOnlyCell(sheet, value=column)
+        cell.font = HEADER_FONT
+        cell.alignment = HEADER_ALIGNMENT
+        cell.fill = HEADER_FILL
+        header.append(cell)
+    sheet.append(header)
+    return sheet
+
+
+def _sheet_title(title):
+    # Worksheet names are limited to 31 characters and exclude []:*?/\
+    return ''.join(c for c in title if c not in '[]:*?/\\')[:31] or 'Report'
+
+
+def _excel_row(row):
+    # Excel has no time zones; write aware datetimes as naive UTC
+    return [value.replace(tzinfo=None) if isinstance(value, datetime) and value.tzinfo else value
+            for value in row]
@@ -0,0 +1,156 @@
+import logging
+import os
+import socket
+from datetime import timedelta
+from django.conf import settings
+from django.db import DatabaseError, transaction, close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import GeneratedReport
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(report, user, parameters=None, schedule=None):
+    """
+    Queue a report for generation by a report_worker process. Returns the
+    PENDING GeneratedReport.
+    """
+    return GeneratedReport.objects.create(
+        report=report,
+        generated_by=user,
+        status='PENDING',
+        parameters_used=parameters,
+        next_attempt_at=timezone.now(),
+        schedule=schedule
+    )
+
+
+def claimable(now):
+    """
+    Jobs that are due, plus PROCESSING jobs with attempts left whose
+    worker stopped reporting back within REPORT_JOB_TIMEOUT
+    """
+    stale = now - timedelta(seconds=settings.REPORT_JOB_TIMEOUT)
+    return (Q(status='PENDING', next_attempt_at__lte=now) |
+            Q(status='PROCESSING', claimed_at__lt=stale, attempts__lt=settings.REPORT_JOB_MAX_ATTEMPTS))
+
+
+def fail_abandoned(now):
+    """
+    Fail PROCESSING jobs whose worker stopped reporting back on their last
+    attempt. A job that kills its worker (out of memory, a crash in a
+    render) would otherwise be claimed again forever. Returns the number
+    of jobs failed.
+    """
+    stale = now - timedelta(seconds=settings.REPORT_JOB_TIMEOUT)
+    failed = (GeneratedReport.objects
+              .filter(status='PROCESSING', claimed_at__lt=stale,
+                      attempts__gte=settings.REPORT_JOB_MAX_ATTEMPTS)
+              .update(status='FAILED', end_time=now,
+                      error_message='The worker stopped responding on the last attempt'))
+    if failed:
+        logger.warning('Failed %s report jobs abandoned on their last attempt', failed)
+    return failed
+
+
+def claim_next(worker=None):
+    """
+    Move the oldest due job to PROCESSING and return it, or None if the
+    queue is empty. Concurrent workers skip rows locked by each other, and
+    the claim UPDATE repeats the claimable condition so a job is never
+    handed out twice on databases without SKIP LOCKED.
+    """
+    worker = worker or default_worker_name()
+    now = timezone.now()
+    fail_abandoned(now)
+
+    with transaction.atomic():
+        pk = (GeneratedReport.objects
+              .select_for_update(skip_locked=True)
+              .filter(claimable(now))
+              .order_by('next_attempt_at', 'id')
+              .values_list('pk', flat=True)
+              .first())
+        if pk is None:
+            return None
+
+        claimed = GeneratedReport.objects.filter(claimable(now), pk=pk).update(
+            status='PROCESSING',
+            attempts=F('attempts') + 1,
+            claimed_at=now,
+            worker=worker
+        )
+        if not claimed:
+            return None
+
+    return GeneratedReport.objects.select_related('report').get(pk=pk)
+
+
+def run_job(generated_report):
+    """
+    Generate a claimed report. Failures are retried with exponential
+    backoff until REPORT_JOB_MAX_ATTEMPTS is reached; only the last
+    failure leaves the job FAILED, so pollers never see a job fail and
+    then come back.
+    """
+    from .report_generators import generate_report
+
+    try:
+        generate_report(generated_report)
+    except Exception as e:
+        if generated_report.attempts < settings.REPORT_JOB_MAX_ATTEMPTS:
+            delay = settings.REPORT_JOB_RETRY_DELAY * 2 ** (generated_report.attempts - 1)
+            GeneratedReport.objects.filter(pk=generated_report.pk).update(
+                status='PENDING',
+                next_attempt_at=timezone.now() + timedelta(seconds=delay),
+                error_message=str(e)
+            )
+            logger.warning('Report job %s failed (attempt %s), retrying in %ss: %s',
+                           generated_report.pk, generated_report.attempts, delay, e)
+        else:
+            GeneratedReport.objects.filter(pk=generated_report.pk).update(
+                status='FAILED',
+                end_time=timezone.now(),
+                error_message=str(e)
+            )
+            logger.exception('Report job %s failed after %s attempts',
+                             generated_report.pk, generated_report.attempts)
+        return False
+
+    logger.info('Report job %s completed', generated_report.pk)
+    return True
+
+
+def default_worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def work(stop_event, poll_interval=None, burst=False):
+    """
+    Claim and run jobs until stop_event is set. With burst, return as soon
+    as the queue is empty instead of polling. Returns the number of jobs
+    run.
+    """
+    poll_interval = settings.REPORT_WORKER_POLL_INTERVAL if poll_interval is None else poll_interval
+    worker = default_worker_name()
+    processed = 0
+
+    while not stop_event.is_set():
+        close_old_connections()
+        try:
+            generated_report = claim_next(worker)
+            if generated_report is not None:
+                run_job(generated_report)
+                processed += 1
+                continue
+        except DatabaseError:
+            # Keep the worker alive across lock timeouts and reconnects; a
+            # job stuck in PROCESSING is reclaimed after REPORT_JOB_TIMEOUT
+            logger.exception('Report worker %s hit a database error', worker)
+        else:
+            if burst:
+                break
+        stop_event.wait(poll_interval)
+
+    return processed
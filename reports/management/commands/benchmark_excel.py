@@ -0,0 +1,107 @@
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+
+COLUMNS = ['product_id', 'name', 'sku', 'category', 'warehouse', 'quantity',
+           'min_quantity', 'max_quantity', 'reorder_level', 'cost_price', 'selling_price']
+
+
+def inventory_like_rows(count, chunk_size=2000):
+    """
+    Synthetic rows shaped like the inventory report, produced in chunks
+    the way QuerySet.iterator() hands them out
+    """
+    for start in range(0, count, chunk_size):
+        for i in range(start, min(start + chunk_size, count)):
+            yield (i, f"Product {i}", f"SKU-{i:08d}", f"Category {i % 50}", f"Warehouse {i % 7}",
+                   i % 500, 10, 1000, 25, Decimal('12.50'), Decimal('19.99'))
+
+
+def legacy_workbook(target, title, columns, rows):
+    """
+    The previous generate_excel_inventory_report: DataFrame plus a regular
+    workbook filled cell by cell
+    """
+    import pandas as pd
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, Alignment, PatternFill
+    from openpyxl.utils import get_column_letter
+
+    df = pd.DataFrame.from_records(list(rows), columns=columns)
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = title
+
+    headers = list(df.columns)
+    for col_num, header in enumerate(headers, 1):
+        cell = ws.cell(row=1, column=col_num)
+        cell.value = header
+        cell.font = Font(bold=True)
+        cell.alignment = Alignment(horizontal='center')
+        cell.fill = PatternFill(start_color="DDDDDD", end_color="DDDDDD", fill_type="solid")
+
+    for row_num, row in enumerate(df.values, 2):
+        for col_num, value in enumerate(row, 1):
+            cell = ws.cell(row=row_num, column=col_num)
+            cell.value = value
+
+    for col_num, header in enumerate(headers, 1):
+        ws.column_dimensions[get_column_letter(col_num)].width = 15
+
+    wb.save(target)
+
+
+def run_case(mode, rows, results):
+    """
+    Build one workbook in a fresh process so peak memory is per case
+    """
+    from reports import excel
+
+    writer = excel.write_workbook if mode == 'write-only' else legacy_workbook
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with tempfile.TemporaryFile() as target:
+        started = time.perf_counter()
+        writer(target, 'Inventory Report', COLUMNS, inventory_like_rows(rows))
+        elapsed = time.perf_counter() - started
+        size = target.tell()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline
+    results.put((elapsed, peak / 1024, size / 1024 / 1024))
+
+
+class Command(BaseCommand):
+    help = 'Compare the write-only Excel writer with the previous cell-by-cell workbook'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+        parser.add_argument('--modes', nargs='+', choices=['write-only', 'legacy'],
+                            default=['write-only', 'legacy'])
+        parser.add_argument('--legacy-max-rows', type=int, default=None,
+                            help='Skip the legacy writer above this many rows')
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context('spawn')
+        self.stdout.write(f"{'mode':<11} {'rows':>9} {'seconds':>9} {'rows/s':>9} "
+                          f"{'peak MB':>9} {'file MB':>8}")
+
+        for rows in options['rows']:
+            for mode in options['modes']:
+                if mode == 'legacy' and options['legacy_max_rows'] and rows > options['legacy_max_rows']:
+                    self.stdout.write(f"{mode:<11} {rows:>9} {'skipped':>9}")
+                    continue
+
+                results = context.Queue()
+                process = context.Process(target=run_case, args=(mode, rows, results))
+                process.start()
+                process.join()
+                if process.exitcode != 0:
+                    self.stdout.write(f"{mode:<11} {rows:>9} {'failed':>9} (exit code {process.exitcode})")
+                    continue
+
+                elapsed, peak, size = results.get()
+                self.stdout.write(f"{mode:<11} {rows:>9} {elapsed:>9.2f} {rows / elapsed:>9.0f} "
+                                  f"{peak:>9.1f} {size:>8.1f}")
@@ -0,0 +1,30 @@
+import tempfile
+import time
+from django.core.management.base import BaseCommand
+from reports import pdf
+from .benchmark_excel import COLUMNS, inventory_like_rows
+
+
+class Command(BaseCommand):
+    help = 'Time the paginated PDF renderer over growing row counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 50000])
+        parser.add_argument('--processes', type=int, default=None,
+                            help='Render processes (default: REPORT_PDF_PROCESSES)')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'rows':>9} {'pages':>7} {'seconds':>9} {'rows/s':>9} "
+                          f"{'s/page':>8} {'max page':>9} {'file MB':>8}")
+
+        for rows in options['rows']:
+            with tempfile.TemporaryFile() as target:
+                started = time.perf_counter()
+                timings = pdf.render_pdf(target, 'Inventory Report', COLUMNS, inventory_like_rows(rows),
+                                         processes=options['processes'])
+                elapsed = time.perf_counter() - started
+                size = target.tell()
+
+            self.stdout.write(f"{rows:>9} {len(timings):>7} {elapsed:>9.2f} {rows / elapsed:>9.0f} "
+                              f"{sum(timings) / len(timings):>8.3f} {max(timings):>9.3f} "
+                              f"{size / 1024 / 1024:>8.1f}")
@@ -0,0 +1,94 @@
+import random
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from inventory.models import Category, Product
+from orders.models import Customer, SalesOrder, SalesOrderItem
+from reports.datasets import SalesDataset
+from warehouse.models import Warehouse
+
+CASES = [
+    {'period': 'month', 'group_by': 'product'},
+    {'period': 'week', 'group_by': 'category'},
+    {'period': 'day', 'group_by': 'warehouse'},
+    {'period': 'month', 'group_by': 'product', 'pivot': 'revenue'},
+]
+
+
+class Command(BaseCommand):
+    help = 'Time one-year sales reports over seeded order lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, default=1000000,
+                            help='Sales order lines seeded over the last year')
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--lines-per-order', type=int, default=5)
+
+    def handle(self, *args, **options):
+        # Fixtures live in a transaction that is rolled back at the end
+        with transaction.atomic():
+            started = time.perf_counter()
+            self.seed(options['lines'], options['products'], options['lines_per_order'])
+            self.stdout.write(f"Seeded {options['lines']} lines in {time.perf_counter() - started:.1f}s")
+
+            today = timezone.now().date()
+            parameters = {'start_date': str(today - timedelta(days=365)), 'end_date': str(today)}
+            self.stdout.write(f"{'period':<8} {'group_by':<10} {'pivot':<8} {'rows':>7} {'seconds':>8}")
+
+            for case in CASES:
+                dataset = SalesDataset({**parameters, **case})
+                started = time.perf_counter()
+                columns, rows = dataset.rows()
+                count = sum(1 for _ in rows)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f"{case['period']:<8} {case['group_by']:<10} {case.get('pivot', '-'):<8} "
+                                  f"{count:>7} {elapsed:>8.2f}")
+
+            started = time.perf_counter()
+            dataset.summary_rows()
+            self.stdout.write(f"summary {time.perf_counter() - started:>36.2f}")
+
+            transaction.set_rollback(True)
+
+    def seed(self, lines, product_count, lines_per_order):
+        token = uuid.uuid4().hex[:8]
+        rng = random.Random(0)
+        today = timezone.now().date()
+
+        categories = Category.objects.bulk_create([
+            Category(name=f"Bench {token} {i}") for i in range(20)
+        ])
+        warehouses = Warehouse.objects.bulk_create([
+            Warehouse(name=f"Bench {token} {i}", address='-', city='-', state='-',
+                      country='-', postal_code='-')
+            for i in range(5)
+        ])
+        products = Product.objects.bulk_create([
+            Product(name=f"Bench {token} {i}", sku=f"BENCH-{token}-{i}", category=categories[i % 20],
+                    cost_price=Decimal(rng.randint(100, 5000)) / 100, selling_price=0)
+            for i in range(product_count)
+        ], batch_size=1000)
+        customer = Customer.objects.create(name=f"Bench {token}")
+
+        orders = SalesOrder.objects.bulk_create([
+            SalesOrder(order_number=f"BENCH-{token}-{i}", customer=customer,
+                       warehouse=warehouses[i % len(warehouses)], status='DELIVERED',
+                       order_date=today - timedelta(days=rng.randrange(365)), shipping_address='-')
+            for i in range(-(-lines // lines_per_order))
+        ], batch_size=5000)
+
+        batch = []
+        for i in range(lines):
+            batch.append(SalesOrderItem(sales_order=orders[i // lines_per_order],
+                                        product=products[rng.randrange(len(products))],
+                                        quantity=rng.randint(1, 20),
+                                        unit_price=Decimal(rng.randint(200, 9000)) / 100,
+                                        discount=Decimal(rng.randint(0, 3))))
+            if len(batch) >= 5000:
+                SalesOrderItem.objects.bulk_create(batch)
+                batch = []
+        SalesOrderItem.objects.bulk_create(batch)
@@ -0,0 +1,83 @@
+import os
+import subprocess
+import sys
+from django.core.management.base import BaseCommand, CommandError
+
+# Libraries that should only load once a report format that needs them is
+# rendered
+HEAVY_MODULES = ('pandas', 'numpy', 'matplotlib', 'openpyxl', 'pypdf', 'lxml', 'PIL')
+
+# Import time budget of each phase, in milliseconds
+STARTUP_BUDGET_MS = 1000
+
+PHASES = {
+    # A gunicorn worker: the WSGI application plus the URLconf, which
+    # imports every view module
+    'web': 'import wms_project.wsgi\n'
+           'from django.urls import get_resolver\n'
+           'get_resolver().url_patterns\n',
+    # A report_worker process before it renders anything
+    'report-worker': 'import django\n'
+                     'django.setup()\n'
+                     'import reports.jobs, reports.report_generators, reports.scheduling\n',
+}
+
+
+def import_times(script, settings_module):
+    """
+    Run script under python -X importtime in a fresh interpreter. Returns
+    {module: (self us, cumulative us, nesting level)}.
+    """
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', script],
+                            env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise CommandError(result.stderr.strip().splitlines()[-1])
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        # "import time:   self |   cumulative | <two spaces per level>name"
+        own, cumulative, name = line[len('import time:'):].split('|', 2)
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        times[name.strip()] = (int(own), int(cumulative), level)
+    return times
+
+
+class Command(BaseCommand):
+    help = 'Measure cold import time of the web and report worker processes against a budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budget-ms', type=int, default=STARTUP_BUDGET_MS)
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='Runs per phase; the fastest one is reported')
+        parser.add_argument('--top', type=int, default=10,
+                            help='Slowest top-level imports to list')
+
+    def handle(self, *args, **options):
+        settings_module = os.environ.get('DJANGO_SETTINGS_MODULE', 'wms_project.settings')
+        failures = []
+
+        for phase, script in PHASES.items():
+            runs = [import_times(script, settings_module) for _ in range(options['repeat'])]
+            totals = [sum(cumulative for _, cumulative, level in run.values() if level == 0) for run in runs]
+            fastest = runs[totals.index(min(totals))]
+            total_ms = min(totals) / 1000
+
+            self.stdout.write(f"{phase}: {total_ms:.0f} ms over {len(fastest)} modules "
+                              f"(budget {options['budget_ms']} ms)")
+            top_level = sorted(((cumulative, name) for name, (_, cumulative, level) in fastest.items()
+                                if level == 0), reverse=True)
+            for cumulative, name in top_level[:options['top']]:
+                self.stdout.write(f"  {cumulative / 1000:>8.1f} ms  {name}")
+
+            heavy = sorted({name.split('.')[0] for name in fastest} & set(HEAVY_MODULES))
+            if heavy:
+                failures.append(f"{phase} imports {', '.join(heavy)}")
+            if total_ms > options['budget_ms']:
+                failures.append(f"{phase} took {total_ms:.0f} ms, over the {options['budget_ms']} ms budget")
+
+        if failures:
+            raise CommandError('; '.join(failures))
+        self.stdout.write(self.style.SUCCESS('Startup within budget'))
@@ -0,0 +1,66 @@
+import multiprocessing
+import signal
+import threading
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+def worker_process(stop_event, poll_interval, burst):
+    """
+    Entry point of a spawned worker process
+    """
+    import django
+
+    # The parent handles Ctrl-C and tells the workers to stop between jobs
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    django.setup()
+
+    from reports import jobs
+    jobs.work(stop_event, poll_interval, burst)
+
+
+class Command(BaseCommand):
+    help = 'Run report generation jobs queued by the API in a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=settings.REPORT_WORKER_PROCESSES,
+                            help='Worker processes; 0 runs jobs in this process')
+        parser.add_argument('--poll-interval', type=float, default=settings.REPORT_WORKER_POLL_INTERVAL,
+                            help='Seconds to wait before polling an empty queue again')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        poll_interval = options['poll_interval']
+        burst = options['burst']
+
+        if processes == 0:
+            from reports import jobs
+            processed = jobs.work(threading.Event(), poll_interval, burst)
+            self.stdout.write(f"Processed {processed} report jobs")
+            return
+
+        # Spawned rather than forked so no worker inherits the parent's
+        # database connection
+        context = multiprocessing.get_context('spawn')
+        stop_event = context.Event()
+        workers = [
+            context.Process(target=worker_process, args=(stop_event, poll_interval, burst),
+                            name=f"report-worker-{i}")
+            for i in range(processes)
+        ]
+
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f"Started {processes} report workers")
+
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping report workers after their current job')
+            stop_event.set()
+            for worker in workers:
+                worker.join()
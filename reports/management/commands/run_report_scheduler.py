@@ -0,0 +1,27 @@
+import signal
+import threading
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from reports import scheduling
+
+
+class Command(BaseCommand):
+    help = 'Queue runs of due report schedules for the report workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=settings.REPORT_SCHEDULER_INTERVAL,
+                            help='Seconds between scans for due schedules')
+        parser.add_argument('--max-concurrent', type=int, default=settings.REPORT_SCHEDULER_MAX_CONCURRENT,
+                            help='Most scheduled runs queued or generating at once')
+        parser.add_argument('--once', action='store_true',
+                            help='Scan once and exit')
+
+    def handle(self, *args, **options):
+        stop_event = threading.Event()
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+
+        try:
+            queued = scheduling.run(stop_event, options['interval'], options['max_concurrent'], options['once'])
+        except KeyboardInterrupt:
+            return
+        self.stdout.write(f"Queued {queued} scheduled reports")
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='generatedreport',
+            index=models.Index(fields=['start_time', 'id'], name='genreport_start_id_idx'),
+        ),
+    ]
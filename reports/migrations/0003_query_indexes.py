@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0002_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='generatedreport',
+            index=models.Index(fields=['status', 'start_time'], name='genreport_status_start_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0004_job_queue'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='report',
+            name='format',
+            field=models.CharField(choices=[('PDF', 'PDF'), ('CSV', 'CSV'), ('EXCEL', 'Excel'), ('JSON', 'JSON'), ('NDJSON', 'NDJSON')], default='PDF', max_length=10),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:41
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0005_ndjson_format'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generatedreport',
+            name='cache_hit',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='generatedreport',
+            name='cache_key',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.CreateModel(
+            name='ReportCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('report_type', models.CharField(choices=[('INVENTORY', 'Inventory Report'), ('ORDER', 'Order Report'), ('SHIPPING', 'Shipping Report'), ('RECEIVING', 'Receiving Report'), ('USER_ACTIVITY', 'User Activity Report'), ('PERFORMANCE', 'Performance Report'), ('SALES', 'Sales Report'), ('CUSTOM', 'Custom Report')], max_length=20)),
+                ('format', models.CharField(choices=[('PDF', 'PDF'), ('CSV', 'CSV'), ('EXCEL', 'Excel'), ('JSON', 'JSON'), ('NDJSON', 'NDJSON')], max_length=10)),
+                ('size', models.BigIntegerField(default=0)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cache_entries', to='reports.generatedreport')),
+            ],
+            options={
+                'ordering': ['-last_used_at'],
+                'indexes': [models.Index(fields=['last_used_at'], name='reportcache_last_used_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.7 on 2026-10-18 04:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0007_report_scheduler'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchedulerLock',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
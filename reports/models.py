@@ -1,5 +1,8 @@
+import calendar
+from datetime import date, datetime, timedelta
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 from warehouse.models import Warehouse
 
 class Report(models.Model):
@@ -19,6 +22,7 @@ class Report(models.Model):
         ('CSV', 'CSV'),
         ('EXCEL', 'Excel'),
         ('JSON', 'JSON'),
+        ('NDJSON', 'NDJSON'),
     )
     
     title = models.CharField(max_length=255)
@@ -60,8 +64,55 @@ class ReportSchedule(models.Model):
     email_addresses = models.TextField(blank=True, null=True)  # Additional email addresses, comma-separated
     is_active = models.BooleanField(default=True)
     
+    QUARTER_MONTHS = (1, 4, 7, 10)
+    
     def __str__(self):
         return f"{self.report.title} - {self.get_frequency_display()}"
+    
+    def save(self, *args, **kwargs):
+        if self.next_run is None:
+            self.next_run = self.compute_next_run()
+        super().save(*args, **kwargs)
+    
+    def compute_next_run(self, after=None):
+        """
+        First run strictly after `after` (default now), in the current time
+        zone. Weekly schedules default to Monday, monthly and quarterly
+        ones to the 1st; a day_of_month past the end of a month runs on its
+        last day.
+        """
+        after = timezone.localtime(after or timezone.now())
+        day = after.date()
+        while True:
+            day = self._run_date_on_or_after(day)
+            run = timezone.make_aware(datetime.combine(day, self.time))
+            if run > after:
+                return run
+            day += timedelta(days=1)
+    
+    def _run_date_on_or_after(self, day):
+        if self.frequency == 'DAILY':
+            return day
+        if self.frequency == 'WEEKLY':
+            weekday = self.day_of_week if self.day_of_week is not None else 0
+            return day + timedelta(days=(weekday - day.weekday()) % 7)
+        
+        # MONTHLY and QUARTERLY
+        months = self.QUARTER_MONTHS if self.frequency == 'QUARTERLY' else range(1, 13)
+        year, month = day.year, day.month
+        while True:
+            if month in months:
+                last_day = calendar.monthrange(year, month)[1]
+                candidate = date(year, month, min(self.day_of_month or 1, last_day))
+                if candidate >= day:
+                    return candidate
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    
+    class Meta:
+        indexes = [
+            # Scheduler scan of due schedules
+            models.Index(fields=['is_active', 'next_run'], name='schedule_active_next_idx'),
+        ]
 
 
 class ReportTemplate(models.Model):
@@ -97,9 +148,60 @@ class GeneratedReport(models.Model):
     file = models.FileField(upload_to='reports/generated/', blank=True, null=True)
     error_message = models.TextField(blank=True, null=True)
     parameters_used = models.JSONField(blank=True, null=True)  # Parameters used for this specific generation
+    # Job queue bookkeeping, see reports.jobs
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(blank=True, null=True)
+    worker = models.CharField(max_length=100, blank=True, null=True)
+    # Set when queued by run_report_scheduler
+    schedule = models.ForeignKey(ReportSchedule, on_delete=models.SET_NULL, blank=True, null=True,
+                                 related_name='runs')
+    # Result cache, see reports.cache; cache_hit means the file is shared
+    # with the generated report that first produced it
+    cache_key = models.CharField(max_length=64, blank=True, null=True)
+    cache_hit = models.BooleanField(default=False)
     
     def __str__(self):
         return f"{self.report.title} - {self.start_time}"
     
     class Meta:
-        ordering = ['-start_time']
\ No newline at end of file
+        ordering = ['-start_time']
+        indexes = [
+            models.Index(fields=['start_time', 'id'], name='genreport_start_id_idx'),
+            models.Index(fields=['status', 'start_time'], name='genreport_status_start_idx'),
+            # Queue scan of claimable jobs
+            models.Index(fields=['status', 'next_attempt_at'], name='genreport_status_next_idx'),
+        ]
+
+
+class ReportCacheEntry(models.Model):
+    key = models.CharField(max_length=64, unique=True)  # sha256 of type, format, parameters and data watermark
+    report_type = models.CharField(max_length=20, choices=Report.REPORT_TYPES)
+    format = models.CharField(max_length=10, choices=Report.FORMAT_CHOICES)
+    source = models.ForeignKey(GeneratedReport, on_delete=models.CASCADE, related_name='cache_entries')
+    size = models.BigIntegerField(default=0)  # bytes
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"{self.report_type} {self.format} - {self.key[:12]}"
+    
+    class Meta:
+        ordering = ['-last_used_at']
+        indexes = [
+            # LRU eviction order
+            models.Index(fields=['last_used_at'], name='reportcache_last_used_idx'),
+        ]
+
+
+class SchedulerLock(models.Model):
+    """
+    Row a scheduler holds locked while it dispatches, so concurrent
+    schedulers count in-flight runs one at a time
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    locked_at = models.DateTimeField(blank=True, null=True)  # start of the last dispatch
+    
+    def __str__(self):
+        return self.name
@@ -0,0 +1,314 @@
+import io
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+from itertools import chain, islice
+from django.conf import settings
+from django.core.files import File
+from matplotlib import rc_context
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.figure import Figure
+from matplotlib.font_manager import FontProperties
+from matplotlib.patches import Rectangle
+
+logger = logging.getLogger(__name__)
+
+# A4 landscape, in inches
+PAGE_SIZE = (11.69, 8.27)
+# Table area in figure coordinates: left, top, width, height
+TABLE_BOX = (0.03, 0.92, 0.94, 0.87)
+FONT_SIZE = 7
+TITLE_FONT_SIZE = 14
+# Advance width of a Courier / DejaVu Sans Mono glyph, in ems
+MONO_ADVANCE = 0.602
+# (sans, mono) families. Pages whose text fits the cp1252 encoding use the
+# PDF core fonts, which need no glyph layout or embedding and render about
+# ten times faster; other pages embed DejaVu, which covers far more scripts.
+CORE_FONTS = ('Helvetica', 'Courier')
+EMBEDDED_FONTS = ('DejaVu Sans', 'DejaVu Sans Mono')
+# Characters a text cell may hold before it is truncated; keeps the layout fixed
+MAX_CELL_CHARS = 40
+# Width of a formatted date or datetime
+DATE_CHARS = 16
+COLUMN_GAP = 2
+
+
+class PageLayout:
+    """
+    Column widths, alignment, font size and row height shared by every
+    page of a table. It is fixed before the first page is rendered, so
+    rendering a page needs no text measurement: each row is a single line
+    of monospaced text. Later pages may hold longer values than the first,
+    so widths do not follow the sample: text columns (and columns the
+    sample leaves empty) get MAX_CELL_CHARS, and only longer text is cut,
+    marked with an ellipsis. Dates have a fixed width, and numbers are
+    never cut but push the rest of their line right instead.
+    """
+    def __init__(self, columns, sample_rows, rows_per_page):
+        kinds = [set() for _ in columns]
+        widths = [len(str(column)) for column in columns]
+        for row in sample_rows:
+            for i, value in enumerate(row):
+                if value is not None:
+                    kinds[i].add(_kind(value))
+                    widths[i] = max(widths[i], len(_format_value(value)))
+
+        self.numeric = [kind == {'number'} for kind in kinds]
+        self.widths = []
+        for column, width, kind in zip(columns, widths, kinds):
+            if kind == {'date'}:
+                width = max(len(str(column)), DATE_CHARS)
+            elif kind != {'number'}:
+                width = max(len(str(column)), MAX_CELL_CHARS)
+            self.widths.append(width)
+
+        line_chars = sum(self.widths) + COLUMN_GAP * (len(self.widths) - 1)
+        usable_points = PAGE_SIZE[0] * TABLE_BOX[2] * 72
+        self.font_size = min(FONT_SIZE, usable_points / (max(line_chars, 1) * MONO_ADVANCE))
+        # Header plus rows fill the table area exactly
+        self.row_height = TABLE_BOX[3] / (rows_per_page + 1)
+
+    def format_row(self, values, header=False):
+        cells = []
+        for value, width, numeric in zip(values, self.widths, self.numeric):
+            if header:
+                cells.append(str(value).ljust(width))
+            elif numeric:
+                cells.append(_format_value(value).rjust(width))
+            else:
+                cells.append(_truncate(_format_value(value), width).ljust(width))
+        return (' ' * COLUMN_GAP).join(cells)
+
+
+@lru_cache(maxsize=None)
+def font(core=False, mono=False, weight='normal', size=FONT_SIZE):
+    """
+    Font lookups go through matplotlib's font manager once per process
+    """
+    family = (CORE_FONTS if core else EMBEDDED_FONTS)[mono]
+    return FontProperties(family=family, weight=weight, size=size)
+
+
+def render_pdf(target, title, columns, rows, summary=None, rows_per_page=None, processes=None):
+    """
+    Render rows as a table laid out over pages of rows_per_page rows,
+    followed by an optional summary page of (label, value) pairs. Large
+    tables are rendered in chunks of pages by a process pool and merged in
+    order with pypdf; small tables, or a missing pypdf, render serially.
+    Returns the render time of every page, in seconds.
+    """
+    rows_per_page = rows_per_page or settings.REPORT_PDF_ROWS_PER_PAGE
+    pages_per_chunk = settings.REPORT_PDF_PAGES_PER_CHUNK
+    processes = processes if processes is not None else settings.REPORT_PDF_PROCESSES
+    processes = processes or os.cpu_count() or 1
+
+    rows = iter(rows)
+    first_chunk = list(islice(rows, rows_per_page * pages_per_chunk))
+    layout = PageLayout(columns, first_chunk[:rows_per_page], rows_per_page)
+    more = next(rows, None)
+
+    try:
+        import pypdf
+    except ImportError:
+        pypdf = None
+
+    chunk_rows = rows_per_page * pages_per_chunk
+    chunks = _chunks([more], rows, chunk_rows) if more is not None else iter(())
+
+    if more is None or processes == 1 or pypdf is None:
+        # Everything fits in one chunk, or there is no way to merge chunks:
+        # render here, one chunk in memory at a time, into one document
+        timings = []
+        with PdfPages(target) as pdf:
+            page = 1
+            for chunk in chain([first_chunk], chunks):
+                timings += _write_pages(pdf, title, columns, chunk, layout, rows_per_page, page)
+                page += -(-len(chunk) // rows_per_page)
+            if summary:
+                _save_page(pdf, _summary_page, title, summary)
+        _log_timings(title, timings)
+        return timings
+
+    writer = pypdf.PdfWriter()
+    timings = []
+    context = multiprocessing.get_context('spawn')
+
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as pool:
+        pending = deque()
+        page = 1
+
+        def submit(chunk, chunk_summary=None):
+            nonlocal page
+            pending.append(pool.submit(render_chunk, title, columns, chunk, layout,
+                                       rows_per_page, page, chunk_summary))
+            page += -(-len(chunk) // rows_per_page)
+
+        def collect():
+            content, chunk_timings = pending.popleft().result()
+            writer.append(io.BytesIO(content))
+            timings.extend(chunk_timings)
+
+        submit(first_chunk)
+        previous = next(chunks)
+        for chunk in chunks:
+            submit(previous)
+            previous = chunk
+            # Bound the rows held in memory by the chunks in flight
+            while len(pending) >= processes * 2:
+                collect()
+        submit(previous, summary)
+        while pending:
+            collect()
+
+    writer.write(target)
+    _log_timings(title, timings)
+    return timings
+
+
+def render_chunk(title, columns, rows, layout, rows_per_page, first_page, summary=None):
+    """
+    Render a run of pages (and the summary page, if given) to PDF bytes.
+    Runs in pool workers, so it only uses matplotlib's object-oriented API
+    and never pyplot's global state.
+    """
+    buffer = io.BytesIO()
+
+    with PdfPages(buffer) as pdf:
+        timings = _write_pages(pdf, title, columns, rows, layout, rows_per_page, first_page)
+        if summary:
+            _save_page(pdf, _summary_page, title, summary)
+
+    return buffer.getvalue(), timings
+
+
+def export_file(title, columns, rows, summary=None):
+    """
+    Render to a temporary file, returned as a File ready to be saved to
+    storage
+    """
+    spool = tempfile.TemporaryFile()
+    render_pdf(spool, title, columns, rows, summary)
+    spool.seek(0)
+    return File(spool)
+
+
+def _write_pages(pdf, title, columns, rows, layout, rows_per_page, first_page):
+    """
+    Add rows to the PdfPages as table pages numbered from first_page, or
+    a single empty table page when there are none. Returns the render
+    time of every page.
+    """
+    timings = []
+    for index, start in enumerate(range(0, len(rows), rows_per_page)):
+        started = time.perf_counter()
+        lines = [layout.format_row(row) for row in rows[start:start + rows_per_page]]
+        _save_page(pdf, _table_page, title, columns, lines, layout, first_page + index)
+        timings.append(time.perf_counter() - started)
+
+    if not rows:
+        _save_page(pdf, _table_page, title, columns, [], layout, first_page)
+    return timings
+
+
+def _save_page(pdf, build, title, *args):
+    """
+    Build a page with core fonts when all of its text can be encoded for
+    them, and add it to the PdfPages
+    """
+    core = _core_encodable(title, *args)
+    with rc_context({'pdf.use14corefonts': core}):
+        pdf.savefig(build(core, title, *args))
+
+
+def _table_page(core, title, columns, lines, layout, page_number):
+    figure = Figure(figsize=PAGE_SIZE)
+    figure.text(0.03, 0.95, title, fontproperties=font(core, weight='bold', size=TITLE_FONT_SIZE))
+    figure.text(0.97, 0.02, f"Page {page_number}", ha='right', fontproperties=font(core))
+
+    left, top, width, _ = TABLE_BOX
+    row_height = layout.row_height
+    mono = font(core, mono=True, size=layout.font_size)
+
+    figure.patches.append(Rectangle((left, top - row_height), width, row_height,
+                                    transform=figure.transFigure, facecolor='#DDDDDD',
+                                    edgecolor='none'))
+    figure.text(left + 0.003, top - row_height / 2, layout.format_row(columns, header=True),
+                va='center', fontproperties=font(core, mono=True, weight='bold', size=layout.font_size))
+
+    for index, line in enumerate(lines, 1):
+        figure.text(left + 0.003, top - row_height * (index + 0.5), line,
+                    va='center', fontproperties=mono)
+    return figure
+
+
+def _summary_page(core, title, summary):
+    figure = Figure(figsize=PAGE_SIZE)
+    figure.text(0.03, 0.95, f"{title} - Summary", fontproperties=font(core, weight='bold', size=TITLE_FONT_SIZE))
+    for index, (label, value) in enumerate(summary):
+        y = 0.85 - index * 0.05
+        figure.text(0.05, y, str(label), fontproperties=font(core, weight='bold', size=FONT_SIZE + 4))
+        figure.text(0.45, y, _format_value(value), fontproperties=font(core, size=FONT_SIZE + 4))
+    return figure
+
+
+def _core_encodable(*parts):
+    text = ''.join(str(part) for part in _flatten(parts))
+    try:
+        text.encode('cp1252')
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+def _flatten(parts):
+    for part in parts:
+        if isinstance(part, (list, tuple)):
+            yield from _flatten(part)
+        else:
+            yield part
+
+
+def _chunks(head, rows, size):
+    rows = iter(rows)
+    chunk = list(head) + list(islice(rows, size - len(head)))
+    while chunk:
+        yield chunk
+        chunk = list(islice(rows, size))
+
+
+def _format_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M')
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+def _kind(value):
+    if isinstance(value, (int, float, Decimal)):
+        return 'number'
+    if isinstance(value, date):
+        return 'date'
+    return 'text'
+
+
+def _truncate(text, width):
+    return text if len(text) <= width else text[:width - 1] + '…'
+
+
+def _log_timings(title, timings):
+    if not timings:
+        return
+    for page, seconds in enumerate(timings, 1):
+        logger.debug('%s: page %s rendered in %.3fs', title, page, seconds)
+    logger.info('%s: %s pages in %.2fs of render time (%.3fs/page)',
+                title, len(timings), sum(timings), sum(timings) / len(timings))
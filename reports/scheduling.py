@@ -0,0 +1,96 @@
+import logging
+from django.conf import settings
+from django.db import DatabaseError, transaction, close_old_connections
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from . import jobs
+from .models import GeneratedReport, ReportSchedule, SchedulerLock
+
+logger = logging.getLogger(__name__)
+
+IN_FLIGHT_STATUSES = ('PENDING', 'PROCESSING')
+
+
+def due(now):
+    """
+    Active schedules whose next run has passed and whose previous run is
+    no longer queued or generating
+    """
+    running = GeneratedReport.objects.filter(schedule=OuterRef('pk'), status__in=IN_FLIGHT_STATUSES)
+    return ReportSchedule.objects.filter(is_active=True, next_run__lte=now).filter(~Exists(running))
+
+
+def in_flight():
+    return GeneratedReport.objects.filter(schedule__isnull=False, status__in=IN_FLIGHT_STATUSES).count()
+
+
+def _lock_dispatch(now):
+    # An UPDATE holds the row until commit on every backend, including
+    # SQLite, where select_for_update is a no-op
+    SchedulerLock.objects.get_or_create(name='dispatch')
+    SchedulerLock.objects.filter(name='dispatch').update(locked_at=now)
+
+
+def dispatch_due(max_concurrent=None, now=None):
+    """
+    Claim due schedules, oldest first, and queue one run for each while
+    fewer than max_concurrent scheduled runs are in flight. Returns the
+    queued GeneratedReports.
+
+    A claim moves next_run to the first run after now, so a schedule that
+    missed several runs during downtime runs once, and the backlog drains
+    at most max_concurrent runs at a time. Concurrent schedulers take
+    turns on a SchedulerLock row, so each counts the runs queued by the
+    others before filling the free slots; the claim UPDATE also repeats the
+    old next_run so a run is never queued twice.
+    """
+    max_concurrent = settings.REPORT_SCHEDULER_MAX_CONCURRENT if max_concurrent is None else max_concurrent
+    now = now or timezone.now()
+
+    queued = []
+    with transaction.atomic():
+        _lock_dispatch(now)
+        slots = max_concurrent - in_flight()
+        if slots <= 0:
+            return []
+
+        schedules = (due(now)
+                     .select_for_update(skip_locked=True, of=('self',))
+                     .select_related('report__created_by')
+                     .order_by('next_run', 'id')[:slots])
+
+        for schedule in schedules:
+            claimed = ReportSchedule.objects.filter(pk=schedule.pk, next_run=schedule.next_run).update(
+                next_run=schedule.compute_next_run(now),
+                last_run=now
+            )
+            if not claimed:
+                continue
+
+            report = schedule.report
+            queued.append(jobs.enqueue(report, report.created_by, report.parameters, schedule=schedule))
+            logger.info('Queued scheduled report %s (schedule %s)', report.pk, schedule.pk)
+
+    return queued
+
+
+def run(stop_event, interval=None, max_concurrent=None, once=False):
+    """
+    Dispatch due schedules every interval seconds until stop_event is set,
+    or a single time with once. Returns the number of runs queued.
+    """
+    interval = settings.REPORT_SCHEDULER_INTERVAL if interval is None else interval
+    queued = 0
+
+    while not stop_event.is_set():
+        close_old_connections()
+        try:
+            queued += len(dispatch_due(max_concurrent))
+        except DatabaseError:
+            # Keep scheduling across lock timeouts and reconnects
+            logger.exception('Report scheduler hit a database error')
+        if once:
+            break
+        stop_event.wait(interval)
+
+    return queued
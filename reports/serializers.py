@@ -54,14 +54,30 @@ class ReportScheduleSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ['next_run', 'last_run']
     
+    def validate(self, data):
+        day_of_week = data.get('day_of_week')
+        if day_of_week is not None and not 0 <= day_of_week <= 6:
+            raise serializers.ValidationError({'day_of_week': 'Must be between 0 (Monday) and 6 (Sunday).'})
+        day_of_month = data.get('day_of_month')
+        if day_of_month is not None and not 1 <= day_of_month <= 31:
+            raise serializers.ValidationError({'day_of_month': 'Must be between 1 and 31.'})
+        return data
+    
     def create(self, validated_data):
         recipients = validated_data.pop('recipients', [])
+        # next_run is computed from the timing fields on save
         schedule = ReportSchedule.objects.create(**validated_data)
         
         if recipients:
             schedule.recipients.set(recipients)
             
         return schedule
+    
+    def update(self, instance, validated_data):
+        # A new timing replaces the next run computed from the old one
+        if any(field in validated_data for field in ('frequency', 'day_of_week', 'day_of_month', 'time')):
+            validated_data['next_run'] = None
+        return super().update(instance, validated_data)
 
 
 class ReportTemplateSerializer(serializers.ModelSerializer):
@@ -91,7 +107,8 @@ class GeneratedReportSerializer(serializers.ModelSerializer):
     class Meta:
         model = GeneratedReport
         fields = '__all__'
-        read_only_fields = ['generated_by', 'status', 'start_time', 'end_time', 'file', 'error_message']
+        read_only_fields = ['generated_by', 'status', 'start_time', 'end_time', 'file', 'error_message',
+                            'attempts', 'next_attempt_at', 'claimed_at', 'worker', 'cache_key', 'cache_hit']
     
     def create(self, validated_data):
         validated_data['generated_by'] = self.context['request'].user
@@ -0,0 +1,105 @@
+import csv
+import json
+import tempfile
+from django.conf import settings
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+# Formats that are written row by row: (content type, file extension)
+STREAM_FORMATS = {
+    'CSV': ('text/csv', 'csv'),
+    'NDJSON': ('application/x-ndjson', 'ndjson'),
+    'JSON': ('application/json', 'json'),
+}
+
+# Rows serialized into one chunk of output
+ROWS_PER_CHUNK = 500
+
+
+class _Echo:
+    """
+    File-like object whose write() hands the line back to csv.writer's caller
+    """
+    def write(self, value):
+        return value
+
+
+def iter_rows(queryset, chunk_size=None):
+    """
+    Walk a queryset in chunks of REPORT_STREAM_CHUNK_SIZE rows without
+    filling its result cache. Rows already in memory, such as a pivoted
+    result, are passed through.
+    """
+    if not hasattr(queryset, 'iterator'):
+        return iter(queryset)
+    return queryset.iterator(chunk_size=chunk_size or settings.REPORT_STREAM_CHUNK_SIZE)
+
+
+def serialize(format, columns, rows):
+    """
+    Yield the rows as text chunks in the given format
+    """
+    if format == 'CSV':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(columns)
+        lines = (writer.writerow(row) for row in rows)
+        yield from _join_chunks(lines)
+    elif format == 'NDJSON':
+        lines = (json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + '\n' for row in rows)
+        yield from _join_chunks(lines)
+    elif format == 'JSON':
+        yield '['
+        separator = ''
+        for chunk in _join_chunks(
+                json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + ',\n' for row in rows):
+            # The separator trails each row, so hold it back until the next one
+            yield separator + chunk[:-2]
+            separator = ',\n'
+        yield ']'
+    else:
+        raise ValueError(f"Unsupported streaming format: {format}")
+
+
+def _join_chunks(lines):
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= ROWS_PER_CHUNK:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+def write_file(chunks):
+    """
+    Spool text chunks to an anonymous temporary file, returned as a File
+    ready to be saved to storage
+    """
+    spool = tempfile.TemporaryFile()
+    for chunk in chunks:
+        spool.write(chunk.encode('utf-8'))
+    spool.seek(0)
+    return File(spool)
+
+
+def export_file(format, columns, queryset):
+    """
+    Serialize a values_list queryset to a temporary file in chunks
+    """
+    return write_file(serialize(format, columns, iter_rows(queryset)))
+
+
+def streaming_response(format, columns, queryset, filename):
+    """
+    Stream a values_list queryset to the client; memory stays bounded by
+    the iterator chunk size whatever the row count
+    """
+    content_type, extension = STREAM_FORMATS[format]
+    response = StreamingHttpResponse(
+        serialize(format, columns, iter_rows(queryset)),
+        content_type=content_type
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{extension}"'
+    return response
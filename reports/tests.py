@@ -1,3 +1,757 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from itertools import count
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from api.testing import QueryCountTestCase
+from inventory import rollups
+from inventory.models import Product, Inventory, InventoryMovement
+from orders.models import (Customer, PurchaseOrder, PurchaseOrderItem, SalesOrder, SalesOrderItem,
+                           Supplier)
+from orders.services import RECEIPT_REFERENCE_PREFIX
+from users.models import Activity, UserProfile
+from warehouse.models import Warehouse
+from . import cache, downloads, jobs, pdf, scheduling
+from .datasets import InventoryDataset, ReceivingDataset, SalesDataset, ShippingDataset, UserActivityDataset
+from .models import Report, ReportSchedule, ReportTemplate, GeneratedReport
+from .report_generators import generate_report
 
-# Create your tests here.
+serial = count()
+
+
+def make_report():
+    n = next(serial)
+    user = User.objects.create(username=f"author{n}")
+    report = Report.objects.create(title=f"Report {n}", report_type='INVENTORY', created_by=user)
+    warehouse = Warehouse.objects.create(name=f"Warehouse {n}", address='-', city='-', state='-',
+                                         country='-', postal_code='-')
+    report.warehouses.add(warehouse)
+    return report
+
+
+def make_schedule():
+    schedule = ReportSchedule.objects.create(report=make_report(), frequency='DAILY', time=time(6))
+    schedule.recipients.add(schedule.report.created_by)
+    return schedule
+
+
+def make_template():
+    n = next(serial)
+    user = User.objects.create(username=f"designer{n}")
+    return ReportTemplate.objects.create(name=f"Template {n}", report_type='INVENTORY',
+                                         created_by=user, parameters={})
+
+
+def make_generated_report():
+    report = make_report()
+    return GeneratedReport.objects.create(report=report, generated_by=report.created_by)
+
+
+class ReportQueryCountTests(QueryCountTestCase):
+    """
+    Report endpoints cost the same number of queries for any number of
+    rows
+    """
+    def test_reports(self):
+        seed = lambda rows: [make_report() for _ in range(rows)]
+        report = make_report()
+        self.assertConstantGet('/api/reports/report/', seed)
+        self.assertConstantGet(f"/api/reports/report/{report.pk}/", seed)
+
+    def test_schedules(self):
+        seed = lambda rows: [make_schedule() for _ in range(rows)]
+        schedule = make_schedule()
+        self.assertConstantGet('/api/reports/schedules/', seed)
+        self.assertConstantGet(f"/api/reports/schedules/{schedule.pk}/", seed)
+
+    def test_templates(self):
+        seed = lambda rows: [make_template() for _ in range(rows)]
+        template = make_template()
+        self.assertConstantGet('/api/reports/templates/', seed)
+        self.assertConstantGet(f"/api/reports/templates/{template.pk}/", seed)
+
+    def test_generated_reports(self):
+        seed = lambda rows: [make_generated_report() for _ in range(rows)]
+        generated = make_generated_report()
+        self.assertConstantGet('/api/reports/generated/', seed)
+        self.assertConstantGet(f"/api/reports/generated/{generated.pk}/", seed)
+
+
+class ReportExportTests(QueryCountTestCase):
+    """
+    Parameters the dataset rejects are reported as a 400, not a 500
+    """
+    def test_invalid_parameters(self):
+        report = make_report()
+        report.parameters = {'section': 'bogus'}
+        report.save()
+        response = self.client.get(f"/api/reports/report/{report.pk}/export/?output=csv")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'error': 'section must be one of: stock, movements'})
+
+    def test_valid_parameters_stream(self):
+        report = make_report()
+        response = self.client.get(f"/api/reports/report/{report.pk}/export/?output=csv")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'product'))
+
+
+class ReportPaginationTests(TestCase):
+    """
+    Ordering by a nullable column falls back to the default keyset, and
+    every page walk returns each row exactly once
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', is_staff=True, is_superuser=True)
+        UserProfile.objects.create(user=cls.admin, role='ADMIN')
+        now = timezone.now()
+        for i in range(7):
+            generated = make_generated_report()
+            schedule = make_schedule()
+            # Every other row is still running or has never run
+            if i % 2:
+                GeneratedReport.objects.filter(pk=generated.pk).update(end_time=now - timedelta(hours=i))
+                ReportSchedule.objects.filter(pk=schedule.pk).update(last_run=now - timedelta(hours=i))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def walk(self, url):
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += [row['id'] for row in response.json()['results']]
+            url = response.json()['next']
+        return seen
+
+    def test_nullable_orderings_page_through_every_row(self):
+        cases = [('generated', GeneratedReport, 'end_time'), ('generated', GeneratedReport, '-end_time'),
+                 ('schedules', ReportSchedule, 'last_run'), ('schedules', ReportSchedule, '-last_run')]
+        for path, model, ordering in cases:
+            with self.subTest(ordering=ordering):
+                seen = self.walk(f"/api/reports/{path}/?page_size=2&ordering={ordering}")
+                self.assertEqual(len(seen), len(set(seen)))
+                self.assertEqual(sorted(seen), sorted(model.objects.values_list('id', flat=True)))
+
+
+@override_settings(REPORT_JOB_MAX_ATTEMPTS=3, REPORT_JOB_RETRY_DELAY=30, REPORT_JOB_TIMEOUT=60)
+class ReportJobTests(TestCase):
+    """
+    Failed jobs are retried with exponential backoff and only the last
+    attempt leaves them FAILED; stale jobs are reclaimed while they have
+    attempts left
+    """
+    def setUp(self):
+        report = make_report()
+        # An unknown section fails the generator on every attempt
+        self.job = jobs.enqueue(report, report.created_by, parameters={'section': 'bogus'})
+
+    def refresh(self):
+        self.job.refresh_from_db()
+        return self.job
+
+    def test_failures_are_retried_with_backoff_until_the_last_attempt(self):
+        for attempt, delay in ((1, 30), (2, 60)):
+            generated_report = jobs.claim_next('worker')
+            self.assertEqual((generated_report.pk, generated_report.attempts), (self.job.pk, attempt))
+            before = timezone.now()
+            with self.assertLogs('reports.jobs', 'WARNING'):
+                self.assertFalse(jobs.run_job(generated_report))
+
+            job = self.refresh()
+            self.assertEqual(job.status, 'PENDING')
+            self.assertIsNone(job.end_time)
+            self.assertIn('section', job.error_message)
+            self.assertGreaterEqual(job.next_attempt_at, before + timedelta(seconds=delay))
+            self.assertLessEqual(job.next_attempt_at, timezone.now() + timedelta(seconds=delay))
+
+            # Not due before the backoff has passed
+            self.assertIsNone(jobs.claim_next('worker'))
+            GeneratedReport.objects.filter(pk=job.pk).update(next_attempt_at=timezone.now())
+
+        generated_report = jobs.claim_next('worker')
+        self.assertEqual(generated_report.attempts, 3)
+        with self.assertLogs('reports.jobs', 'ERROR'):
+            self.assertFalse(jobs.run_job(generated_report))
+        job = self.refresh()
+        self.assertEqual(job.status, 'FAILED')
+        self.assertIsNotNone(job.end_time)
+        self.assertIsNone(jobs.claim_next('worker'))
+
+    def test_generator_errors_leave_the_job_to_the_worker(self):
+        generated_report = jobs.claim_next('worker')
+        with self.assertRaises(ValueError):
+            generate_report(generated_report)
+        job = self.refresh()
+        self.assertEqual(job.status, 'PROCESSING')
+        self.assertIsNone(job.end_time)
+
+    def test_stale_jobs_are_reclaimed_while_attempts_are_left(self):
+        stale = timezone.now() - timedelta(seconds=61)
+        GeneratedReport.objects.filter(pk=self.job.pk).update(status='PROCESSING', attempts=2,
+                                                                claimed_at=stale, worker='gone')
+        generated_report = jobs.claim_next('worker')
+        self.assertEqual((generated_report.pk, generated_report.attempts), (self.job.pk, 3))
+        self.assertEqual(generated_report.worker, 'worker')
+
+    def test_stale_jobs_on_their_last_attempt_fail(self):
+        stale = timezone.now() - timedelta(seconds=61)
+        GeneratedReport.objects.filter(pk=self.job.pk).update(status='PROCESSING', attempts=3,
+                                                                claimed_at=stale, worker='gone')
+        with self.assertLogs('reports.jobs', 'WARNING'):
+            self.assertIsNone(jobs.claim_next('worker'))
+        job = self.refresh()
+        self.assertEqual((job.status, job.attempts), ('FAILED', 3))
+        self.assertIsNotNone(job.end_time)
+
+    def test_running_jobs_are_not_reclaimed(self):
+        GeneratedReport.objects.filter(pk=self.job.pk).update(status='PROCESSING', attempts=1,
+                                                                claimed_at=timezone.now(), worker='busy')
+        self.assertIsNone(jobs.claim_next('worker'))
+        self.assertEqual(self.refresh().status, 'PROCESSING')
+
+
+class ReportCacheKeyTests(TestCase):
+    """
+    A data change anywhere in a dataset's sources gives a new cache key,
+    and so does a new day for datasets that count against today
+    """
+    def setUp(self):
+        self.suppliers = [Supplier.objects.create(name=f"Supplier {next(serial)}") for _ in range(2)]
+
+    def key(self, report_type='RECEIVING', today=date(2024, 3, 1)):
+        with mock.patch('django.utils.timezone.localdate', return_value=today):
+            return cache.cache_key(report_type, 'CSV', {})
+
+    def test_data_changes(self):
+        key = self.key()
+        self.assertEqual(self.key(), key)
+
+        # An update to a row other than the newest
+        time_before = self.suppliers[0].updated_at
+        self.suppliers[0].save()
+        self.assertGreater(self.suppliers[0].updated_at, time_before)
+        updated = self.key()
+        self.assertNotEqual(updated, key)
+
+        Supplier.objects.create(name='Supplier')
+        self.assertNotEqual(self.key(), updated)
+
+    def test_date_changes(self):
+        key = self.key()
+        self.assertNotEqual(self.key(today=date(2024, 3, 2)), key)
+        self.assertNotEqual(self.key('SHIPPING'), self.key('SHIPPING', today=date(2024, 3, 2)))
+        # Inventory rows do not depend on the date
+        self.assertEqual(self.key('INVENTORY'), self.key('INVENTORY', today=date(2024, 3, 2)))
+
+
+def at(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+class ComputeNextRunTests(SimpleTestCase):
+    """
+    The next run is the first one strictly after the given moment
+    """
+    def next_run(self, after, frequency, **kwargs):
+        return ReportSchedule(frequency=frequency, time=time(6), **kwargs).compute_next_run(after)
+
+    def test_daily(self):
+        self.assertEqual(self.next_run(at(2024, 3, 5, 5), 'DAILY'), at(2024, 3, 5, 6))
+        self.assertEqual(self.next_run(at(2024, 3, 5, 6), 'DAILY'), at(2024, 3, 6, 6))
+        self.assertEqual(self.next_run(at(2024, 12, 31, 7), 'DAILY'), at(2025, 1, 1, 6))
+
+    def test_weekly(self):
+        # 2024-03-06 is a Wednesday
+        self.assertEqual(self.next_run(at(2024, 3, 6, 5), 'WEEKLY', day_of_week=2), at(2024, 3, 6, 6))
+        self.assertEqual(self.next_run(at(2024, 3, 6, 7), 'WEEKLY', day_of_week=2), at(2024, 3, 13, 6))
+        self.assertEqual(self.next_run(at(2024, 3, 6, 7), 'WEEKLY'), at(2024, 3, 11, 6))
+        self.assertEqual(self.next_run(at(2024, 12, 30, 7), 'WEEKLY', day_of_week=6), at(2025, 1, 5, 6))
+
+    def test_monthly(self):
+        self.assertEqual(self.next_run(at(2024, 3, 5, 7), 'MONTHLY'), at(2024, 4, 1, 6))
+        self.assertEqual(self.next_run(at(2024, 3, 5, 7), 'MONTHLY', day_of_month=15), at(2024, 3, 15, 6))
+        self.assertEqual(self.next_run(at(2024, 12, 15, 7), 'MONTHLY', day_of_month=15), at(2025, 1, 15, 6))
+
+    def test_month_end_is_clamped(self):
+        self.assertEqual(self.next_run(at(2024, 1, 31, 7), 'MONTHLY', day_of_month=31), at(2024, 2, 29, 6))
+        self.assertEqual(self.next_run(at(2023, 1, 31, 7), 'MONTHLY', day_of_month=31), at(2023, 2, 28, 6))
+        self.assertEqual(self.next_run(at(2024, 2, 29, 7), 'MONTHLY', day_of_month=31), at(2024, 3, 31, 6))
+        self.assertEqual(self.next_run(at(2024, 4, 1), 'MONTHLY', day_of_month=31), at(2024, 4, 30, 6))
+
+    def test_quarterly(self):
+        self.assertEqual(self.next_run(at(2024, 2, 10), 'QUARTERLY'), at(2024, 4, 1, 6))
+        self.assertEqual(self.next_run(at(2024, 11, 10), 'QUARTERLY', day_of_month=31), at(2025, 1, 31, 6))
+
+
+class DispatchDueTests(TestCase):
+    """
+    A schedule that missed runs during downtime runs once, and no more
+    than max_concurrent scheduled runs are in flight
+    """
+    def due_schedule(self, missed_days=1):
+        schedule = make_schedule()
+        schedule.next_run = timezone.now() - timedelta(days=missed_days)
+        schedule.save()
+        return schedule
+
+    def test_catch_up_after_downtime_runs_once(self):
+        schedule = self.due_schedule(missed_days=5)
+        now = timezone.now()
+        queued = scheduling.dispatch_due(max_concurrent=5, now=now)
+        self.assertEqual([run.schedule_id for run in queued], [schedule.pk])
+
+        schedule.refresh_from_db()
+        self.assertEqual(schedule.last_run, now)
+        self.assertEqual(schedule.next_run, schedule.compute_next_run(now))
+        self.assertGreater(schedule.next_run, now)
+        self.assertEqual(scheduling.dispatch_due(max_concurrent=5, now=now), [])
+
+    def test_in_flight_runs_fill_the_slots(self):
+        schedules = [self.due_schedule(missed_days=days) for days in (3, 2, 1)]
+        queued = scheduling.dispatch_due(max_concurrent=2)
+        self.assertEqual([run.schedule_id for run in queued], [schedule.pk for schedule in schedules[:2]])
+        self.assertEqual(scheduling.dispatch_due(max_concurrent=2), [])
+
+        GeneratedReport.objects.filter(pk=queued[0].pk).update(status='COMPLETED')
+        queued = scheduling.dispatch_due(max_concurrent=2)
+        self.assertEqual([run.schedule_id for run in queued], [schedules[2].pk])
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_single_ranges(self):
+        self.assertEqual(downloads.parse_range('bytes=0-99', 1000), (0, 99))
+        self.assertEqual(downloads.parse_range('bytes=500-', 1000), (500, 999))
+        # An end past the file is cut to the last byte
+        self.assertEqual(downloads.parse_range('bytes=900-5000', 1000), (900, 999))
+
+    def test_suffix_ranges(self):
+        self.assertEqual(downloads.parse_range('bytes=-100', 1000), (900, 999))
+        self.assertEqual(downloads.parse_range('bytes=-5000', 1000), (0, 999))
+
+    def test_unsatisfiable_ranges(self):
+        for header, size in (('bytes=1000-', 1000), ('bytes=2000-3000', 1000), ('bytes=-0', 1000),
+                             ('bytes=-10', 0)):
+            with self.subTest(header=header, size=size), self.assertRaises(downloads.UnsatisfiableRange):
+                downloads.parse_range(header, size)
+
+    def test_whole_file_fallback(self):
+        # Missing, malformed, reversed and multi-range headers send the whole file
+        for header in (None, '', 'bytes=-', 'items=0-9', 'bytes=50-10', 'bytes=0-9,20-29', 'bytes=0-9, -5'):
+            with self.subTest(header=header):
+                self.assertIsNone(downloads.parse_range(header, 1000))
+
+
+class FileResponseTests(TestCase):
+    """
+    Downloads stream the file, honour a single range and hand the file to
+    the web server when offloading is configured
+    """
+    content = bytes(range(256)) * 4
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media_root, REPORT_DOWNLOAD_OFFLOAD=''))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    def setUp(self):
+        self.generated = make_generated_report()
+        self.generated.file.save('stock.csv', ContentFile(self.content))
+        self.generated.end_time = timezone.now()
+        self.generated.save()
+
+    def get(self, **headers):
+        request = RequestFactory().get('/', headers=headers)
+        return downloads.file_response(request, self.generated, 'Stock')
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_whole_file(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.content)
+        self.assertEqual(response['Content-Length'], str(len(self.content)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('filename="Stock.csv"', response['Content-Disposition'])
+
+    def test_single_range(self):
+        response = self.get(Range='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.body(response), self.content[100:200])
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.content)}')
+        self.assertEqual(response['Content-Length'], '100')
+
+    def test_suffix_range(self):
+        response = self.get(Range='bytes=-24')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.body(response), self.content[-24:])
+        self.assertEqual(response['Content-Range'], f'bytes 1000-1023/{len(self.content)}')
+
+    def test_unsatisfiable_range(self):
+        response = self.get(Range='bytes=5000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')
+
+    def test_multi_range_sends_the_whole_file(self):
+        response = self.get(Range='bytes=0-9,20-29')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.content)
+
+    def test_stale_if_range_sends_the_whole_file(self):
+        response = self.get(Range='bytes=0-9', If_Range='"report-0-0"')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(self.get(Range='bytes=0-9', If_Range=etag).status_code, 206)
+
+    @override_settings(REPORT_DOWNLOAD_OFFLOAD='X-Accel-Redirect', REPORT_DOWNLOAD_ACCEL_PREFIX='/protected/')
+    def test_accel_redirect(self):
+        response = self.get(Range='bytes=0-9')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected/{self.generated.file.name}')
+        self.assertEqual(response.content, b'')
+        self.assertIn('filename="Stock.csv"', response['Content-Disposition'])
+
+    @override_settings(REPORT_DOWNLOAD_OFFLOAD='X-Sendfile')
+    def test_sendfile(self):
+        response = self.get()
+        self.assertEqual(response['X-Sendfile'], self.generated.file.path)
+        self.assertEqual(response.content, b'')
+
+
+class SalesDatasetTests(TestCase):
+    """
+    Sales lines are bucketed by order date and measured per group, with
+    unsold orders left out
+    """
+    @classmethod
+    def setUpTestData(cls):
+        warehouse = Warehouse.objects.create(name='Warehouse', address='-', city='-', state='-',
+                                             country='-', postal_code='-')
+        customer = Customer.objects.create(name='Customer')
+        cls.bolt = Product.objects.create(name='Bolt', sku='BOLT', cost_price=2, selling_price=10)
+        cls.nut = Product.objects.create(name='Nut', sku='NUT', cost_price=5, selling_price=20)
+
+        def order(order_date, status, *lines):
+            sales_order = SalesOrder.objects.create(order_number=f"SO-{next(serial)}", customer=customer,
+                                                    warehouse=warehouse, status=status,
+                                                    order_date=order_date, shipping_address='-')
+            for product, quantity, unit_price, discount in lines:
+                SalesOrderItem.objects.create(sales_order=sales_order, product=product, quantity=quantity,
+                                              unit_price=unit_price, discount=discount)
+
+        order(date(2024, 1, 15), 'SUBMITTED', (cls.bolt, 3, 10, 1), (cls.nut, 1, 20, 0))
+        order(date(2024, 1, 20), 'DELIVERED', (cls.bolt, 2, 10, 0))
+        order(date(2024, 2, 3), 'SHIPPED', (cls.bolt, 1, 12, 0))
+        order(date(2024, 2, 10), 'CANCELLED', (cls.bolt, 100, 10, 0))
+        order(date(2024, 2, 11), 'DRAFT', (cls.nut, 100, 20, 0))
+
+    def rows(self, **parameters):
+        columns, rows = SalesDataset(parameters).rows()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def test_monthly_buckets_by_product(self):
+        rows = self.rows(period='month', group_by='product')
+        self.assertEqual([(row['period'], row['sku']) for row in rows],
+                         [(date(2024, 1, 1), 'BOLT'), (date(2024, 1, 1), 'NUT'), (date(2024, 2, 1), 'BOLT')])
+        measures = [(row['orders'], row['units'], row['revenue'], row['discounts'], row['cost'], row['margin'],
+                     row['margin_pct']) for row in rows]
+        self.assertEqual(measures, [
+            (2, 5, 49, 1, 10, 39, 79.59),
+            (1, 1, 20, 0, 5, 15, 75.0),
+            (1, 1, 12, 0, 2, 10, 83.33),
+        ])
+
+    def test_weekly_and_quarterly_buckets(self):
+        # 2024-01-15 is a Monday; the 20th falls in the same week
+        rows = self.rows(period='week', group_by='category')
+        self.assertEqual([(row['period'], row['orders'], row['units']) for row in rows],
+                         [(date(2024, 1, 15), 2, 6), (date(2024, 1, 29), 1, 1)])
+
+        rows = self.rows(period='quarter', group_by='warehouse')
+        self.assertEqual([(row['period'], row['orders'], row['units'], row['revenue']) for row in rows],
+                         [(date(2024, 1, 1), 3, 7, 81)])
+
+    def test_status_parameter_includes_excluded_orders(self):
+        rows = self.rows(period='month', status='CANCELLED')
+        self.assertEqual([(row['period'], row['sku'], row['units']) for row in rows],
+                         [(date(2024, 2, 1), 'BOLT', 100)])
+
+    def test_pivot(self):
+        columns, rows = SalesDataset({'period': 'month', 'pivot': 'units'}).rows()
+        self.assertEqual(columns, ['product_id', 'sku', 'product', '2024-01-01', '2024-02-01', 'total'])
+        self.assertEqual([tuple(row) for row in rows],
+                         [(self.bolt.pk, 'BOLT', 'Bolt', 5, 1, 6), (self.nut.pk, 'NUT', 'Nut', 1, 0, 1)])
+
+
+class ReceivingDatasetTests(TestCase):
+    """
+    Purchase orders are summarised per supplier: deliveries, fill rate,
+    booked receipts and lead time percentiles
+    """
+    @classmethod
+    def setUpTestData(cls):
+        warehouse = Warehouse.objects.create(name='Warehouse', address='-', city='-', state='-',
+                                             country='-', postal_code='-')
+        product = Product.objects.create(name='Bolt', sku='BOLT', cost_price=1, selling_price=2)
+        inventory = Inventory.objects.create(product=product, warehouse=warehouse)
+        cls.acme = Supplier.objects.create(name='Acme')
+        cls.bolts = Supplier.objects.create(name='Bolts Ltd')
+
+        def order(supplier, status, order_date, expected, actual, quantity, received, receipts=()):
+            purchase_order = PurchaseOrder.objects.create(
+                po_number=f"PO-{next(serial)}", supplier=supplier, warehouse=warehouse, status=status,
+                order_date=order_date, expected_delivery_date=expected, actual_delivery_date=actual)
+            PurchaseOrderItem.objects.create(purchase_order=purchase_order, product=product, quantity=quantity,
+                                             received_quantity=received, unit_price=1)
+            for units in receipts:
+                InventoryMovement.objects.create(inventory=inventory, movement_type='IN', quantity=units,
+                                                 reference=f"{RECEIPT_REFERENCE_PREFIX}{purchase_order.po_number}")
+
+        # Acme: on time in 3 days, late in 6 days with half the units, one overdue
+        order(cls.acme, 'RECEIVED', date(2024, 1, 1), date(2024, 1, 5), date(2024, 1, 4), 10, 10, [10])
+        order(cls.acme, 'RECEIVED', date(2024, 1, 10), date(2024, 1, 12), date(2024, 1, 16), 10, 5, [3, 2])
+        order(cls.acme, 'APPROVED', date(2024, 2, 1), date(2024, 2, 5), None, 5, 0)
+        order(cls.acme, 'DRAFT', date(2024, 2, 1), None, None, 50, 0)
+        # Bolts Ltd: one delivery in 10 days, no expected date
+        order(cls.bolts, 'RECEIVED', date(2024, 1, 1), None, date(2024, 1, 11), 4, 4)
+
+    def test_supplier_rows(self):
+        columns, rows = ReceivingDataset({}).rows()
+        rows = [dict(zip(columns, row)) for row in rows]
+        self.assertEqual([row['supplier'] for row in rows], ['Acme', 'Bolts Ltd'])
+
+        acme, bolts = rows
+        self.assertEqual({key: acme[key] for key in columns[2:12]}, {
+            'orders': 3, 'delivered': 2, 'late': 1, 'overdue': 1, 'lines': 3, 'ordered_units': 25,
+            'received_units': 15, 'fill_rate': 60.0, 'receipts': 3, 'receipt_units': 15,
+        })
+        self.assertEqual([acme[key] for key in columns[12:]], [4.5, 4.5, 5.7, 5.8])
+        self.assertEqual({key: bolts[key] for key in columns[2:12]}, {
+            'orders': 1, 'delivered': 1, 'late': 0, 'overdue': 0, 'lines': 1, 'ordered_units': 4,
+            'received_units': 4, 'fill_rate': 100.0, 'receipts': 0, 'receipt_units': 0,
+        })
+        self.assertEqual([bolts[key] for key in columns[12:]], [10.0, 10.0, 10.0, 10.0])
+
+    def test_overdue_is_counted_against_today(self):
+        with mock.patch('django.utils.timezone.localdate', return_value=date(2024, 2, 5)):
+            _, rows = ReceivingDataset({}).rows()
+        self.assertEqual(rows[0][5], 0)
+
+    def test_summary(self):
+        summary = dict(ReceivingDataset({'supplier_id': self.acme.pk}).summary_rows())
+        self.assertEqual(summary['Purchase Orders'], 3)
+        self.assertEqual(summary['Units Ordered'], 25)
+        self.assertEqual(summary['Fill Rate'], '60.00%')
+        self.assertEqual(summary['Late Deliveries'], 1)
+        self.assertEqual(summary['Mean Lead Time (days)'], 4.5)
+
+
+class ShippingDatasetTests(TestCase):
+    """
+    Fulfilment cycle times per period and shipping method, and the open
+    order backlog aged against today
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.warehouse = Warehouse.objects.create(name='Warehouse', address='-', city='-', state='-',
+                                                 country='-', postal_code='-')
+        customer = Customer.objects.create(name='Customer')
+
+        def order(status, order_date, method='Courier', shipped=None, delivered=None, total=0):
+            SalesOrder.objects.create(order_number=f"SO-{next(serial)}", customer=customer,
+                                      warehouse=cls.warehouse, status=status, order_date=order_date,
+                                      shipping_method=method, shipping_date=shipped, delivery_date=delivered,
+                                      shipping_address='-', total=total)
+
+        order('DELIVERED', date(2024, 3, 1), shipped=date(2024, 3, 1), delivered=date(2024, 3, 3))
+        order('DELIVERED', date(2024, 3, 4), shipped=date(2024, 3, 6), delivered=date(2024, 3, 7))
+        order('SUBMITTED', date(2024, 3, 5), total=50)
+        order('SUBMITTED', date(2024, 3, 10), total=5)
+        order('PICKING', date(2024, 3, 9), total=20)
+        order('PICKING', date(2024, 2, 1), total=30)
+        order('SHIPPED', date(2024, 3, 2), method='Freight', shipped=date(2024, 3, 12))
+        order('CANCELLED', date(2024, 3, 2), shipped=date(2024, 3, 2))
+
+    def rows(self, **parameters):
+        columns, rows = ShippingDataset(parameters).rows()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def test_cycle_times(self):
+        courier, freight = self.rows(section='cycle', period='month', start_date='2024-03-01')
+        self.assertEqual((courier['period'], courier['shipping_method'], freight['shipping_method']),
+                         (date(2024, 3, 1), 'Courier', 'Freight'))
+
+        self.assertEqual({key: courier[key] for key in ('orders', 'shipped', 'delivered', 'same_day',
+                                                        'same_day_pct', 'ship_days', 'delivery_days')},
+                         {'orders': 5, 'shipped': 2, 'delivered': 2, 'same_day': 1, 'same_day_pct': 50.0,
+                          'ship_days': 1.0, 'delivery_days': 1.5})
+        self.assertEqual([courier[f"ship_{name}"] for name in ('0d', '1d', '2_3d', '4_7d', '8d_plus')],
+                         [1, 0, 1, 0, 0])
+        self.assertEqual([courier[f"delivery_{name}"] for name in ('0d', '1d', '2_3d', '4_7d', '8d_plus')],
+                         [0, 1, 1, 0, 0])
+
+        self.assertEqual({key: freight[key] for key in ('orders', 'shipped', 'delivered', 'same_day_pct',
+                                                        'ship_days', 'ship_8d_plus', 'delivery_days')},
+                         {'orders': 1, 'shipped': 1, 'delivered': 0, 'same_day_pct': 0.0, 'ship_days': 10.0,
+                          'ship_8d_plus': 1, 'delivery_days': None})
+
+    def test_backlog(self):
+        with mock.patch('django.utils.timezone.localdate', return_value=date(2024, 3, 10)):
+            rows = self.rows(section='backlog')
+        self.assertEqual([(row['warehouse'], row['status']) for row in rows],
+                         [('Warehouse', 'PICKING'), ('Warehouse', 'SUBMITTED')])
+
+        picking, submitted = rows
+        self.assertEqual((picking['orders'], picking['value'], picking['oldest_order_date']),
+                         (2, 50, date(2024, 2, 1)))
+        self.assertEqual((picking['age_0_2d'], picking['age_3_7d'], picking['age_8d_plus']), (1, 0, 1))
+        self.assertEqual((submitted['orders'], submitted['value'], submitted['oldest_order_date']),
+                         (2, 55, date(2024, 3, 5)))
+        self.assertEqual((submitted['age_0_2d'], submitted['age_3_7d'], submitted['age_8d_plus']), (1, 1, 0))
+
+
+class UserActivityDatasetTests(TestCase):
+    """
+    Activity is counted per period, user, action and model, or listed as
+    events in timestamp order
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create(username='alice')
+        cls.bob = User.objects.create(username='bob')
+
+        def activity(user, action, timestamp, model_name=None):
+            # timestamp is set on insert, so it is moved afterwards
+            event = Activity.objects.create(user=user, action=action, model_name=model_name)
+            Activity.objects.filter(pk=event.pk).update(timestamp=timestamp)
+
+        activity(cls.alice, 'LOGIN', at(2024, 5, 1, 8))
+        activity(cls.alice, 'VIEW', at(2024, 5, 1, 10), 'Product')
+        activity(cls.alice, 'VIEW', at(2024, 5, 1, 9), 'Product')
+        activity(cls.bob, 'LOGIN', at(2024, 5, 1, 11))
+        activity(cls.alice, 'LOGIN', at(2024, 5, 2, 8))
+
+    def test_summary_counts(self):
+        columns, rows = UserActivityDataset({'period': 'day'}).rows()
+        self.assertEqual(columns, ['period', 'user_id', 'username', 'action', 'model_name', 'events',
+                                   'first_seen', 'last_seen'])
+        self.assertEqual([tuple(row) for row in rows], [
+            (date(2024, 5, 1), self.alice.pk, 'alice', 'LOGIN', None, 1, at(2024, 5, 1, 8), at(2024, 5, 1, 8)),
+            (date(2024, 5, 1), self.alice.pk, 'alice', 'VIEW', 'Product', 2, at(2024, 5, 1, 9), at(2024, 5, 1, 10)),
+            (date(2024, 5, 1), self.bob.pk, 'bob', 'LOGIN', None, 1, at(2024, 5, 1, 11), at(2024, 5, 1, 11)),
+            (date(2024, 5, 2), self.alice.pk, 'alice', 'LOGIN', None, 1, at(2024, 5, 2, 8), at(2024, 5, 2, 8)),
+        ])
+
+        columns, rows = UserActivityDataset({'period': 'month', 'action': 'LOGIN'}).rows()
+        self.assertEqual([(row[2], row[5]) for row in rows], [('alice', 2), ('bob', 1)])
+
+    def test_summary_totals(self):
+        totals = UserActivityDataset({}).totals()
+        self.assertEqual((totals['events'], totals['users'], totals['login'], totals['view'], totals['export']),
+                         (5, 2, 3, 2, 0))
+        totals = UserActivityDataset({'start_date': '2024-05-02', 'end_date': '2024-05-02'}).totals()
+        self.assertEqual((totals['events'], totals['users']), (1, 1))
+
+    def test_events(self):
+        columns, rows = UserActivityDataset({'section': 'events', 'user_id': self.alice.pk}).rows()
+        events = [dict(zip(columns, row)) for row in rows]
+        self.assertEqual([(event['timestamp'], event['action']) for event in events], [
+            (at(2024, 5, 1, 8), 'LOGIN'), (at(2024, 5, 1, 9), 'VIEW'), (at(2024, 5, 1, 10), 'VIEW'),
+            (at(2024, 5, 2, 8), 'LOGIN'),
+        ])
+
+
+# Fold movements as soon as they are written
+@override_settings(MOVEMENT_ROLLUP_LAG=-60)
+class InventoryMovementsSectionTests(TestCase):
+    """
+    The movements section reads the daily rollup up to its watermark and
+    the ledger after it, and counts every movement once
+    """
+    def setUp(self):
+        warehouse = Warehouse.objects.create(name='Warehouse', address='-', city='-', state='-',
+                                             country='-', postal_code='-')
+        product = Product.objects.create(name='Bolt', sku='BOLT', cost_price=1, selling_price=2)
+        self.inventory = Inventory.objects.create(product=product, warehouse=warehouse)
+
+    def move(self, movement_type, quantity):
+        return InventoryMovement.objects.create(inventory=self.inventory, movement_type=movement_type,
+                                                quantity=quantity)
+
+    def totals(self):
+        columns, rows = InventoryDataset({'section': 'movements', 'period': 'day'}).rows()
+        self.assertEqual(len(rows), 1)
+        return {column: value for column, value in zip(columns, rows[0]) if column in ('in', 'out', 'movements')}
+
+    def test_rollup_and_ledger_tail_are_combined(self):
+        folded = [self.move('IN', 10), self.move('OUT', 4)]
+        rollups.roll_up()
+        self.move('IN', 5)
+        self.assertEqual(self.totals(), {'in': 15, 'out': 4, 'movements': 3})
+
+        # Folded movements are read from the rollup, not the ledger
+        InventoryMovement.objects.filter(pk__in=[movement.pk for movement in folded]).delete()
+        self.assertEqual(self.totals(), {'in': 15, 'out': 4, 'movements': 3})
+
+        rollups.roll_up()
+        self.assertEqual(self.totals(), {'in': 15, 'out': 4, 'movements': 3})
+
+
+class PageLayoutTests(SimpleTestCase):
+    """
+    The layout is fixed from the first page, so later rows must not lose
+    data to widths that page happened to need
+    """
+    def test_later_text_is_kept_up_to_the_cell_limit(self):
+        layout = pdf.PageLayout(['name', 'quantity'], [('Bolt', 5)], rows_per_page=10)
+        name = 'Hex bolt, zinc plated, M8 x 40'
+        self.assertIn(name, layout.format_row((name, 5)))
+
+        longer = 'x' * (pdf.MAX_CELL_CHARS + 5)
+        cell = layout.format_row((longer, 5)).split('  ')[0]
+        self.assertEqual(len(cell), pdf.MAX_CELL_CHARS)
+        self.assertTrue(cell.endswith('…'))
+
+    def test_numbers_are_never_cut(self):
+        layout = pdf.PageLayout(['qty', 'price'], [(5, Decimal('1.50'))], rows_per_page=10)
+        line = layout.format_row((1234567890, Decimal('98765.43')))
+        self.assertIn('1234567890', line)
+        self.assertIn('98765.43', line)
+
+
+@override_settings(REPORT_PDF_ROWS_PER_PAGE=10, REPORT_PDF_PAGES_PER_CHUNK=2)
+class RenderPdfTests(SimpleTestCase):
+    def render(self, count, **kwargs):
+        import pypdf
+
+        target = io.BytesIO()
+        rows = ((i, f"Product {i}") for i in range(count))
+        timings = pdf.render_pdf(target, 'Test', ['id', 'name'], rows, **kwargs)
+        return timings, len(pypdf.PdfReader(io.BytesIO(target.getvalue())).pages)
+
+    def test_serial_render_streams_every_chunk_into_one_document(self):
+        timings, pages = self.render(95, processes=1, summary=[('Rows', 95)])
+        self.assertEqual(len(timings), 10)
+        self.assertEqual(pages, 11)
+
+    def test_empty_table_renders_one_page(self):
+        timings, pages = self.render(0, processes=1)
+        self.assertEqual((len(timings), pages), (0, 1))
@@ -13,14 +13,15 @@ from .serializers import (
     GeneratedReportSerializer
 )
 from .permissions import IsAdminOrManager, IsOwnerOrAdmin
-from .report_generators import generate_report
+from api.mixins import QueryOptimizationMixin
+from . import cache, datasets, downloads, jobs, streaming
 import csv
 import io
 import json
 from datetime import datetime, timedelta
 
 
-class ReportViewSet(viewsets.ModelViewSet):
+class ReportViewSet(QueryOptimizationMixin, viewsets.ModelViewSet):
     queryset = Report.objects.all()
     serializer_class = ReportSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrAdmin]
@@ -30,7 +31,7 @@ class ReportViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         user = self.request.user
-        queryset = Report.objects.all()
+        queryset = super().get_queryset()
         
         # Filter by warehouse if specified
         warehouse_id = self.request.query_params.get('warehouse_id', None)
@@ -67,30 +68,13 @@ class ReportViewSet(viewsets.ModelViewSet):
         # Use parameters from request if provided, otherwise use report defaults
         parameters = request.data.get('parameters', report.parameters)
         
-        # Create a new generated report
-        generated_report = GeneratedReport.objects.create(
-            report=report,
-            generated_by=request.user,
-            status='PROCESSING',
-            parameters_used=parameters
+        # Queue the report; a report_worker process generates it and the
+        # client polls the generated report for its status
+        generated_report = jobs.enqueue(report, request.user, parameters)
+        return Response(
+            GeneratedReportSerializer(generated_report).data,
+            status=status.HTTP_202_ACCEPTED
         )
-        
-        # Start the report generation process
-        # In a real application, this would typically be done asynchronously
-        try:
-            generate_report(generated_report)
-            return Response(
-                GeneratedReportSerializer(generated_report).data,
-                status=status.HTTP_202_ACCEPTED
-            )
-        except Exception as e:
-            generated_report.status = 'FAILED'
-            generated_report.error_message = str(e)
-            generated_report.save()
-            return Response(
-                {'error': str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
     
     @action(detail=True, methods=['get'])
     def download(self, request, pk=None):
@@ -102,13 +86,9 @@ class ReportViewSet(viewsets.ModelViewSet):
             try:
                 generated_report = GeneratedReport.objects.get(id=generated_report_id, report=report)
                 if generated_report.file:
-                    # Serve the file
-                    response = HttpResponse(
-                        generated_report.file,
-                        content_type='application/octet-stream'
-                    )
-                    response['Content-Disposition'] = f'attachment; filename="{report.title}_{generated_report.start_time.strftime("%Y%m%d_%H%M%S")}.{report.format.lower()}"'
-                    return response
+                    # Serve the file in chunks, or offloaded to the web server
+                    filename = f"{report.title}_{generated_report.start_time.strftime('%Y%m%d_%H%M%S')}"
+                    return downloads.file_response(request, generated_report, filename)
                 else:
                     return Response(
                         {'error': 'Report file not found'},
@@ -124,19 +104,49 @@ class ReportViewSet(viewsets.ModelViewSet):
                 {'error': 'Generated report ID not provided'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+    
+    @action(detail=True, methods=['get'])
+    def export(self, request, pk=None):
+        report = self.get_object()
+        
+        # Stream the current rows without going through the job queue;
+        # ?output= picks CSV, NDJSON or JSON, defaulting to the report format
+        output = request.query_params.get('output', report.format).upper()
+        if output not in streaming.STREAM_FORMATS:
+            return Response(
+                {'error': f"Output must be one of: {', '.join(streaming.STREAM_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        dataset = datasets.DATASETS.get(report.report_type)
+        if dataset is None:
+            return Response(
+                {'error': f"{report.get_report_type_display()} cannot be exported row by row"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            columns, rows = dataset(report.parameters).rows()
+        except ValueError as e:
+            # Parameters saved on the report that the dataset rejects
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        filename = f"{report.title.replace(' ', '_')}_{timezone.now().strftime('%Y%m%d_%H%M%S')}"
+        return streaming.streaming_response(output, columns, rows, filename)
 
 
-class ReportScheduleViewSet(viewsets.ModelViewSet):
+class ReportScheduleViewSet(QueryOptimizationMixin, viewsets.ModelViewSet):
     queryset = ReportSchedule.objects.all()
     serializer_class = ReportScheduleSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminOrManager]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['report__title', 'frequency']
-    ordering_fields = ['frequency', 'next_run', 'last_run']
+    ordering_fields = ['frequency', 'next_run']
+    ordering = ('-id',)
     
     def get_queryset(self):
         user = self.request.user
-        queryset = ReportSchedule.objects.all()
+        queryset = super().get_queryset()
         
         # Filter by report if specified
         report_id = self.request.query_params.get('report_id', None)
@@ -161,6 +171,9 @@ class ReportScheduleViewSet(viewsets.ModelViewSet):
     def toggle_active(self, request, pk=None):
         schedule = self.get_object()
         schedule.is_active = not schedule.is_active
+        if schedule.is_active:
+            # Resume from now rather than catching up on the paused period
+            schedule.next_run = None
         schedule.save()
         return Response(
             {'status': 'success', 'is_active': schedule.is_active},
@@ -168,7 +181,7 @@ class ReportScheduleViewSet(viewsets.ModelViewSet):
         )
 
 
-class ReportTemplateViewSet(viewsets.ModelViewSet):
+class ReportTemplateViewSet(QueryOptimizationMixin, viewsets.ModelViewSet):
     queryset = ReportTemplate.objects.all()
     serializer_class = ReportTemplateSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrAdmin]
@@ -178,7 +191,7 @@ class ReportTemplateViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         user = self.request.user
-        queryset = ReportTemplate.objects.all()
+        queryset = super().get_queryset()
         
         # Filter by report type if specified
         report_type = self.request.query_params.get('report_type', None)
@@ -221,17 +234,18 @@ class ReportTemplateViewSet(viewsets.ModelViewSet):
         )
 
 
-class GeneratedReportViewSet(viewsets.ReadOnlyModelViewSet):
+class GeneratedReportViewSet(QueryOptimizationMixin, viewsets.ReadOnlyModelViewSet):
     queryset = GeneratedReport.objects.all()
     serializer_class = GeneratedReportSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['report__title', 'status']
-    ordering_fields = ['start_time', 'end_time', 'status']
+    ordering_fields = ['start_time', 'status']
+    ordering = ('-start_time', '-id')
     
     def get_queryset(self):
         user = self.request.user
-        queryset = GeneratedReport.objects.all()
+        queryset = super().get_queryset()
         
         # Filter by report if specified
         report_id = self.request.query_params.get('report_id', None)
@@ -259,4 +273,9 @@ class GeneratedReportViewSet(viewsets.ReadOnlyModelViewSet):
         return queryset.filter(
             Q(report__created_by=user) | 
             Q(generated_by=user)
-        ).distinct()
\ No newline at end of file
+        ).distinct()
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated, IsAdminOrManager])
+    def cache_stats(self, request):
+        # Hit/miss counters and size of the report result cache
+        return Response(cache.stats())
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 03:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['timestamp', 'id'], name='activity_timestamp_id_idx'),
+        ),
+    ]
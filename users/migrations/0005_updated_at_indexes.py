@@ -0,0 +1,20 @@
+# Generated by Django 5.1.7 on 2026-10-18 04:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_activity_timestamp_user_index'),
+        ('warehouse', '0002_updated_at_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['updated_at'], name='profile_updated_idx'),
+        ),
+    ]
@@ -27,6 +27,12 @@ class UserProfile(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.get_role_display()}"
 
+    class Meta:
+        indexes = [
+            # Latest change of the data watermark of cached reports
+            models.Index(fields=['updated_at'], name='profile_updated_idx'),
+        ]
+
 class Activity(models.Model):
     ACTION_CHOICES = (
         ('LOGIN', 'Login'),
@@ -52,4 +58,11 @@ class Activity(models.Model):
 
     class Meta:
         verbose_name_plural = "Activities"
-        ordering = ['-timestamp']
\ No newline at end of file
+        ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['timestamp', 'id'], name='activity_timestamp_id_idx'),
+            # A user's own activity feed
+            models.Index(fields=['user', 'timestamp'], name='activity_user_timestamp_idx'),
+            # Activity reports: a timestamp range grouped by user
+            models.Index(fields=['timestamp', 'user'], name='activity_timestamp_user_idx'),
+        ]
\ No newline at end of file
@@ -1,3 +1,80 @@
+from itertools import count
+from django.contrib.auth.models import User
 from django.test import TestCase
+from rest_framework.test import APIClient
+from api.testing import QueryCountTestCase
+from warehouse.models import Warehouse
+from .models import UserProfile, Activity
 
-# Create your tests here.
+serial = count()
+
+
+def make_profile():
+    n = next(serial)
+    user = User.objects.create(username=f"user{n}")
+    profile = UserProfile.objects.create(user=user, role='STAFF')
+    warehouse = Warehouse.objects.create(name=f"Warehouse {n}", address='-', city='-', state='-',
+                                         country='-', postal_code='-')
+    profile.warehouses.add(warehouse)
+    return profile
+
+
+class ProfilePaginationTests(TestCase):
+    """
+    Walking every keyset page of the profile list, whatever the client
+    ordering, returns each profile exactly once
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', is_staff=True, is_superuser=True)
+        UserProfile.objects.create(user=cls.admin, role='ADMIN')
+        for i in range(6):
+            user = User.objects.create(username=f"user{i}")
+            UserProfile.objects.create(user=user, role=('PICKER', 'STAFF')[i % 2])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def walk(self, ordering):
+        url = f"/api/users/profiles/?page_size=2&ordering={ordering}"
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += [profile['id'] for profile in response.json()['results']]
+            url = response.json()['next']
+        return seen
+
+    def test_every_ordering_pages_through_all_profiles(self):
+        profiles = sorted(UserProfile.objects.values_list('id', flat=True))
+        # Related lookups fall back to the default ordering; role and
+        # created_at are not unique and rely on the id tie-breaker
+        for ordering in ('user__username', 'role', '-role', 'created_at', ''):
+            with self.subTest(ordering=ordering):
+                self.assertEqual(sorted(self.walk(ordering)), profiles)
+
+
+class UserQueryCountTests(QueryCountTestCase):
+    """
+    User endpoints cost the same number of queries for any number of
+    rows
+    """
+    def add_profiles(self, rows):
+        for _ in range(rows):
+            profile = make_profile()
+            Activity.objects.create(user=profile.user, action='VIEW')
+
+    def test_users(self):
+        self.assertConstantGet('/api/users/user/', self.add_profiles)
+        self.assertConstantGet(f"/api/users/user/{self.user.pk}/", self.add_profiles)
+
+    def test_profiles(self):
+        profile = make_profile()
+        self.assertConstantGet('/api/users/profiles/', self.add_profiles)
+        self.assertConstantGet(f"/api/users/profiles/{profile.pk}/", self.add_profiles)
+
+    def test_activities(self):
+        activity = Activity.objects.create(user=self.user, action='VIEW')
+        self.assertConstantGet('/api/users/activities/', self.add_profiles)
+        self.assertConstantGet(f"/api/users/activities/{activity.pk}/", self.add_profiles)
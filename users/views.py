@@ -11,26 +11,28 @@ from .serializers import (
     ActivitySerializer
 )
 from .permissions import IsAdminOrManager, IsSelfOrAdmin
+from api.mixins import QueryOptimizationMixin
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(QueryOptimizationMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminOrManager]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['username', 'email', 'first_name', 'last_name']
     ordering_fields = ['username', 'date_joined']
+    ordering = ('-date_joined', '-id')
 
     @action(detail=False, methods=['get'])
     def me(self, request):
         serializer = UserSerializer(request.user)
         return Response(serializer.data)
 
-class UserProfileViewSet(viewsets.ModelViewSet):
+class UserProfileViewSet(QueryOptimizationMixin, viewsets.ModelViewSet):
     queryset = UserProfile.objects.all()
     permission_classes = [permissions.IsAuthenticated, IsSelfOrAdmin]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['user__username', 'user__email', 'role', 'phone']
-    ordering_fields = ['user__username', 'role', 'created_at']
+    ordering_fields = ['role', 'created_at']
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -39,7 +41,7 @@ class UserProfileViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         user = self.request.user
-        queryset = UserProfile.objects.all()
+        queryset = super().get_queryset()
         
         # Filter by warehouse if specified
         warehouse_id = self.request.query_params.get('warehouse_id', None)
@@ -71,17 +73,18 @@ class UserProfileViewSet(viewsets.ModelViewSet):
         serializer = UserProfileSerializer(profile)
         return Response(serializer.data)
 
-class ActivityViewSet(viewsets.ReadOnlyModelViewSet):
+class ActivityViewSet(QueryOptimizationMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Activity.objects.all()
     serializer_class = ActivitySerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminOrManager]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['user__username', 'action', 'description', 'model_name']
     ordering_fields = ['timestamp', 'action']
+    ordering = ('-timestamp', '-id')
     
     def get_queryset(self):
         user = self.request.user
-        queryset = Activity.objects.all()
+        queryset = super().get_queryset()
         
         # Admin can see all activities
         if user.profile.role == 'ADMIN':
@@ -18,6 +18,12 @@ class Warehouse(models.Model):
     def __str__(self):
         return self.name
 
+    class Meta:
+        indexes = [
+            # Latest change of the data watermark of cached reports
+            models.Index(fields=['updated_at'], name='warehouse_updated_idx'),
+        ]
+
 class Zone(models.Model):
     warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name='zones')
     name = models.CharField(max_length=100)
@@ -1,7 +1,22 @@
 from rest_framework import serializers
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from .models import Warehouse, Zone, Location
 from inventory.models import Inventory
 
+def subquery_count(model, field):
+    """
+    Correlated COUNT(*) of `model` rows whose `field` points at the outer
+    row, usable in annotate() without GROUP BY on the outer query
+    """
+    counts = (model.objects
+              .filter(**{field: OuterRef('pk')})
+              .order_by()
+              .values(field)
+              .annotate(count=Count('pk'))
+              .values('count'))
+    return Coalesce(Subquery(counts), 0)
+
 class WarehouseSerializer(serializers.ModelSerializer):
     manager_name = serializers.ReadOnlyField(source='manager.get_full_name')
     zone_count = serializers.SerializerMethodField()
@@ -13,10 +28,22 @@ class WarehouseSerializer(serializers.ModelSerializer):
                   'phone', 'email', 'manager', 'manager_name', 'is_active',
                   'zone_count', 'location_count', 'created_at', 'updated_at']
     
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.annotate(
+            zone_count=subquery_count(Zone, 'warehouse'),
+            location_count=subquery_count(Location, 'warehouse')
+        )
+    
     def get_zone_count(self, obj):
+        # Annotated by setup_eager_loading; instances loaded elsewhere fall back to COUNT
+        if hasattr(obj, 'zone_count'):
+            return obj.zone_count
         return obj.zones.count()
     
     def get_location_count(self, obj):
+        if hasattr(obj, 'location_count'):
+            return obj.location_count
         return obj.locations.count()
 
 class ZoneSerializer(serializers.ModelSerializer):
@@ -28,7 +55,13 @@ class ZoneSerializer(serializers.ModelSerializer):
         fields = ['id', 'warehouse', 'warehouse_name', 'name', 'description', 
                   'is_active', 'location_count', 'created_at', 'updated_at']
     
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.annotate(location_count=subquery_count(Location, 'zone'))
+    
     def get_location_count(self, obj):
+        if hasattr(obj, 'location_count'):
+            return obj.location_count
         return obj.locations.count()
 
 class LocationSerializer(serializers.ModelSerializer):
@@ -45,4 +78,4 @@ class LocationSerializer(serializers.ModelSerializer):
     def get_product_count(self, obj):
         # This would need to be updated based on how products are linked to locations
         # Currently, our model does not have a direct link between inventory and locations
-        return 0
\ No newline at end of file
+        return 0
@@ -1,3 +1,65 @@
-from django.test import TestCase
+from itertools import count
+from django.contrib.auth.models import User
+from api.testing import QueryCountTestCase
+from inventory.models import Product, Inventory
+from .models import Warehouse, Zone, Location
 
-# Create your tests here.
+serial = count()
+
+
+def make_warehouse():
+    n = next(serial)
+    manager = User.objects.create(username=f"manager{n}")
+    return Warehouse.objects.create(name=f"Warehouse {n}", address='-', city='-', state='-',
+                                    country='-', postal_code='-', manager=manager)
+
+
+class WarehouseQueryCountTests(QueryCountTestCase):
+    """
+    Warehouse endpoints cost the same number of queries for any number
+    of rows
+    """
+    def setUp(self):
+        super().setUp()
+        self.warehouse = make_warehouse()
+        self.zone = Zone.objects.create(warehouse=self.warehouse, name='Zone')
+
+    def add_zones(self, rows):
+        for _ in range(rows):
+            zone = Zone.objects.create(warehouse=self.warehouse, name=f"Zone {next(serial)}")
+            Location.objects.create(warehouse=self.warehouse, zone=zone, name=f"Location {next(serial)}")
+
+    def add_locations(self, rows):
+        for _ in range(rows):
+            zone = Zone.objects.create(warehouse=make_warehouse(), name=f"Zone {next(serial)}")
+            Location.objects.create(warehouse=zone.warehouse, zone=zone, name=f"Location {next(serial)}")
+            Location.objects.create(warehouse=self.warehouse, zone=self.zone, name=f"Location {next(serial)}")
+
+    def test_warehouses(self):
+        seed = lambda rows: [make_warehouse() for _ in range(rows)]
+        self.assertConstantGet('/api/warehouse/warehouses/', seed)
+        self.assertConstantGet(f"/api/warehouse/warehouses/{self.warehouse.pk}/", self.add_zones)
+
+    def test_warehouse_zones_and_locations(self):
+        self.assertConstantGet(f"/api/warehouse/warehouses/{self.warehouse.pk}/zones/", self.add_zones)
+        self.assertConstantGet(f"/api/warehouse/warehouses/{self.warehouse.pk}/locations/", self.add_zones)
+
+    def test_warehouse_inventory(self):
+        def seed(rows):
+            for _ in range(rows):
+                n = next(serial)
+                product = Product.objects.create(name=f"Product {n}", sku=f"SKU-{n}",
+                                                 cost_price=1, selling_price=2)
+                Inventory.objects.create(product=product, warehouse=self.warehouse)
+
+        self.assertConstantGet(f"/api/warehouse/warehouses/{self.warehouse.pk}/inventory/", seed)
+
+    def test_zones(self):
+        self.assertConstantGet('/api/warehouse/zones/', self.add_locations)
+        self.assertConstantGet(f"/api/warehouse/zones/{self.zone.pk}/", self.add_locations)
+        self.assertConstantGet(f"/api/warehouse/zones/{self.zone.pk}/locations/", self.add_locations)
+
+    def test_locations(self):
+        location = Location.objects.create(warehouse=self.warehouse, zone=self.zone, name='Location')
+        self.assertConstantGet('/api/warehouse/locations/', self.add_locations)
+        self.assertConstantGet(f"/api/warehouse/locations/{location.pk}/", self.add_locations)
@@ -9,8 +9,9 @@ from .models import Warehouse, Zone, Location
 from .serializers import WarehouseSerializer, ZoneSerializer, LocationSerializer
 from inventory.models import Inventory
 from inventory.serializers import InventorySerializer
+from api.mixins import QueryOptimizationMixin
 
-class WarehouseViewSet(viewsets.ModelViewSet):
+class WarehouseViewSet(QueryOptimizationMixin, viewsets.ModelViewSet):
     queryset = Warehouse.objects.all()
     serializer_class = WarehouseSerializer
     permission_classes = [IsAuthenticated]
@@ -21,24 +22,21 @@ class WarehouseViewSet(viewsets.ModelViewSet):
     def zones(self, request, pk=None):
         warehouse = self.get_object()
         zones = Zone.objects.filter(warehouse=warehouse)
-        serializer = ZoneSerializer(zones, many=True)
-        return Response(serializer.data)
+        return self.list_response(zones, ZoneSerializer)
     
     @action(detail=True, methods=['get'])
     def locations(self, request, pk=None):
         warehouse = self.get_object()
         locations = Location.objects.filter(warehouse=warehouse)
-        serializer = LocationSerializer(locations, many=True)
-        return Response(serializer.data)
+        return self.list_response(locations, LocationSerializer)
     
     @action(detail=True, methods=['get'])
     def inventory(self, request, pk=None):
         warehouse = self.get_object()
         inventory = Inventory.objects.filter(warehouse=warehouse)
-        serializer = InventorySerializer(inventory, many=True)
-        return Response(serializer.data)
+        return self.list_response(inventory, InventorySerializer)
 
-class ZoneViewSet(viewsets.ModelViewSet):
+class ZoneViewSet(QueryOptimizationMixin, viewsets.ModelViewSet):
     queryset = Zone.objects.all()
     serializer_class = ZoneSerializer
     permission_classes = [IsAuthenticated]
@@ -49,10 +47,9 @@ class ZoneViewSet(viewsets.ModelViewSet):
     def locations(self, request, pk=None):
         zone = self.get_object()
         locations = Location.objects.filter(zone=zone)
-        serializer = LocationSerializer(locations, many=True)
-        return Response(serializer.data)
+        return self.list_response(locations, LocationSerializer)
 
-class LocationViewSet(viewsets.ModelViewSet):
+class LocationViewSet(QueryOptimizationMixin, viewsets.ModelViewSet):
     queryset = Location.objects.all()
     serializer_class = LocationSerializer
     permission_classes = [IsAuthenticated]
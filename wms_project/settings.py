@@ -122,8 +122,46 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ],
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetPagination',
+    'PAGE_SIZE': int(os.getenv('API_PAGE_SIZE', 50)),
 }
 
+# Upper bound for the ?page_size= query parameter on list endpoints
+API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', 500))
+
+# Report job queue (reports.jobs, manage.py report_worker)
+REPORT_WORKER_PROCESSES = int(os.getenv('REPORT_WORKER_PROCESSES', 2))
+REPORT_WORKER_POLL_INTERVAL = float(os.getenv('REPORT_WORKER_POLL_INTERVAL', 2))
+REPORT_JOB_MAX_ATTEMPTS = int(os.getenv('REPORT_JOB_MAX_ATTEMPTS', 3))
+# Seconds before the first retry; doubled on every further attempt
+REPORT_JOB_RETRY_DELAY = int(os.getenv('REPORT_JOB_RETRY_DELAY', 30))
+# Seconds after which a PROCESSING job whose worker died is claimable again
+REPORT_JOB_TIMEOUT = int(os.getenv('REPORT_JOB_TIMEOUT', 1800))
+# Rows fetched per database round trip by streamed report exports
+REPORT_STREAM_CHUNK_SIZE = int(os.getenv('REPORT_STREAM_CHUNK_SIZE', 2000))
+# PDF tables: rows per page, pages rendered per pool task, and pool size
+# (0 uses every CPU)
+REPORT_PDF_ROWS_PER_PAGE = int(os.getenv('REPORT_PDF_ROWS_PER_PAGE', 40))
+REPORT_PDF_PAGES_PER_CHUNK = int(os.getenv('REPORT_PDF_PAGES_PER_CHUNK', 25))
+REPORT_PDF_PROCESSES = int(os.getenv('REPORT_PDF_PROCESSES', 0))
+# Seconds between scheduler scans for due report schedules, and the most
+# scheduled runs queued or generating at once
+REPORT_SCHEDULER_INTERVAL = float(os.getenv('REPORT_SCHEDULER_INTERVAL', 30))
+REPORT_SCHEDULER_MAX_CONCURRENT = int(os.getenv('REPORT_SCHEDULER_MAX_CONCURRENT', 4))
+# Hand report downloads to the web server: 'X-Accel-Redirect' (nginx, with
+# an internal location serving REPORT_DOWNLOAD_ACCEL_PREFIX from MEDIA_ROOT)
+# or 'X-Sendfile' (Apache, lighttpd); empty streams them from Django
+REPORT_DOWNLOAD_OFFLOAD = os.getenv('REPORT_DOWNLOAD_OFFLOAD', '')
+REPORT_DOWNLOAD_ACCEL_PREFIX = os.getenv('REPORT_DOWNLOAD_ACCEL_PREFIX', '/protected-media/')
+# Daily movement rollup: movement ids folded per transaction, and seconds a
+# movement must age before it is folded so in-flight inserts are not skipped
+MOVEMENT_ROLLUP_BATCH_SIZE = int(os.getenv('MOVEMENT_ROLLUP_BATCH_SIZE', 50000))
+MOVEMENT_ROLLUP_LAG = int(os.getenv('MOVEMENT_ROLLUP_LAG', 60))
+# Report result cache bounds, least recently used entries are evicted first
+# (0 entries disables the cache)
+REPORT_CACHE_MAX_ENTRIES = int(os.getenv('REPORT_CACHE_MAX_ENTRIES', 500))
+REPORT_CACHE_MAX_BYTES = int(os.getenv('REPORT_CACHE_MAX_BYTES', 1024 * 1024 * 1024))
+
 # App Engine Settings
 if os.getenv('GAE_APPLICATION', None):
     # Running on App Engine